@@ -0,0 +1,319 @@
+# api/backends.py
+"""
+분류 백엔드
+- OpenAIBackend      : 실제 OpenAI chat completions
+- LocalServerBackend : api/stub_server.py 같은 로컬 chat-completions 호환 서버
+- FakeBackend        : 네트워크 없이 프로세스 안에서 응답을 흉내 냄
+CLASSIFIER_BACKEND(.env)로 선택하며, 클라이언트는 첫 호출(또는 warm_up) 때 생성
+"""
+import json
+import random
+import threading
+import time
+
+from utils.config import (
+    DEFECT_LABELS, CLASSIFIER_BACKEND, CLASSIFIER_BASE_URL,
+    FAKE_LATENCY, FAKE_ERROR_RATE, FAKE_ERROR_STATUS, FAKE_RETRY_AFTER, FAKE_RESPONSES,
+    FAKE_CHUNK_DELAY, HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_KEEPALIVE_EXPIRY
+)
+
+
+class BackendError(Exception):
+    """가짜/로컬 백엔드가 흉내 내는 HTTP 오류 (status_code, headers는 openai 예외와 같은 이름)"""
+
+    def __init__(self, status_code: int, message: str = "", headers: dict | None = None):
+        super().__init__(message or f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def parse_latency(spec: str):
+    """
+    지연 분포 문자열 → 샘플 함수(초)
+      fixed:0.5 / uniform:0.2,1.5 / normal:0.8,0.2 / lognormal:-0.3,0.5 / exponential:0.7
+    """
+    kind, _, args = (spec or "fixed:0").partition(":")
+    vals = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    kind = kind.strip().lower()
+    if kind == "fixed":
+        return lambda: vals[0]
+    if kind == "uniform":
+        return lambda: random.uniform(vals[0], vals[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(vals[0], vals[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(vals[0], vals[1])
+    if kind == "exponential":
+        return lambda: random.expovariate(1.0 / vals[0]) if vals[0] > 0 else 0.0
+    raise ValueError(f"알 수 없는 지연 분포: {spec}")
+
+
+def _load_canned(path: str) -> list:
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+class ResponseSimulator:
+    """
+    지연/오류/응답 내용 시뮬레이션 (FakeBackend와 stub_server가 공유)
+    - latency    : parse_latency 형식 문자열
+    - error_rate : 0~1, 요청 중 오류로 응답할 비율
+    - error_status: 오류 시 고를 상태 코드 목록 (429면 Retry-After 헤더 포함)
+    - canned     : 응답 후보(JSON 오브젝트 또는 문자열) 목록, 없으면 라벨 목록에서 무작위 생성
+    - chunk_delay: 스트리밍 조각 사이 지연(초)
+    """
+
+    def __init__(self, latency: str = FAKE_LATENCY, error_rate: float = FAKE_ERROR_RATE,
+                 error_status=FAKE_ERROR_STATUS, retry_after: float = FAKE_RETRY_AFTER,
+                 canned=None, seed=None, chunk_delay: float = FAKE_CHUNK_DELAY,
+                 trailing_text: str = ""):
+        self.latency_spec = latency
+        self._latency = parse_latency(latency)
+        self.error_rate = max(0.0, min(1.0, float(error_rate)))
+        self.error_status = list(error_status) or [500]
+        self.retry_after = retry_after
+        if canned is None:
+            canned = _load_canned(FAKE_RESPONSES)
+        self.canned = list(canned) if isinstance(canned, list) else [canned]
+        self.chunk_delay = chunk_delay
+        self.trailing_text = trailing_text
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def _random_result(self) -> dict:
+        label = self._rng.choice(DEFECT_LABELS or ["none"])
+        return {
+            "label": label,
+            "confidence": round(self._rng.uniform(0.5, 0.99), 2),
+            "description": f"시뮬레이션 응답 ({label})",
+            "severity": self._rng.choice(["A", "B", "C"]),
+            "location": self._rng.choice(["front bumper", "rear bumper", "hood", "left door", "roof"]),
+            "action": self._rng.choice(["Pass", "Rework", "Scrap", "Hold", "Reject"]),
+        }
+
+    def _one(self):
+        if self.canned:
+            return self._rng.choice(self.canned)
+        return self._random_result()
+
+    def error_for_request(self):
+        """오류로 응답할 차례면 (status, headers), 아니면 None"""
+        with self._lock:
+            self.requests += 1
+            if self._rng.random() >= self.error_rate:
+                return None
+            self.errors += 1
+            status = self._rng.choice(self.error_status)
+        headers = {"retry-after": str(self.retry_after)} if status == 429 else {}
+        return status, headers
+
+    def sleep(self):
+        time.sleep(self._latency())
+
+    def sleep_chunk(self):
+        if self.chunk_delay > 0:
+            time.sleep(self.chunk_delay)
+
+    def chunks_for(self, n_images: int, size: int = 8) -> list:
+        """스트리밍 응답 조각 (JSON 뒤에 trailing_text를 붙여 불필요한 꼬리 텍스트 흉내)"""
+        text = self.content_for(n_images) + self.trailing_text
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def content_for(self, n_images: int) -> str:
+        """이미지 1장이면 JSON 오브젝트, 여러 장이면 index가 붙은 JSON 배열 텍스트"""
+        with self._lock:
+            if n_images <= 1:
+                one = self._one()
+                return one if isinstance(one, str) else json.dumps(one, ensure_ascii=False)
+            items = []
+            for i in range(1, n_images + 1):
+                one = self._one()
+                if isinstance(one, str):
+                    one = json.loads(one)
+                items.append({**one, "index": i})
+        return json.dumps(items, ensure_ascii=False)
+
+
+def count_images(messages) -> int:
+    n = 0
+    for m in messages or []:
+        content = m.get("content")
+        if isinstance(content, list):
+            n += sum(1 for c in content if isinstance(c, dict) and c.get("type") == "image_url")
+    return n
+
+
+class ClassifierBackend:
+    """백엔드 공통 인터페이스: chat messages → 응답 텍스트"""
+    name = "base"
+
+    def complete(self, messages: list, model: str, temperature: float = 0.2) -> str:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """앱 시작 시 미리 준비할 것이 있으면 수행 (기본: 없음)"""
+
+    def stream(self, messages: list, model: str, temperature: float = 0.2):
+        """
+        응답 텍스트 조각을 순서대로 내보내는 generator.
+        호출 측이 중간에 close()하면 연결을 닫아 남은 생성을 받지 않음.
+        기본 구현은 complete() 결과를 한 번에 내보냄.
+        """
+        yield self.complete(messages, model, temperature)
+
+
+class OpenAIBackend(ClassifierBackend):
+    """
+    OpenAI chat completions.
+    HTTP 클라이언트는 첫 사용(또는 warm_up) 때 한 번만 만들고 모든 워커가 공유:
+    - 연결 풀 HTTP_POOL_SIZE (기본: 일괄 판정 동시 수 + 2)
+    - keep-alive 연결도 같은 수만큼 유지 (HTTP_KEEPALIVE_EXPIRY초)
+    - 요청별 connect/read 타임아웃 HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT
+    """
+    name = "openai"
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None,
+                 pool_size: int = HTTP_POOL_SIZE):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.pool_size = max(1, int(pool_size))
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _make_client(self):
+        import httpx
+        from openai import OpenAI
+
+        timeout = httpx.Timeout(
+            HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT,
+            write=HTTP_READ_TIMEOUT, pool=HTTP_CONNECT_TIMEOUT,
+        )
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+        kwargs = {
+            "max_retries": 0,  # 재시도는 api.retry에서 관리
+            "timeout": timeout,
+            "http_client": http_client,
+        }
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        if self.api_key:
+            kwargs["api_key"] = self.api_key
+        return OpenAI(**kwargs)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._make_client()
+        return self._client
+
+    def warm_up(self):
+        """클라이언트 생성 + 연결(TLS 핸드셰이크)을 미리 열어 둠"""
+        t0 = time.perf_counter()
+        self.client.models.list()
+        print(f"[WARMUP] {self.name} backend ready ({time.perf_counter() - t0:.2f}s)")
+
+    def complete(self, messages: list, model: str, temperature: float = 0.2) -> str:
+        resp = self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature,
+        )
+        return resp.choices[0].message.content or ""
+
+    def stream(self, messages: list, model: str, temperature: float = 0.2):
+        resp = self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True,
+        )
+        try:
+            for chunk in resp:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            resp.close()
+
+
+class LocalServerBackend(OpenAIBackend):
+    """로컬 chat-completions 호환 서버(api/stub_server.py 등)에 연결"""
+    name = "local"
+
+    def __init__(self, base_url: str = CLASSIFIER_BASE_URL, pool_size: int = HTTP_POOL_SIZE):
+        super().__init__(base_url=base_url, api_key="local", pool_size=pool_size)
+
+
+class FakeBackend(ClassifierBackend):
+    """프로세스 내 가짜 백엔드 (네트워크/API 키 불필요)"""
+    name = "fake"
+
+    def __init__(self, simulator: ResponseSimulator | None = None):
+        self.simulator = simulator or ResponseSimulator()
+
+    def complete(self, messages: list, model: str, temperature: float = 0.2) -> str:
+        self.simulator.sleep()
+        err = self.simulator.error_for_request()
+        if err:
+            status, headers = err
+            raise BackendError(status, f"simulated HTTP {status}", headers)
+        return self.simulator.content_for(count_images(messages))
+
+    def stream(self, messages: list, model: str, temperature: float = 0.2):
+        self.simulator.sleep()   # 첫 토큰까지의 지연
+        err = self.simulator.error_for_request()
+        if err:
+            status, headers = err
+            raise BackendError(status, f"simulated HTTP {status}", headers)
+        for piece in self.simulator.chunks_for(count_images(messages)):
+            self.simulator.sleep_chunk()
+            yield piece
+
+
+_BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": LocalServerBackend,
+    "fake": FakeBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> ClassifierBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            cls = _BACKENDS.get(CLASSIFIER_BACKEND)
+            if cls is None:
+                raise ValueError(f"알 수 없는 CLASSIFIER_BACKEND: {CLASSIFIER_BACKEND}")
+            _backend = cls()
+        return _backend
+
+
+def set_backend(backend: ClassifierBackend):
+    """테스트/부하 측정용으로 백엔드 교체"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def warm_up_in_background():
+    """백그라운드 스레드에서 백엔드 warm_up (실패해도 앱 동작에는 영향 없음)"""
+    def _run():
+        try:
+            get_backend().warm_up()
+        except Exception as e:
+            print("[WARMUP] skipped:", e)
+    t = threading.Thread(target=_run, name="backend-warmup", daemon=True)
+    t.start()
+    return t
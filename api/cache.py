@@ -0,0 +1,230 @@
+# api/cache.py
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+from db.db import get_db_path, get_connection, file_sha256
+from db.writer import run_write
+from utils.config import (
+    DEFAULT_VISION_MODEL, CLASSIFY_PROMPT, CLASSIFY_CACHE_MAX_ENTRIES
+)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class ClassificationCache:
+    """
+    분류 결과 영구 캐시.
+    key = (이미지 sha256, 모델명, 프롬프트 해시)
+    - 같은 바이트의 이미지는 경로가 달라도 API를 다시 호출하지 않음
+    - 같은 key의 동시 요청은 한 번의 호출로 합침(coalescing)
+    - max_entries 초과 시 가장 오래 안 쓴 항목부터 삭제(LRU)
+      (행 수는 메모리에 대략 세어 두고, 한도를 넘었을 때만 실제로 COUNT)
+    - 쓰기(저장/사용 기록/정리)는 결과 DB와 같은 파일이면 저장 스레드(db/writer.py)에서 실행
+    """
+    TABLE = "classify_cache"
+
+    def __init__(self, db_path: str, max_entries: int = CLASSIFY_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._schema_ready = False
+        self._approx_rows = None   # 대략의 행 수 (put마다 +1, prune 때 실제 값으로 보정)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _connect(self):
+        return get_connection(self.db_path)  # 스레드별 재사용 연결 (닫지 않음)
+
+    def _write(self, fn, wait: bool = True):
+        """fn(conn) 실행 — 결과 DB와 같은 파일이면 저장 스레드에서 (wait=False면 기다리지 않음)"""
+        if os.path.realpath(self.db_path) == get_db_path():
+            fut = run_write(fn, urgent=wait)
+            return fut.result() if wait else None
+        return fn(self._connect())
+
+    def ensure_schema(self):
+        if self._schema_ready:
+            return
+        self._write(self._create)
+        self._schema_ready = True
+
+    def _create(self, conn):
+        with conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    image_hash   TEXT NOT NULL,
+                    model        TEXT NOT NULL,
+                    prompt_hash  TEXT NOT NULL,
+                    result_json  TEXT NOT NULL,
+                    created_ts   TEXT,
+                    last_used_ts TEXT,
+                    hit_count    INTEGER DEFAULT 0,
+                    PRIMARY KEY (image_hash, model, prompt_hash)
+                )
+                """)
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_last_used ON {self.TABLE}(last_used_ts)"
+            )
+
+    def key_for(self, image_path: str, model: str = DEFAULT_VISION_MODEL,
+                prompt: str = CLASSIFY_PROMPT) -> tuple:
+        return (file_sha256(image_path), model, prompt_hash(prompt))
+
+    def get(self, key: tuple):
+        self.ensure_schema()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._connect()
+        row = conn.execute(
+            f"SELECT result_json FROM {self.TABLE} "
+            "WHERE image_hash=? AND model=? AND prompt_hash=?", key
+        ).fetchone()
+        if row:
+            self._write(lambda c: self._touch(c, key, now), wait=False)
+        return json.loads(row[0]) if row else None
+
+    def _touch(self, conn, key: tuple, now: str):
+        with conn:
+            conn.execute(
+                f"UPDATE {self.TABLE} SET last_used_ts=?, hit_count=hit_count+1 "
+                "WHERE image_hash=? AND model=? AND prompt_hash=?", (now, *key)
+            )
+
+    def put(self, key: tuple, result: dict):
+        self.ensure_schema()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        row = (*key, json.dumps(result, ensure_ascii=False), now, now)
+
+        def _put(conn):
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.TABLE} "
+                    "(image_hash, model, prompt_hash, result_json, created_ts, last_used_ts, hit_count) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 0)", row
+                )
+        self._write(_put)
+        with self._lock:
+            if self._approx_rows is not None:
+                self._approx_rows += 1   # 같은 key 덮어쓰기도 +1 → 실제보다 크게 세므로 한도 초과를 놓치지 않음
+            over = self._approx_rows is None or self._approx_rows > self.max_entries * 1.1
+        if over:
+            self.prune()
+
+    def prune(self) -> int:
+        """max_entries를 10% 이상 넘으면 LRU 순으로 max_entries까지 정리"""
+        if not self.max_entries:
+            return 0
+
+        def _prune(conn):
+            n = conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+            if n <= self.max_entries * 1.1:
+                return n, 0
+            with conn:
+                return n, conn.execute(
+                    f"DELETE FROM {self.TABLE} WHERE rowid IN ("
+                    f"SELECT rowid FROM {self.TABLE} ORDER BY last_used_ts ASC LIMIT ?)",
+                    (n - self.max_entries,)
+                ).rowcount
+        n, removed = self._write(_prune)
+        with self._lock:
+            self.evictions += removed
+            self._approx_rows = n - removed
+        return removed
+
+    def lookup(self, image_path: str, model: str = DEFAULT_VISION_MODEL,
+               prompt: str = CLASSIFY_PROMPT, fallback_prompts=()) -> tuple:
+        """
+        (key, 결과 또는 None) — 적중/미스 카운터 반영
+        prompt의 key에 없으면 fallback_prompts로 저장된 결과도 확인 (반환 key는 항상 prompt 기준)
+        """
+        key = self.key_for(image_path, model, prompt)
+        result = self.get(key)
+        for other in fallback_prompts:
+            if result is not None:
+                break
+            result = self.get(key[:2] + (prompt_hash(other),))
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return key, result
+
+    def get_or_compute(self, image_path: str, compute, model: str = DEFAULT_VISION_MODEL,
+                       prompt: str = CLASSIFY_PROMPT) -> dict:
+        """
+        캐시에 있으면 바로 반환, 없으면 compute(image_path)로 계산 후 저장.
+        compute가 예외를 내면 저장하지 않고 그대로 전달.
+        """
+        key = self.key_for(image_path, model, prompt)
+
+        with self._lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+            else:
+                self.coalesced += 1
+        if not owner:
+            return dict(fut.result())
+
+        try:
+            result = self.get(key)
+            if result is not None:
+                with self._lock:
+                    self.hits += 1
+            else:
+                with self._lock:
+                    self.misses += 1
+                result = compute(image_path)
+                self.put(key, result)
+            fut.set_result(result)
+            return dict(result)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def clear(self):
+        self.ensure_schema()
+
+        def _clear(conn):
+            with conn:
+                conn.execute(f"DELETE FROM {self.TABLE}")
+        self._write(_clear)
+        with self._lock:
+            self._approx_rows = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ClassificationCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ClassificationCache(get_db_path())
+        return _cache
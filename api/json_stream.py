@@ -0,0 +1,76 @@
+# api/json_stream.py
+import json
+
+
+class IncrementalJsonObject:
+    """
+    스트리밍 텍스트에서 첫 번째 JSON 오브젝트를 점진적으로 파싱.
+    - '{' 이전 텍스트(```json 등)는 무시
+    - 최상위 "key": value 쌍이 끝날 때마다(쉼표 또는 닫는 괄호) feed()가 반환
+    - 오브젝트가 닫히면 done=True, 이후 텍스트는 무시
+    """
+
+    def __init__(self):
+        self.done = False
+        self.result = {}
+        self._buf = []          # 현재 최상위 쌍의 텍스트
+        self._parts = []        # 오브젝트 전체 텍스트
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def _flush_pair(self, out: list):
+        seg = "".join(self._buf).strip()
+        self._buf = []
+        if not seg:
+            return
+        try:
+            pair = json.loads("{" + seg + "}")
+        except ValueError:
+            return  # 깨진 쌍은 건너뜀 (최종 검증은 호출 측에서)
+        for k, v in pair.items():
+            self.result[k] = v
+            out.append((k, v))
+
+    def feed(self, chunk: str) -> list:
+        """새로 완성된 (key, value) 목록 반환"""
+        out = []
+        if self.done or not chunk:
+            return out
+        for ch in chunk:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._parts.append(ch)
+                continue
+
+            self._parts.append(ch)
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                self._buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._flush_pair(out)
+                    self.done = True
+                    return out
+            elif ch == "," and self._depth == 1:
+                self._flush_pair(out)
+                continue
+            self._buf.append(ch)
+        return out
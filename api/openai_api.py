@@ -1,11 +1,17 @@
 # api/openai_api.py
+import base64
 import json
 import re
-from openai import OpenAI
-from utils.config import DEFAULT_VISION_MODEL, CLASSIFY_PROMPT, DEFAULT_DEFECT_LABELS
+from utils.config import (
+    DEFAULT_VISION_MODEL, CLASSIFY_PROMPT, DEFAULT_DEFECT_LABELS, CLASSIFY_CACHE,
+    CLASSIFY_BATCH_PROMPT, CLASSIFY_PACK_SIZE
+)
 from utils.file_handler import to_data_url
-
-client = OpenAI()
+from utils.image_prep import prepare_many
+from api.cache import get_cache, prompt_hash
+from api.retry import ClassificationError, call_with_retry
+from api.backends import get_backend
+from api.json_stream import IncrementalJsonObject
 
 DEFECT_LABELS = [lbl.strip() for lbl in DEFAULT_DEFECT_LABELS.split(",") if lbl.strip()]
 
@@ -28,6 +34,17 @@ def _normalize_label(lbl: str) -> str:
     allowed = {l.strip().lower().replace(" ", "_"): l.strip() for l in DEFECT_LABELS}
     return allowed.get(norm, DEFECT_LABELS[0] if DEFECT_LABELS else "none")
 
+def _extract_json_array(text: str) -> str:
+    """응답 중 JSON 배열만 추출"""
+    codeblock = re.search(r"```(?:json)?\s*(\[.*?\])\s*```", text, flags=re.S | re.I)
+    if codeblock:
+        return codeblock.group(1)
+    start = text.find("[")
+    end = text.rfind("]")
+    if start != -1 and end != -1 and end > start:
+        return text[start:end+1]
+    return text  # fallback
+
 def _clamp_confidence(x) -> float:
     try:
         v = float(x)
@@ -35,7 +52,57 @@ def _clamp_confidence(x) -> float:
         return 0.0
     return max(0.0, min(1.0, v))
 
-def classify_image(image_path: str) -> dict:
+def _parse_result(parsed) -> dict:
+    """JSON 오브젝트(또는 JSON 문자열) 하나를 결과 dict로 검증/보정"""
+    if isinstance(parsed, str):
+        parsed = json.loads(_extract_json(parsed))
+    if not isinstance(parsed, dict):
+        raise ValueError(f"JSON 오브젝트가 아님: {type(parsed).__name__}")
+
+    label = _normalize_label(parsed.get("label", ""))
+    confidence = _clamp_confidence(parsed.get("confidence", 0.0))
+    description = str(parsed.get("description", "")).strip() or "(설명 없음)"
+    severity = str(parsed.get("severity", "C"))
+    location = str(parsed.get("location", "unknown")).strip()
+    action = str(parsed.get("action", "Hold"))
+
+    return {
+        "label": label,
+        "confidence": confidence,
+        "description": description,
+        "severity": severity,
+        "location": location,
+        "action": action,
+    }
+
+def _parse_or_fail(raw: str) -> dict:
+    try:
+        return _parse_result(json.loads(_extract_json(raw)))
+    except Exception as e:
+        raise ClassificationError(f"응답 파싱 실패: {e}") from e
+
+def _classify_uncached(image_path: str, model: str = DEFAULT_VISION_MODEL) -> dict:
+    """API 호출(재시도 포함) + 응답 검증. 실패 시 ClassificationError"""
+    try:
+        data_url = to_data_url(image_path)
+    except Exception as e:
+        raise ClassificationError(f"이미지 읽기 실패: {e}") from e
+    raw = call_with_retry(
+        get_backend().complete,
+        model=model,
+        messages=[{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": CLASSIFY_PROMPT},
+                {"type": "image_url", "image_url": {"url": data_url}},
+            ],
+        }],
+        temperature=0.2,
+    )
+    return _parse_or_fail(raw)
+
+def classify_image(image_path: str, use_cache: bool = CLASSIFY_CACHE,
+                   model: str = DEFAULT_VISION_MODEL) -> dict:
     """
     반환:
     {
@@ -46,46 +113,177 @@ def classify_image(image_path: str) -> dict:
         "location": "front bumper",
         "action": "Rework"
     }
+    use_cache=True면 (sha256, 모델, 프롬프트) 기준 캐시를 먼저 조회
+    model: 사전 필터가 저가 모델로 보낼 때 지정
+    실패 시 ClassificationError (가짜 결과를 반환하지 않음)
     """
+    def _compute(path: str) -> dict:
+        return _classify_uncached(path, model)
+
     try:
-        data_url = to_data_url(image_path)
-        resp = client.chat.completions.create(
-            model=DEFAULT_VISION_MODEL,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": CLASSIFY_PROMPT},
-                    {"type": "image_url", "image_url": {"url": data_url}},
-                ],
-            }],
-            temperature=0.2,
-        )
-        raw = resp.choices[0].message.content or ""
-        js = _extract_json(raw)
-        parsed = json.loads(js)
-
-        label = _normalize_label(parsed.get("label", ""))
-        confidence = _clamp_confidence(parsed.get("confidence", 0.0))
-        description = str(parsed.get("description", "")).strip() or "(설명 없음)"
-        severity = str(parsed.get("severity", "C"))
-        location = str(parsed.get("location", "unknown")).strip()
-        action = str(parsed.get("action", "Hold"))
-
-        return {
-            "label": label,
-            "confidence": confidence,
-            "description": description,
-            "severity": severity,
-            "location": location,
-            "action": action,
-        }
+        if use_cache:
+            return get_cache().get_or_compute(image_path, _compute, model=model)
+        return _compute(image_path)
+    except ClassificationError:
+        raise
+    except Exception as e:
+        raise ClassificationError(f"{type(e).__name__}: {e}") from e
+
+def _stream_once(messages: list, on_field=None) -> dict:
+    """스트리밍 응답 1회: 최상위 필드가 완성될 때마다 on_field(key, value), 오브젝트가 닫히면 즉시 중단"""
+    parser = IncrementalJsonObject()
+    gen = get_backend().stream(messages=messages, model=DEFAULT_VISION_MODEL, temperature=0.2)
+    try:
+        for piece in gen:
+            for key, value in parser.feed(piece):
+                if on_field is not None:
+                    on_field(key, value)
+            if parser.done:
+                break
+    finally:
+        gen.close()  # 남은 꼬리 텍스트는 받지 않음
+    if not parser.done:
+        raise ClassificationError(f"응답 파싱 실패: JSON 오브젝트가 닫히지 않음 ({parser.text[:80]!r})")
+    return parser.result
+
+def classify_image_stream(image_path: str, on_field=None, use_cache: bool = CLASSIFY_CACHE) -> dict:
+    """
+    classify_image의 스트리밍 버전.
+    on_field(key, value): label/confidence/description/severity/location/action이
+    도착하는 즉시 호출 (검증 전 원본 값). 반환값은 classify_image와 같은 형식.
+    캐시 적중 시에는 on_field 없이 바로 반환.
+    """
+    def _compute(path: str) -> dict:
+        try:
+            data_url = to_data_url(path)
+        except Exception as e:
+            raise ClassificationError(f"이미지 읽기 실패: {e}") from e
+        messages = [{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": CLASSIFY_PROMPT},
+                {"type": "image_url", "image_url": {"url": data_url}},
+            ],
+        }]
+        parsed = call_with_retry(_stream_once, messages, on_field)
+        try:
+            return _parse_result(parsed)
+        except Exception as e:
+            raise ClassificationError(f"응답 파싱 실패: {e}") from e
+
+    try:
+        if use_cache:
+            return get_cache().get_or_compute(image_path, _compute)
+        return _compute(image_path)
+    except ClassificationError:
+        raise
+    except Exception as e:
+        raise ClassificationError(f"{type(e).__name__}: {e}") from e
+
+def _classify_packed(image_paths: list) -> dict:
+    """
+    이미지 N장을 한 번의 chat completion으로 분류.
+    반환: {경로: 결과}  — 읽지 못했거나 배열에서 찾지 못했거나 검증 실패한 경로는 빠짐
+    읽지 못한 이미지만 빼고 나머지는 그대로 묶어서 요청
+    """
+    infos = prepare_many(image_paths, return_exceptions=True)
+    for p, info in zip(image_paths, infos):
+        if isinstance(info, Exception):
+            print("[PACK] 이미지 읽기 실패, 묶음에서 제외:", p, info)
+    packed = [(p, info) for p, info in zip(image_paths, infos) if not isinstance(info, Exception)]
+    if not packed:
+        return {}
+    image_paths = [p for p, _ in packed]
+
+    content = [{"type": "text", "text": CLASSIFY_BATCH_PROMPT.format(n=len(image_paths))}]
+    for i, (_, info) in enumerate(packed, start=1):
+        b64 = base64.b64encode(info["data"]).decode("utf-8")
+        content.append({"type": "text", "text": f"[image {i}]"})
+        content.append({"type": "image_url", "image_url": {"url": f"data:{info['mime']};base64,{b64}"}})
 
+    raw = call_with_retry(
+        get_backend().complete,
+        model=DEFAULT_VISION_MODEL,
+        messages=[{"role": "user", "content": content}],
+        temperature=0.2,
+    )
+    try:
+        items = json.loads(_extract_json_array(raw))
     except Exception as e:
-        return {
-            "label": DEFECT_LABELS[0] if DEFECT_LABELS else "none",
-            "confidence": 0.0,
-            "description": f"[오류] {e}",
-            "severity": "C",
-            "location": "unknown",
-            "action": "Hold",
-        }
\ No newline at end of file
+        print("[PACK] 배열 파싱 실패, 개별 호출로 대체:", e)
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    out = {}
+    for pos, item in enumerate(items):
+        # index(1부터) 우선, 없으면 배열 순서로 매핑 (개수가 맞을 때만)
+        idx = item.get("index") if isinstance(item, dict) else None
+        try:
+            idx = int(idx) - 1 if idx is not None else (pos if len(items) == len(image_paths) else -1)
+        except (TypeError, ValueError):
+            idx = -1
+        if not 0 <= idx < len(image_paths) or image_paths[idx] in out:
+            continue
+        try:
+            out[image_paths[idx]] = _parse_result(item)
+        except Exception as e:
+            print("[PACK] 항목 검증 실패:", image_paths[idx], e)
+    return out
+
+def classify_images(image_paths, pack_size: int = CLASSIFY_PACK_SIZE,
+                    use_cache: bool = CLASSIFY_CACHE) -> tuple[dict, dict]:
+    """
+    여러 이미지를 pack_size장씩 묶어 한 요청으로 분류.
+    반환: ({경로: classify_image와 같은 형식의 결과}, {경로: ClassificationError})
+    - 캐시에 있는 이미지는 요청에서 제외 (개별/묶음 프롬프트 결과 모두 사용)
+    - 묶음 응답은 CLASSIFY_BATCH_PROMPT 해시로 저장 → classify_image(개별 프롬프트) 캐시와 섞이지 않음
+    - 배열 응답이 깨졌거나 빠진 이미지는 개별 호출로 재시도
+    """
+    paths = list(dict.fromkeys(image_paths))
+    results, failures, keys = {}, {}, {}
+    cache = get_cache() if use_cache else None
+
+    misses = []
+    for p in paths:
+        if cache is None:
+            misses.append(p)
+            continue
+        try:
+            keys[p], hit = cache.lookup(p, fallback_prompts=(CLASSIFY_BATCH_PROMPT,))
+        except Exception as e:
+            failures[p] = ClassificationError(f"이미지 읽기 실패: {e}")
+            continue
+        if hit is not None:
+            results[p] = hit
+        else:
+            misses.append(p)
+
+    size = max(1, int(pack_size))
+    for i in range(0, len(misses), size):
+        chunk = misses[i:i + size]
+        packed = {}
+        if len(chunk) > 1:
+            try:
+                packed = _classify_packed(chunk)
+            except ClassificationError as e:
+                if e.retryable:
+                    # 재시도를 다 쓴 경우(429 등) 개별 호출로 부하를 늘리지 않음
+                    failures.update({p: e for p in chunk})
+                    continue
+                print("[PACK] 요청 실패, 개별 호출로 대체:", e)
+            except Exception as e:
+                print("[PACK] 요청 실패, 개별 호출로 대체:", e)
+        for p in chunk:
+            if p in packed:
+                results[p] = packed[p]
+                if cache is not None:
+                    cache.put(keys[p][:2] + (prompt_hash(CLASSIFY_BATCH_PROMPT),), packed[p])
+            else:
+                try:
+                    results[p] = _classify_uncached(p)
+                    if cache is not None:
+                        cache.put(keys[p], results[p])
+                except ClassificationError as e:
+                    failures[p] = e
+    return results, failures
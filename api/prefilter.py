@@ -0,0 +1,136 @@
+# api/prefilter.py
+"""
+Vision API 앞단의 로컬 사전 필터 캐스케이드
+- 이미지 통계(NumPy)로 blank / exposure / blur 단계 판정
+  · blur_var: 라플라시안 분산 (작을수록 흐림/초점 불량)
+  · mean / dark_frac / bright_frac: 노출 (평균 밝기, 거의 검정/흰색 픽셀 비율)
+  · std: 밝기 표준편차 (작을수록 빈 프레임)
+  · 분석은 긴 변 PREFILTER_MAX_EDGE로 축소한 흑백 이미지에서 수행 (임계값이 해상도에 덜 민감하도록)
+- 단계별 처리(PREFILTER_*_ROUTE): skip = API 없이 판정 결과 저장, cheap = 저가 모델로 분류, api = 그대로
+  skip 결과는 정상 라벨(NO_DEFECT_LABEL) + Hold, 단계/사유는 detail에 "[사전 필터:<단계>] <사유>"로 저장
+- 판정은 분류 캐시에 (이미지 sha256, "prefilter", 임계값) 키로 저장해 재실행 시 통계를 다시 계산하지 않음
+"""
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from api.cache import get_cache
+from utils.config import (
+    NO_DEFECT_LABEL, PREFILTER_MAX_EDGE, PREFILTER_EMPTY_STD, PREFILTER_DARK_MEAN, PREFILTER_BRIGHT_MEAN,
+    PREFILTER_CLIP_FRAC, PREFILTER_BLUR_VAR, PREFILTER_ROUTES
+)
+
+# 판정 순서 (앞 단계에서 걸리면 뒤 단계는 보지 않음)
+STAGES = ("blank", "exposure", "blur")
+
+CACHE_MODEL = "prefilter"
+
+# 임계값이 바뀌면 캐시된 판정도 무효가 되도록 키에 포함
+_SIGNATURE = (f"edge={PREFILTER_MAX_EDGE};std={PREFILTER_EMPTY_STD};dark={PREFILTER_DARK_MEAN};"
+              f"bright={PREFILTER_BRIGHT_MEAN};clip={PREFILTER_CLIP_FRAC};blur={PREFILTER_BLUR_VAR}")
+
+
+def image_stats(image_path: str, max_edge: int = PREFILTER_MAX_EDGE) -> dict:
+    """판정용 통계 {mean, std, dark_frac, bright_frac, blur_var}"""
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img).convert("L")
+        if max_edge > 0 and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.BILINEAR)
+        g = np.asarray(img, dtype=np.float32)
+
+    if g.shape[0] >= 3 and g.shape[1] >= 3:
+        lap = (g[1:-1, :-2] + g[1:-1, 2:] + g[:-2, 1:-1] + g[2:, 1:-1]
+               - 4.0 * g[1:-1, 1:-1])
+        blur_var = float(lap.var())
+    else:
+        blur_var = 0.0
+
+    return {
+        "mean": float(g.mean()),
+        "std": float(g.std()),
+        "dark_frac": float((g <= 10).mean()),
+        "bright_frac": float((g >= 245).mean()),
+        "blur_var": blur_var,
+    }
+
+
+def judge(stats: dict) -> tuple:
+    """(단계, 사유) — 통과면 (None, "")"""
+    if stats["std"] < PREFILTER_EMPTY_STD:
+        return "blank", f"빈 프레임 (밝기 표준편차 {stats['std']:.1f} < {PREFILTER_EMPTY_STD:g})"
+    if stats["mean"] < PREFILTER_DARK_MEAN or stats["dark_frac"] > PREFILTER_CLIP_FRAC:
+        return "exposure", f"노출 부족 (평균 밝기 {stats['mean']:.0f}, 암부 {stats['dark_frac']:.0%})"
+    if stats["mean"] > PREFILTER_BRIGHT_MEAN or stats["bright_frac"] > PREFILTER_CLIP_FRAC:
+        return "exposure", f"노출 과다 (평균 밝기 {stats['mean']:.0f}, 포화 {stats['bright_frac']:.0%})"
+    if stats["blur_var"] < PREFILTER_BLUR_VAR:
+        return "blur", f"흐림/초점 불량 (라플라시안 분산 {stats['blur_var']:.1f} < {PREFILTER_BLUR_VAR:g})"
+    return None, ""
+
+
+_lock = threading.Lock()
+_stats = {"checked": 0, "cached": 0, "passed": 0, "skipped": 0, "cheap": 0,
+          **{stage: 0 for stage in STAGES}}
+
+
+def _verdict(stage: str, reason: str) -> dict:
+    """
+    skip 단계의 저장용 결과 (classify_image 형식, 사람 확인이 필요하므로 Hold).
+    모델 판정이 아님을 알 수 있도록 단계/사유를 description(→ detail)에 남기고 부위는 unknown
+    """
+    return {
+        "label": NO_DEFECT_LABEL,
+        "confidence": 0.0,
+        "description": f"[사전 필터:{stage}] {reason}",
+        "severity": "C",
+        "location": "unknown",
+        "action": "Hold",
+        "prefilter": stage,
+    }
+
+
+def evaluate(image_path: str, use_cache: bool = True) -> dict:
+    """
+    반환: {"stage": None|"blank"|"exposure"|"blur", "reason": str, "route": "api"|"cheap"|"skip"}
+    skip이면 "result"에 저장용 판정 결과 포함
+    """
+    cache = get_cache() if use_cache else None
+    key, hit = None, None
+    if cache is not None:
+        key = cache.key_for(image_path, CACHE_MODEL, _SIGNATURE)
+        hit = cache.get(key)
+
+    if hit is not None:
+        stage, reason = hit.get("stage"), hit.get("reason", "")
+    else:
+        stage, reason = judge(image_stats(image_path))
+        if cache is not None:
+            cache.put(key, {"stage": stage, "reason": reason})
+
+    route = PREFILTER_ROUTES.get(stage, "api") if stage else "api"
+    with _lock:
+        _stats["checked"] += 1
+        _stats["cached"] += hit is not None
+        if stage:
+            _stats[stage] += 1
+        if route == "skip":
+            _stats["skipped"] += 1
+        elif route == "cheap":
+            _stats["cheap"] += 1
+        else:
+            _stats["passed"] += 1
+
+    out = {"stage": stage, "reason": reason, "route": route}
+    if route == "skip":
+        out["result"] = _verdict(stage, reason)
+    return out
+
+
+def prefilter_report() -> dict:
+    """단계별 판정 수와 전체 API 호출(기본 모델) 중 걸러낸 비율"""
+    with _lock:
+        s = dict(_stats)
+    checked = s["checked"]
+    s["removed_rate"] = (s["skipped"] / checked) if checked else 0.0
+    s["offloaded_rate"] = ((s["skipped"] + s["cheap"]) / checked) if checked else 0.0
+    return s
@@ -0,0 +1,141 @@
+# api/retry.py
+"""
+Vision API 호출용 재시도/속도 제한
+- 오류를 재시도 가능(429, 408, 409, 5xx, 타임아웃, 연결 오류) / 불가로 구분
+- 지수 백오프 + full jitter, Retry-After(-ms) 헤더가 있으면 그 이상 대기
+- 모든 워커가 공유하는 분당 요청 수(RPM) 제한
+- 최종 실패는 ClassificationError로 올려 호출 측이 가짜 결과를 저장하지 않게 함
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from utils.config import API_MAX_RETRIES, API_BACKOFF_BASE, API_BACKOFF_MAX, API_RPM_LIMIT
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ClassificationError(Exception):
+    """분류 실패. 이 예외가 나면 결과를 DB에 저장하지 말 것"""
+
+    def __init__(self, message: str, retryable: bool = False, attempts: int = 1):
+        super().__init__(message)
+        self.retryable = retryable
+        self.attempts = attempts
+
+
+def _status_code(exc):
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
+
+def is_retryable(exc: Exception) -> bool:
+    code = _status_code(exc)
+    if code is not None:
+        return int(code) in RETRYABLE_STATUS
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # openai.APITimeoutError / APIConnectionError 등 (SDK 버전별 클래스 차이 대비)
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after_seconds(exc: Exception):
+    """응답 헤더의 Retry-After(-ms) 값을 초 단위로 반환, 없으면 None"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return max(0.0, float(ms) / 1000.0)
+        except ValueError:
+            pass
+    ra = headers.get("retry-after")
+    if not ra:
+        return None
+    try:
+        return max(0.0, float(ra))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(ra)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
+
+
+class RateLimiter:
+    """
+    분당 요청 수 제한 (모든 스레드 공유).
+    요청 시작 시각을 60/rpm 초 간격으로 배정하고, 429 Retry-After를 받으면
+    전체 워커의 다음 요청을 그 시각 이후로 미룸.
+    """
+
+    def __init__(self, rpm: int = API_RPM_LIMIT):
+        self.rpm = max(0, int(rpm))
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.waited = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if self.rpm:
+                self._next_slot = slot + 60.0 / self.rpm
+            delay = slot - now
+            self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, seconds: float):
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+_limiter = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _limiter
+
+
+def backoff_delay(attempt: int, base: float = API_BACKOFF_BASE, cap: float = API_BACKOFF_MAX) -> float:
+    """attempt(0부터)번째 재시도 전 대기 시간 — full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def call_with_retry(fn, *args, max_retries: int = API_MAX_RETRIES,
+                    limiter: RateLimiter | None = None, **kwargs):
+    """
+    fn(*args, **kwargs)를 재시도 정책에 따라 호출.
+    재시도 불가 오류거나 횟수를 다 쓰면 ClassificationError.
+    """
+    limiter = limiter or _limiter
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except ClassificationError:
+            raise
+        except Exception as e:
+            retryable = is_retryable(e)
+            if not retryable or attempt >= max_retries:
+                raise ClassificationError(
+                    f"{type(e).__name__}: {e}", retryable=retryable, attempts=attempt + 1
+                ) from e
+            delay = backoff_delay(attempt)
+            ra = retry_after_seconds(e)
+            if ra is not None:
+                delay = max(delay, ra)
+                limiter.defer(ra)
+            print(f"[RETRY] {type(e).__name__} (status={_status_code(e)}) "
+                  f"{attempt + 1}/{max_retries}, {delay:.1f}s 후 재시도")
+            time.sleep(delay)
+            attempt += 1
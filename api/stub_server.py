@@ -0,0 +1,174 @@
+# api/stub_server.py
+"""
+오프라인 부하 테스트용 chat-completions 호환 로컬 서버
+
+실행:
+    python -m api.stub_server --port 8765 --latency lognormal:-0.3,0.5 --error-rate 0.05
+앱 연결(.env):
+    CLASSIFIER_BACKEND=local
+    CLASSIFIER_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api.backends import ResponseSimulator, count_images
+from utils.config import (
+    FAKE_LATENCY, FAKE_ERROR_RATE, FAKE_ERROR_STATUS, FAKE_RETRY_AFTER, FAKE_CHUNK_DELAY
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    simulator: ResponseSimulator = None
+    quiet = True
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, req: dict, sim: ResponseSimulator):
+        """SSE(chat.completion.chunk) 응답. 클라이언트가 도중에 끊으면 조용히 종료"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        base = {"id": cid, "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": req.get("model", "stub")}
+        pieces = [{"role": "assistant", "content": ""}] + [
+            {"content": c} for c in sim.chunks_for(count_images(req.get("messages")))
+        ]
+        try:
+            for i, delta in enumerate(pieces):
+                if i:
+                    sim.sleep_chunk()
+                body = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(body, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            body = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self.wfile.write(f"data: {json.dumps(body)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        sim = self.simulator
+        sim.sleep()
+        err = sim.error_for_request()
+        if err:
+            status, headers = err
+            self._send_json(status, {"error": {"message": f"simulated HTTP {status}",
+                                               "type": "stub_error"}}, headers)
+            return
+
+        if req.get("stream"):
+            self._send_stream(req, sim)
+            return
+
+        content = sim.content_for(count_images(req.get("messages")))
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765,
+                simulator: ResponseSimulator | None = None, quiet: bool = True) -> ThreadingHTTPServer:
+    handler = type("StubHandler", (_Handler,), {
+        "simulator": simulator or ResponseSimulator(), "quiet": quiet,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0,
+                    simulator: ResponseSimulator | None = None) -> ThreadingHTTPServer:
+    """백그라운드 스레드에서 서버 시작 (port=0이면 빈 포트). 종료는 server.shutdown()"""
+    server = make_server(host, port, simulator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="chat-completions 호환 로컬 스텁 서버")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", default=FAKE_LATENCY,
+                    help="fixed:0.5 | uniform:a,b | normal:mu,sd | lognormal:mu,sd | exponential:mean")
+    ap.add_argument("--error-rate", type=float, default=FAKE_ERROR_RATE)
+    ap.add_argument("--error-status", default=",".join(str(s) for s in FAKE_ERROR_STATUS))
+    ap.add_argument("--retry-after", type=float, default=FAKE_RETRY_AFTER)
+    ap.add_argument("--responses", default=None, help="응답 후보 JSON 파일 (오브젝트 배열)")
+    ap.add_argument("--chunk-delay", type=float, default=FAKE_CHUNK_DELAY, help="스트리밍 조각 간격(초)")
+    ap.add_argument("--trailing-text", default="", help="스트리밍 시 JSON 뒤에 붙일 꼬리 텍스트")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args()
+
+    canned = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+    sim = ResponseSimulator(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=[int(s) for s in args.error_status.split(",") if s.strip()],
+        retry_after=args.retry_after,
+        canned=canned,
+        chunk_delay=args.chunk_delay,
+        trailing_text=args.trailing_text,
+    )
+    server = make_server(args.host, args.port, sim, quiet=not args.verbose)
+    print(f"[STUB] http://{args.host}:{args.port}/v1  latency={args.latency} error_rate={args.error_rate}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[STUB] requests={sim.requests} errors={sim.errors}")
+
+
+if __name__ == "__main__":
+    main()
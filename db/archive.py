@@ -0,0 +1,310 @@
+# db/archive.py
+"""
+기간별 아카이브 DB
+
+- 끝난 기간(ARCHIVE_PERIOD = month/year)의 행을 ARCHIVE_DIR/results_<YYYY-MM|YYYY>.db로 옮기고 본 DB에서 삭제
+  → 본 DB에는 최근 ARCHIVE_HOT_PERIODS개 기간만 남아 최근 데이터 조회가 오래된 데이터 양과 무관
+- 아카이브 파일은 평평한 results 테이블 하나 (범주형 값 그대로, id 유지) — 앱 없이도 열어 볼 수 있음
+- 조회(db.db.search_results 등)는 날짜 범위에 겹치는 파일만 필요할 때 ATTACH
+- 이동은 아카이브에 복사·커밋 → 본 DB에서 삭제 순서라, 중간에 끊겨도 다시 실행하면 이어서 진행
+- 일별 집계(results_daily)는 아카이브로 옮긴 행도 계속 포함 (보존 기간이 지나 삭제한 파일만 뺌)
+- 보존: ARCHIVE_RETENTION_PERIODS보다 오래된 아카이브 파일 삭제, 이동한 파일은 VACUUM으로 압축
+
+    python -m db.archive --status
+    python -m db.archive --roll
+"""
+import calendar
+import os
+import re
+from datetime import datetime, timezone
+
+from utils.config import ARCHIVE_DIR, ARCHIVE_PERIOD, ARCHIVE_HOT_PERIODS, ARCHIVE_RETENTION_PERIODS
+from db.migrations import _rollup_key, has_table, rollup_counts_sql
+
+MAX_ATTACHED = 8   # SQLite 기본 ATTACH 한도(10) 안에서 여유를 둠
+
+COLUMNS = ("id, file_name, image_path, image_hash, defect_type, severity, location, "
+           "score, detail, action, ts, phash, ts_epoch")
+_FILE_RE = re.compile(r"^results_(\d{4})(?:-(\d{2}))?\.db$")
+
+
+class Partition:
+    """아카이브 파일 하나: ts_epoch 범위 [lo, hi)"""
+
+    def __init__(self, key: str, path: str, lo: int, hi: int):
+        self.key = key
+        self.path = path
+        self.lo = lo
+        self.hi = hi
+
+    @property
+    def schema(self) -> str:
+        return "arc_" + self.key.replace("-", "_")
+
+    def __repr__(self):
+        return f"Partition({self.key!r})"
+
+
+# -------- 기간 계산 (ts_epoch = 로컬 시각을 UTC로 간주한 초) --------
+
+def _bounds(year: int, month: int | None) -> tuple:
+    if month is None:
+        return calendar.timegm((year, 1, 1, 0, 0, 0)), calendar.timegm((year + 1, 1, 1, 0, 0, 0))
+    ny, nm = (year + 1, 1) if month == 12 else (year, month + 1)
+    return calendar.timegm((year, month, 1, 0, 0, 0)), calendar.timegm((ny, nm, 1, 0, 0, 0))
+
+
+def period_of(epoch: int, period: str = ARCHIVE_PERIOD) -> tuple:
+    """(key, lo, hi) — epoch가 속한 기간"""
+    d = datetime.fromtimestamp(int(epoch), timezone.utc)
+    if period == "year":
+        return f"{d.year:04d}", *_bounds(d.year, None)
+    return f"{d.year:04d}-{d.month:02d}", *_bounds(d.year, d.month)
+
+
+def hot_cutoff(period: str = ARCHIVE_PERIOD, hot_periods: int = ARCHIVE_HOT_PERIODS, now=None) -> int:
+    """이 ts_epoch보다 이전 행은 아카이브 대상 (현재 기간 포함 최근 hot_periods개 기간은 본 DB에 유지)"""
+    now = now or datetime.now()
+    y, m = now.year, now.month
+    if period == "year":
+        return _bounds(y - (hot_periods - 1), None)[0]
+    k = y * 12 + (m - 1) - (hot_periods - 1)
+    return _bounds(k // 12, k % 12 + 1)[0]
+
+
+def partition_path(key: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, f"results_{key}.db")
+
+
+def list_partitions(archive_dir: str = ARCHIVE_DIR) -> list:
+    """아카이브 파일 목록 (오래된 순)"""
+    if not os.path.isdir(archive_dir):
+        return []
+    parts = []
+    for name in os.listdir(archive_dir):
+        m = _FILE_RE.match(name)
+        if not m:
+            continue
+        year, month = int(m.group(1)), (int(m.group(2)) if m.group(2) else None)
+        lo, hi = _bounds(year, month)
+        parts.append(Partition(name[len("results_"):-len(".db")], os.path.join(archive_dir, name), lo, hi))
+    parts.sort(key=lambda p: (p.lo, p.hi))
+    return parts
+
+
+def partitions_for(lo: int | None = None, hi: int | None = None, archive_dir: str = ARCHIVE_DIR) -> list:
+    """ts_epoch 범위 [lo, hi)와 겹치는 아카이브만 (None = 제한 없음)"""
+    return [p for p in list_partitions(archive_dir)
+            if (lo is None or p.hi > lo) and (hi is None or p.lo < hi)]
+
+
+# -------- ATTACH 관리 --------
+
+def attached(conn) -> list:
+    """현재 연결에 붙어 있는 아카이브 스키마 이름 (붙인 순서)"""
+    return [r[1] for r in conn.execute("PRAGMA database_list") if r[1].startswith("arc_")]
+
+
+def attach(conn, part: Partition) -> str:
+    """part를 연결에 붙이고 스키마 이름 반환 (이미 붙어 있으면 그대로, 한도를 넘으면 먼저 붙인 것부터 뗌)"""
+    names = attached(conn)
+    if part.schema in names:
+        return part.schema
+    for name in names[:max(0, len(names) - MAX_ATTACHED + 1)]:
+        conn.execute(f"DETACH DATABASE {name}")
+    conn.execute(f"ATTACH DATABASE ? AS {part.schema}", (part.path,))
+    return part.schema
+
+
+def detach_all(conn):
+    for name in attached(conn):
+        conn.execute(f"DETACH DATABASE {name}")
+
+
+def union_view(conn, lo: int | None = None, hi: int | None = None, name: str = "results_all") -> list:
+    """
+    본 DB + 범위에 겹치는 아카이브를 합친 TEMP 뷰 temp.{name} 생성 (리포트/임시 분석용)
+    겹치는 아카이브가 MAX_ATTACHED개를 넘으면 ValueError — 범위를 좁혀서 호출
+    반환: 포함된 Partition 목록
+    """
+    parts = partitions_for(lo, hi)
+    if len(parts) > MAX_ATTACHED:
+        raise ValueError(f"아카이브 {len(parts)}개는 한 번에 붙일 수 없습니다 (최대 {MAX_ATTACHED}개)")
+    selects = [f"SELECT {COLUMNS} FROM main.results"]
+    for p in parts:
+        selects.append(f"SELECT {COLUMNS} FROM {attach(conn, p)}.results")
+    conn.execute(f"DROP VIEW IF EXISTS temp.{name}")
+    conn.execute(f"CREATE TEMP VIEW {name} AS " + " UNION ALL ".join(selects))
+    return parts
+
+
+# -------- 이동 / 보존 --------
+
+def _ensure_archive_schema(conn, schema: str):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.results (
+            id INTEGER PRIMARY KEY,
+            file_name TEXT, image_path TEXT, image_hash TEXT,
+            defect_type TEXT, severity TEXT, location TEXT,
+            score REAL, detail TEXT, action TEXT, ts TEXT, phash INTEGER, ts_epoch INTEGER
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_results_ts_epoch ON results(ts_epoch)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_results_image_path ON results(image_path)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_results_image_hash ON results(image_hash)")
+    conn.commit()
+
+
+def add_rollup_counts(conn, part: Partition, sign: int = 1):
+    """아카이브 파일의 행 수를 일별 집계에 더하거나(sign=1) 뺌(sign=-1). 커밋은 호출한 쪽에서"""
+    schema = attach(conn, part)
+    conn.execute(f"""
+        INSERT INTO main.results_daily (day, defect_type, severity, location, action, cnt)
+        SELECT {_rollup_key("r")}, {int(sign)} * COUNT(*) FROM {schema}.results r
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt
+    """)
+
+
+def rollup_counts(conn, part: Partition) -> list:
+    """아카이브 파일의 일별 집계 [(day, defect_type, severity, location, action, cnt)] (쓰기 없이 읽기만)"""
+    schema = attach(conn, part)
+    return conn.execute(f"""
+        SELECT {_rollup_key("r")}, COUNT(*) FROM {schema}.results r
+        GROUP BY 1, 2, 3, 4, 5
+    """).fetchall()
+
+
+def remove_rows(conn, part: Partition, ids) -> set:
+    """
+    part에서 ids 행을 삭제하고 일별 집계에서 뺌. 반환: 실제로 삭제한 id
+    (ATTACH가 필요하므로 트랜잭션 시작 전에 호출, 커밋은 호출한 쪽에서)
+    """
+    schema = attach(conn, part)
+    ids = list(ids)
+    removed = set()
+    for i in range(0, len(ids), 500):
+        part_ids = ids[i:i + 500]
+        marks = ",".join(["?"] * len(part_ids))
+        conn.execute(f"""
+            INSERT INTO main.results_daily (day, defect_type, severity, location, action, cnt)
+            SELECT {_rollup_key("r")}, -COUNT(*) FROM {schema}.results r WHERE r.id IN ({marks})
+            GROUP BY 1, 2, 3, 4, 5
+            ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt
+        """, part_ids)
+        removed.update(rid for (rid,) in conn.execute(
+            f"SELECT id FROM {schema}.results WHERE id IN ({marks})", part_ids
+        ))
+        conn.execute(f"DELETE FROM {schema}.results WHERE id IN ({marks})", part_ids)
+    return removed
+
+
+def _move(conn, part: Partition) -> int:
+    schema = attach(conn, part)
+    _ensure_archive_schema(conn, schema)
+    rng = (part.lo, part.hi)
+    # 1) 아카이브에 복사 (다시 실행해도 같은 id는 덮어씀)
+    with conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO {schema}.results ({COLUMNS}) "
+            f"SELECT {COLUMNS} FROM main.results WHERE ts_epoch >= ? AND ts_epoch < ?", rng
+        )
+    # 2) 아카이브에 들어간 행만 본 DB에서 삭제. 삭제 트리거가 빼는 집계를 미리 더해 두어 합계 유지
+    moved = (f"ts_epoch >= ? AND ts_epoch < ? "
+             f"AND id IN (SELECT id FROM {schema}.results WHERE ts_epoch >= ? AND ts_epoch < ?)")
+    with conn:
+        conn.execute(f"""
+            INSERT INTO main.results_daily (day, defect_type, severity, location, action, cnt)
+            {rollup_counts_sql("main.results_data", moved)}
+            ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt
+        """, rng + rng)
+        n = conn.execute(f"DELETE FROM main.results_data WHERE {moved}", rng + rng).rowcount
+    return n
+
+
+def roll(conn, period: str = ARCHIVE_PERIOD, hot_periods: int = ARCHIVE_HOT_PERIODS,
+         archive_dir: str = ARCHIVE_DIR, compact: bool = True, now=None) -> list:
+    """
+    hot_cutoff 이전 행을 기간별 아카이브로 이동. 반환: [(key, 이동한 행 수), ...]
+    compact=True면 이동한 아카이브 파일을 VACUUM (본 DB의 빈 페이지는 이후 저장에 재사용)
+    """
+    if has_table(conn, "results_legacy"):
+        # v7 행 복사 중에는 뷰 results에 아직 안 옮긴 행이 섞여 있어 옮길 수 없음 (다음 실행 때 진행)
+        print("[ARCHIVE] DB 변환(v7 행 복사)이 끝나지 않아 아카이브를 건너뜀")
+        return []
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = hot_cutoff(period, hot_periods, now)
+    done = []
+    while True:
+        row = conn.execute("SELECT MIN(ts_epoch) FROM results_data WHERE ts_epoch < ?", (cutoff,)).fetchone()
+        if row[0] is None:
+            break
+        key, lo, hi = period_of(row[0], period)
+        part = Partition(key, partition_path(key, archive_dir), lo, hi)
+        n = _move(conn, part)
+        if compact:
+            conn.execute(f"VACUUM {part.schema}")
+        done.append((key, n))
+        print(f"[ARCHIVE] {key}: {n}행 → {part.path}")
+    detach_all(conn)
+    return done
+
+
+def apply_retention(conn, retention_periods: int = ARCHIVE_RETENTION_PERIODS, period: str = ARCHIVE_PERIOD,
+                    archive_dir: str = ARCHIVE_DIR, now=None) -> list:
+    """보존 기간(최근 retention_periods개 기간)보다 오래된 아카이브 파일 삭제. 0이면 아무것도 지우지 않음"""
+    if retention_periods <= 0:
+        return []
+    cutoff = hot_cutoff(period, retention_periods, now)
+    removed = []
+    for part in list_partitions(archive_dir):
+        if part.hi > cutoff:
+            continue
+        with conn:
+            add_rollup_counts(conn, part, -1)
+        conn.execute(f"DETACH DATABASE {part.schema}")
+        os.remove(part.path)
+        removed.append(part.key)
+        print(f"[ARCHIVE] 보존 기간 경과, 삭제: {part.path}")
+    return removed
+
+
+def status(conn, archive_dir: str = ARCHIVE_DIR) -> dict:
+    parts = []
+    for p in list_partitions(archive_dir):
+        schema = attach(conn, p)
+        n = conn.execute(f"SELECT COUNT(*) FROM {schema}.results").fetchone()[0]
+        parts.append((p.key, n, os.path.getsize(p.path)))
+    detach_all(conn)
+    return {
+        "archive_dir": archive_dir,
+        "period": ARCHIVE_PERIOD,
+        "hot_rows": conn.execute("SELECT COUNT(*) FROM results_data").fetchone()[0],
+        "hot_since": datetime.fromtimestamp(hot_cutoff(), timezone.utc).strftime("%Y-%m-%d"),
+        "partitions": parts,
+    }
+
+
+def main():
+    import argparse
+    from db.db import get_db_path, archive_old_results, get_connection, ensure_schema
+
+    ap = argparse.ArgumentParser(description="기간별 아카이브 DB")
+    ap.add_argument("--status", action="store_true", help="아카이브 상태만 출력")
+    ap.add_argument("--roll", action="store_true", help="끝난 기간을 아카이브로 이동하고 보존 정책 적용")
+    ap.add_argument("--vacuum", action="store_true", help="이동 후 본 DB도 VACUUM (쓰기 잠금, 오래 걸릴 수 있음)")
+    args = ap.parse_args()
+
+    print("[DB PATH]", get_db_path())
+    ensure_schema()
+    conn = get_connection()
+    if args.roll and not args.status:
+        archive_old_results()
+        if args.vacuum:
+            conn.execute("VACUUM")
+    for k, v in status(conn).items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,136 @@
 # db/db.py
+import os
 import sqlite3
 import hashlib
+import base64
+import json
+import threading
+import calendar
+import heapq
+import time
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
-from utils.config import DB_PATH as _DB_PATH, DEFECT_LABELS
+from datetime import datetime, date, timedelta
+from utils.config import (
+    DB_PATH as _DB_PATH, DEFECT_LABELS,
+    DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_SYNCHRONOUS, DB_READ_RETRIES, DB_READ_RETRY_MS,
+    DB_WRITE_CHUNK, DB_HASH_WORKERS, RESULTS_PAGE_SIZE, FILE_HASH_CACHE
+)
+from utils.phash import dhash, to_signed, BKTree
+from db.migrations import (migrate, has_table, backfill_done, rebuild_daily_rollup, copy_legacy_rows, CATEGORY_TABLES,
+                           _EPOCH_OR_TS)
+from db import archive
 
 DB_PATH = Path(_DB_PATH).resolve()
 
 def get_db_path() -> str:
     return str(DB_PATH)
 
+# -------- 연결 관리 --------
+# 스레드마다 DB 파일별 연결 하나를 열어 재사용 (sqlite3 연결은 만든 스레드에서만 사용 가능)
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def _open(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT_MS / 1000.0)
+    conn.execute("PRAGMA journal_mode=WAL")   # 읽기와 쓰기가 서로 막지 않음, 커밋당 fsync 감소
+    conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size={-int(DB_CACHE_SIZE_KB)}")   # 음수 = KiB 단위
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def get_connection(db_path: str | None = None) -> sqlite3.Connection:
+    """
+    현재 스레드 전용 연결 (없으면 생성). 닫지 말고 재사용할 것.
+    쓰기는 `with conn:` 블록으로 묶으면 성공 시 커밋, 예외 시 롤백.
+    """
+    path = db_path or str(DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = _open(path)
+    return conn
+
+def close_connection(db_path: str | None = None):
+    """현재 스레드의 연결 닫기 (db_path=None이면 전부). 스레드 종료 전 정리용"""
+    for conns in (getattr(_local, "conns", None) or {}, getattr(_local, "ro_conns", None) or {}):
+        for path in [db_path] if db_path else list(conns):
+            conn = conns.pop(path, None)
+            if conn is not None:
+                conn.close()
+
 def _connect():
-    return sqlite3.connect(str(DB_PATH))
+    return get_connection()
+
+# -------- 읽기 전용 스냅샷 (대시보드 등) --------
+# WAL에서 읽기 트랜잭션은 시작 시점의 스냅샷을 보며 쓰기를 막지 않음.
+# 읽기 전용 URI 연결이라 실수로 쓰기/잠금을 잡지 않고, busy면 직접 재시도하며 횟수를 셈
+_read_lock = threading.Lock()
+_read_stats = {"reads": 0, "busy": 0, "retries": 0, "failed": 0, "wait_ms": 0.0}
+
+def _open_readonly(db_path: str) -> sqlite3.Connection:
+    uri = "file:" + quote(os.path.abspath(db_path)) + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=0, isolation_level=None)
+    conn.execute(f"PRAGMA cache_size={-int(DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    conn.execute("PRAGMA busy_timeout=0")   # 대기는 read_snapshot의 재시도 루프에서 (횟수 집계용)
+    return conn
+
+def _is_busy(e: Exception) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+def read_snapshot(fn, db_path: str | None = None, retries: int = DB_READ_RETRIES):
+    """
+    fn(conn)을 읽기 전용 연결의 한 읽기 트랜잭션 안에서 실행 (fn 안의 쿼리는 모두 같은 스냅샷).
+    busy/locked면 트랜잭션을 버리고 DB_READ_RETRY_MS씩 늘려 가며 최대 retries번 다시 실행.
+    스레드마다 연결 하나를 재사용 (연결은 닫지 말 것)
+    """
+    path = str(Path(db_path).resolve()) if db_path else str(DB_PATH)
+    conns = getattr(_local, "ro_conns", None)
+    if conns is None:
+        conns = _local.ro_conns = {}
+
+    attempt = 0
+    while True:
+        try:
+            conn = conns.get(path)
+            if conn is None:
+                conn = conns[path] = _open_readonly(path)   # 여는 중 스키마를 읽으므로 이것도 재시도 대상
+            conn.execute("BEGIN")
+            try:
+                result = fn(conn)
+            finally:
+                conn.execute("COMMIT")
+            with _read_lock:
+                _read_stats["reads"] += 1
+            return result
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            with _read_lock:
+                _read_stats["busy"] += 1
+                if attempt >= retries:
+                    _read_stats["failed"] += 1
+            if attempt >= retries:
+                raise
+            delay = min(DB_READ_RETRY_MS * (attempt + 1), 1000) / 1000.0
+            time.sleep(delay)
+            attempt += 1
+            with _read_lock:
+                _read_stats["retries"] += 1
+                _read_stats["wait_ms"] += delay * 1000
+
+def read_report() -> dict:
+    """read_snapshot 누적 집계: 성공한 읽기, busy를 만난 횟수, 재시도, 포기, 대기 시간(ms)"""
+    with _read_lock:
+        return dict(_read_stats)
 
 def _file_sha256(fpath: str) -> str:
     h = hashlib.sha256()
@@ -20,37 +139,211 @@ def _file_sha256(fpath: str) -> str:
             h.update(chunk)
     return h.hexdigest()
 
-def ensure_schema():
+def ts_to_epoch(value) -> int:
+    """
+    ts 문자열('YYYY-MM-DD[ HH:MM:SS]')/date/datetime → ts_epoch 값.
+    ts_epoch는 로컬 시각을 UTC로 간주한 초 (migrations._TS_EPOCH_SQL과 같은 규칙)
+    """
+    if isinstance(value, str):
+        v = value.strip().replace("T", " ")
+        value = datetime.strptime(v[:19], "%Y-%m-%d %H:%M:%S") if len(v) > 10 else datetime.strptime(v[:10], "%Y-%m-%d")
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return calendar.timegm(value.timetuple())
+
+def days_ago_epoch(days: int) -> int:
+    """오늘(로컬) 0시 기준 days일 전 0시의 ts_epoch — date(ts) >= 오늘-days 조건의 하한"""
+    return ts_to_epoch(date.today() - timedelta(days=int(days)))
+
+def image_phash(fpath: str):
+    """지각 해시(dHash, 부호 있는 64bit). 이미지로 못 읽으면 None"""
+    try:
+        return to_signed(dhash(fpath))
+    except Exception:
+        return None
+
+def ensure_schema(force: bool = False):
     """
     results (
         id, file_name, image_path, image_hash,
-        defect_type, severity, location, score, detail, action, ts
+        defect_type, severity, location, score, detail, action, ts, phash, ts_epoch
     )
+    results는 조회용 뷰, 실제 행은 results_data (범주형 컬럼은 사전 테이블의 정수 id)
+    db/migrations.py의 단계를 user_version까지 적용. 프로세스당 한 번만 실행 (force=True면 다시 확인)
+    앱보다 새 버전의 DB면 SchemaVersionError
     """
+    global _schema_ready
+    if _schema_ready and not force:
+        return
+    with _schema_lock:
+        if _schema_ready and not force:
+            return
+        migrate(_connect())
+        _schema_ready = True
+
+
+def rebuild_rollups():
+    """일별 집계(results_daily)를 results + 아카이브에서 다시 계산 (집계가 어긋났을 때 복구용)"""
+    ensure_schema()
     conn = _connect()
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            file_name   TEXT,
-            image_path  TEXT NOT NULL,
-            image_hash  TEXT,
-            defect_type TEXT,
-            severity    TEXT,
-            location    TEXT,
-            score       REAL,
-            detail      TEXT,
-            action      TEXT,
-            ts          TEXT DEFAULT (datetime('now','localtime'))
+    # 아카이브 집계는 트랜잭션 밖에서 파일마다 읽어 둠 (트랜잭션 안에서는 ATTACH/DETACH를 못 해 MAX_ATTACHED개가 한도)
+    archived = [row for part in archive.list_partitions() for row in archive.rollup_counts(conn, part)]
+    archive.detach_all(conn)
+    rebuild_daily_rollup(conn, archived)
+
+def archive_old_results() -> list:
+    """끝난 기간의 행을 아카이브 DB로 옮기고 보존 정책 적용 (db/archive.py). 반환: [(기간, 행 수), ...]"""
+    ensure_schema()
+    conn = _connect()
+    moved = archive.roll(conn)
+    archive.apply_retention(conn)
+    archive.detach_all(conn)
+    return moved
+
+def archive_in_background():
+    """데몬 스레드에서 archive_old_results 실행 (스레드 전용 연결 사용)"""
+    def _run():
+        try:
+            archive_old_results()
+        except Exception as e:
+            print("[ARCHIVE] 오류:", e)
+
+    threading.Thread(target=_run, name="db-archive", daemon=True).start()
+
+# -------- 파일 지문 캐시 --------
+# (절대 경로, 크기, mtime_ns, inode)가 저장된 값과 같으면 파일을 읽지 않고 sha256 재사용
+_fp_lock = threading.Lock()
+_fp_stats = {"hits": 0, "misses": 0, "bytes_read": 0, "bytes_skipped": 0}
+
+def _stat_key(fpath: str) -> tuple:
+    path = os.path.abspath(fpath)
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns, st.st_ino
+
+def _cached_fingerprints(conn, keys: list) -> dict:
+    """{절대 경로: sha256} — stat 값이 그대로인 항목만"""
+    stored = {}
+    paths = list({k[0] for k in keys})
+    for i in range(0, len(paths), 500):
+        part = paths[i:i + 500]
+        q = (f"SELECT path, size, mtime_ns, inode, sha256 FROM file_fingerprints WHERE path IN "
+             f"({','.join(['?'] * len(part))})")
+        for path, size, mtime_ns, inode, sha in conn.execute(q, part):
+            stored[path] = ((path, size, mtime_ns, inode), sha)
+    return {k[0]: stored[k[0]][1] for k in keys if k[0] in stored and stored[k[0]][0] == k}
+
+def _store_fingerprints(conn, rows: list):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO file_fingerprints (path, size, mtime_ns, inode, sha256, checked_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows
         )
-    """)
-    # 인덱스
-    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_image_path ON results(image_path)")
-    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_image_hash ON results(image_hash)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_results_type_sev_ts ON results(defect_type, severity, ts)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_results_location ON results(location)")
-    conn.commit()
-    conn.close()
+
+def file_sha256_many(paths, workers: int = DB_HASH_WORKERS) -> dict:
+    """
+    {입력 경로: sha256 또는 예외}
+    stat 값이 바뀌지 않은 파일은 캐시에서, 처음 보거나 바뀐 파일만 스레드 풀에서 해시
+    """
+    out, keys = {}, {}
+    for p in dict.fromkeys(paths):
+        try:
+            keys[p] = _stat_key(p)
+        except OSError as e:
+            out[p] = e
+
+    conn = None
+    cached = {}
+    if FILE_HASH_CACHE and keys:
+        ensure_schema()
+        conn = _connect()
+        cached = _cached_fingerprints(conn, list(keys.values()))
+
+    cold = [p for p, k in keys.items() if k[0] not in cached]
+    hits = [p for p, k in keys.items() if k[0] in cached]
+    for p in hits:
+        out[p] = cached[keys[p][0]]
+
+    def _one(p):
+        try:
+            return p, _file_sha256(p)
+        except Exception as e:
+            return p, e
+    if workers <= 1 or len(cold) <= 1:
+        done = [_one(p) for p in cold]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_one, cold))
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fresh = []
+    for p, h in done:
+        out[p] = h
+        if not isinstance(h, Exception):
+            fresh.append((*keys[p], h, now))
+    if conn is not None and fresh:
+        # 저장은 저장 스레드에서 (기다리지 않음, 실패해도 다음에 다시 해시할 뿐)
+        from db.writer import run_write
+        run_write(lambda c: _store_fingerprints(c, fresh))
+
+    with _fp_lock:
+        _fp_stats["hits"] += len(hits)
+        _fp_stats["misses"] += len(cold)
+        _fp_stats["bytes_skipped"] += sum(keys[p][1] for p in hits)
+        _fp_stats["bytes_read"] += sum(f[1] for f in fresh)
+    return out
+
+def file_sha256(fpath: str) -> str:
+    """지문 캐시를 거치는 sha256 (파일을 못 읽으면 OSError)"""
+    h = file_sha256_many([fpath], workers=1)[fpath]
+    if isinstance(h, Exception):
+        raise h
+    return h
+
+def fingerprint_report() -> dict:
+    """지문 캐시 적중률과 실제로 읽은/건너뛴 바이트 수"""
+    with _fp_lock:
+        s = dict(_fp_stats)
+    n = s["hits"] + s["misses"]
+    s["hit_rate"] = (s["hits"] / n) if n else 0.0
+    return s
+
+# -------- 범주형 값 사전 --------
+# defect_type/severity/location/action 값 → 사전 테이블 id (종류가 적어 프로세스 메모리에 캐시)
+_cat_lock = threading.Lock()
+_cat_ids = {col: {} for col in CATEGORY_TABLES}
+
+def _category_ids(conn, column: str, values) -> dict:
+    """{값: id} — 처음 보는 값은 사전 테이블에 추가 (_write_chunk에서 저장 스레드가 호출, 쓰기 트랜잭션 전에 따로 커밋)"""
+    cache = _cat_ids[column]
+    values = {v for v in values if v is not None}
+    with _cat_lock:
+        new = [v for v in values if v not in cache]
+    if new:
+        table = CATEGORY_TABLES[column]
+        with conn:
+            conn.executemany(f"INSERT OR IGNORE INTO {table} (value) VALUES (?)", [(v,) for v in new])
+        found = {}
+        for i in range(0, len(new), 500):
+            part = new[i:i + 500]
+            found.update(conn.execute(
+                f"SELECT value, id FROM {table} WHERE value IN ({','.join(['?'] * len(part))})", part
+            ))
+        with _cat_lock:
+            cache.update(found)
+    with _cat_lock:
+        return {v: cache[v] for v in values}
+
+def _encode_categories(conn, records: list):
+    """레코드 dict마다 {컬럼}_id 키를 채움"""
+    for col in CATEGORY_TABLES:
+        ids = _category_ids(conn, col, (r.get(col) for r in records))
+        for r in records:
+            r[col + "_id"] = ids.get(r.get(col))
+
+def _submit_and_wait(record: dict, upsert: bool) -> tuple:
+    """저장 전용 스레드(db/writer.py)를 거쳐 저장하고 커밋될 때까지 대기 → (outcome, id)"""
+    from db.writer import submit_result   # db.writer가 이 모듈을 import하므로 호출 시점에
+    return submit_result(record, upsert, urgent=True).result()
 
 def insert_result(
     image_path: str,
@@ -61,30 +354,14 @@ def insert_result(
     detail: str = "",
     action: str = "Hold",
     ts: str | None = None,
+    phash: int | None = None,
 ) -> bool:
-    ensure_schema()
-    ihash = _file_sha256(image_path)
-    file_name = Path(image_path).name
-    ts_val = ts or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # 라벨 검증
-    if defect_type not in DEFECT_LABELS:
-        defect_type = DEFECT_LABELS[0]
-
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT OR IGNORE INTO results
-        (file_name, image_path, image_hash, defect_type, severity, location, score, detail, action, ts)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        file_name, image_path, ihash,
-        defect_type, severity, location, float(score), detail, action, ts_val
-    ))
-    conn.commit()
-    ok = (cur.rowcount == 1)
-    conn.close()
-    return ok
+    """새 행이면 True, 같은 해시/경로가 이미 있으면 False. 기다리지 않으려면 db.writer.submit_result"""
+    outcome, _ = _submit_and_wait(dict(
+        image_path=image_path, defect_type=defect_type, severity=severity, location=location,
+        score=score, detail=detail, action=action, ts=ts, phash=phash,
+    ), upsert=False)
+    return outcome == "inserted"
 
 def upsert_result(
     image_path: str,
@@ -95,93 +372,588 @@ def upsert_result(
     detail: str = "",
     action: str = "Hold",
     ts: str | None = None,
+    phash: int | None = None,
 ) -> int:
+    """같은 이미지 해시(없으면 같은 경로)의 행을 갱신하거나 새로 저장 → 행 id"""
+    _, rid = _submit_and_wait(dict(
+        image_path=image_path, defect_type=defect_type, severity=severity, location=location,
+        score=score, detail=detail, action=action, ts=ts, phash=phash,
+    ), upsert=True)
+    return rid
+
+# -------- 일괄 저장 --------
+_BULK_FIELDS = ("defect_type_id", "severity_id", "location_id", "score", "detail", "action_id")
+
+def _prepare_record(rec: dict) -> dict:
+    """해시/파일명/시각/라벨 보정 (스레드 풀에서 실행)"""
+    image_path = rec["image_path"]
+    out = {
+        "image_path": image_path,
+        "file_name": Path(image_path).name,
+        "image_hash": rec.get("image_hash") or file_sha256(image_path),
+        "defect_type": rec.get("defect_type"),
+        "severity": rec.get("severity"),
+        "location": rec.get("location"),
+        "score": float(rec.get("score") or 0.0),
+        "detail": rec.get("detail", ""),
+        "action": rec.get("action", "Hold"),
+        "ts": rec.get("ts") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "phash": rec["phash"] if rec.get("phash") is not None else image_phash(image_path),
+    }
+    out["ts_epoch"] = ts_to_epoch(out["ts"])
+    if out["defect_type"] not in DEFECT_LABELS:
+        out["defect_type"] = DEFECT_LABELS[0]
+    return out
+
+def _prepare_many(records: list, workers: int) -> list:
+    """[(입력 순번, 보정된 레코드 또는 예외), ...] — 파일 해시는 지문 캐시 + 병렬 계산"""
+    hashes = file_sha256_many([r["image_path"] for r in records if not r.get("image_hash")], workers)
+
+    def _one(item):
+        i, rec = item
+        h = hashes.get(rec["image_path"]) if not rec.get("image_hash") else None
+        if isinstance(h, Exception):
+            return i, h
+        try:
+            return i, _prepare_record({**rec, "image_hash": h} if h else rec)
+        except Exception as e:
+            return i, e
+    items = list(enumerate(records))
+    if workers <= 1 or len(items) <= 1:
+        return [_one(it) for it in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_one, items))
+
+def _existing_rows(conn, column: str, values, archived: bool = True) -> dict:
+    """
+    {값: (id, image_hash, image_path, 아카이브 Partition 또는 None)} — SQLite 변수 개수 제한 안에서 나눠 조회
+    archived=True면 본 DB에 없는 값은 아카이브에서도 찾음 (ATTACH하므로 트랜잭션 밖에서 호출)
+    """
+    values = list(set(values))
+    found = {}
+
+    def scan(table, part, rest):
+        for i in range(0, len(rest), 500):
+            chunk = rest[i:i + 500]
+            q = (f"SELECT id, image_hash, image_path FROM {table} WHERE {column} IN "
+                 f"({','.join(['?'] * len(chunk))})")
+            for rid, ihash, ipath in conn.execute(q, chunk):
+                found.setdefault(ihash if column == "image_hash" else ipath, (rid, ihash, ipath, part))
+
+    scan("results_data", None, values)
+    if has_table(conn, "results_legacy"):   # v7 행 복사 중: 아직 안 옮긴 행 (수정 전에 copy_legacy_rows로 옮김)
+        scan("results_legacy", None, [v for v in values if v not in found])
+    if archived:
+        for part in archive.list_partitions():
+            rest = [v for v in values if v not in found]
+            if not rest:
+                break
+            scan(archive.attach(conn, part) + ".results", part, rest)
+    return found
+
+def _write_chunk(conn, chunk: list, upsert: bool, outcomes: list):
+    """chunk = [(순번, 레코드)] 를 한 트랜잭션으로 저장하고 outcomes[순번]을 채움"""
+    by_hash = _existing_rows(conn, "image_hash", [r["image_hash"] for _, r in chunk])
+    by_path = _existing_rows(conn, "image_path", [r["image_path"] for _, r in chunk])
+
+    inserts, updates, seen = [], [], {}
+    for i, r in chunk:
+        prev = by_hash.get(r["image_hash"]) or by_path.get(r["image_path"])
+        if r["image_hash"] in seen or r["image_path"] in seen:
+            # 같은 chunk 안에서 앞 레코드와 중복: insert는 무시, upsert는 나중 값으로 덮어씀
+            j = seen.get(r["image_hash"], seen.get(r["image_path"]))
+            if upsert:
+                target = inserts if outcomes[j] == "inserted" else updates
+                for k, (jj, rr) in enumerate(target):
+                    if jj == j:
+                        target[k] = (j, {**r, "_id": rr.get("_id"), "_part": rr.get("_part")})
+                outcomes[i] = "updated"
+            else:
+                outcomes[i] = "duplicate"
+            continue
+        seen[r["image_hash"]] = seen[r["image_path"]] = i
+        if prev is None:
+            inserts.append((i, r))
+            outcomes[i] = "inserted"
+        elif upsert:
+            updates.append((i, {**r, "_id": prev[0], "_part": prev[3]}))
+            outcomes[i] = "updated"
+        else:
+            outcomes[i] = "duplicate"
+
+    _encode_categories(conn, [r for _, r in inserts + updates])
+    # 아카이브에 있는 행의 upsert: 아카이브에서 빼고 같은 id로 본 DB에 다시 저장 (집계는 트리거로 +1)
+    revived = {}
+    for i, r in updates:
+        if r["_part"] is not None:
+            revived.setdefault(r["_part"].key, (r["_part"], []))[1].append(r)
+    updates = [(i, r) for i, r in updates if r["_part"] is None]
+    for part, rows in revived.values():
+        with conn:
+            archive.remove_rows(conn, part, [r["_id"] for r in rows])
+            conn.executemany("""
+                INSERT INTO results_data
+                (id, file_name, image_path, image_hash, defect_type_id, severity_id, location_id, score, detail,
+                 action_id, ts, phash, ts_epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(r["_id"], r["file_name"], r["image_path"], r["image_hash"],
+                   *(r[f] for f in _BULK_FIELDS), r["ts"], r["phash"], r["ts_epoch"]) for r in rows])
+    with conn:
+        if updates:
+            copy_legacy_rows(conn, [r["_id"] for _, r in updates])   # v7 복사 중 아직 안 옮긴 행이면 먼저 옮김
+            conn.executemany("""
+                UPDATE results_data
+                SET file_name=?, image_path=?, image_hash=?, defect_type_id=?, severity_id=?, location_id=?,
+                    score=?, detail=?, action_id=?, ts=?, phash=?, ts_epoch=?
+                WHERE id=?
+            """, [(r["file_name"], r["image_path"], r["image_hash"],
+                   *(r[f] for f in _BULK_FIELDS), r["ts"], r["phash"], r["ts_epoch"], r["_id"])
+                  for _, r in updates])
+        if inserts:
+            conn.executemany("""
+                INSERT OR IGNORE INTO results_data
+                (file_name, image_path, image_hash, defect_type_id, severity_id, location_id, score, detail, action_id,
+                 ts, phash, ts_epoch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(r["file_name"], r["image_path"], r["image_hash"],
+                   *(r[f] for f in _BULK_FIELDS), r["ts"], r["phash"], r["ts_epoch"]) for _, r in inserts])
+
+    if _phash_tree is not None:
+        for r in [r for _, r in updates] + [r for _, rows in revived.values() for r in rows]:
+            _phash_index_add(r["phash"], r["_id"])
+        if inserts:
+            ids = _existing_rows(conn, "image_hash", [r["image_hash"] for _, r in inserts], archived=False)
+            for _, r in inserts:
+                if r["image_hash"] in ids:
+                    _phash_index_add(r["phash"], ids[r["image_hash"]][0])
+
+def _write_many(records, upsert: bool, chunk_size: int, workers: int) -> list:
     ensure_schema()
-    ihash = _file_sha256(image_path)
-    file_name = Path(image_path).name
-    ts_val = ts or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = list(records)
+    outcomes = [None] * len(records)
+    ready = []
+    for i, r in _prepare_many(records, workers):
+        if isinstance(r, Exception):
+            print("[DB] 일괄 저장 준비 실패:", records[i].get("image_path"), r)
+            outcomes[i] = "error"
+        else:
+            ready.append((i, r))
 
-    if defect_type not in DEFECT_LABELS:
-        defect_type = DEFECT_LABELS[0]
+    # chunk마다 한 트랜잭션, 저장 스레드에서 순서대로 (해시 계산은 이 스레드에서 끝남)
+    from db.writer import run_write
+    size = max(1, int(chunk_size))
+    jobs = [run_write(lambda c, chunk=ready[k:k + size]: _write_chunk(c, chunk, upsert, outcomes), urgent=True)
+            for k in range(0, len(ready), size)]
+    for job in jobs:
+        job.result()
+    return outcomes
 
-    conn = _connect()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM results WHERE image_hash = ?", (ihash,))
-    row = cur.fetchone()
-    if row:
-        rid = row[0]
-        cur.execute("""
-            UPDATE results
-            SET file_name=?, image_path=?, defect_type=?, severity=?, location=?, score=?, detail=?, action=?, ts=?
-            WHERE id=?
-        """, (
-            file_name, image_path, defect_type, severity, location,
-            float(score), detail, action, ts_val, rid
-        ))
-        conn.commit()
-        conn.close()
-        return rid
-    else:
-        cur.execute("""
-            INSERT INTO results
-            (file_name, image_path, image_hash, defect_type, severity, location, score, detail, action, ts)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            file_name, image_path, ihash, defect_type, severity, location,
-            float(score), detail, action, ts_val
-        ))
-        conn.commit()
-        rid = cur.lastrowid
-        conn.close()
-        return rid
+def insert_results_many(records, chunk_size: int = DB_WRITE_CHUNK,
+                        workers: int = DB_HASH_WORKERS) -> list:
+    """
+    insert_result의 일괄 버전.
+    records: insert_result 인자와 같은 키를 가진 dict 목록 (image_path 필수)
+    chunk_size개씩 한 트랜잭션(executemany)으로 저장, 파일 해시는 workers개 스레드로 계산
+    반환: 입력 순서대로 "inserted" / "duplicate" / "error"
+    """
+    return _write_many(records, False, chunk_size, workers)
+
+def upsert_results_many(records, chunk_size: int = DB_WRITE_CHUNK,
+                        workers: int = DB_HASH_WORKERS) -> list:
+    """
+    upsert_result의 일괄 버전 (같은 이미지 해시, 없으면 같은 경로의 행을 갱신).
+    반환: 입력 순서대로 "inserted" / "updated" / "error"
+    """
+    return _write_many(records, True, chunk_size, workers)
 
 def fetch_results(limit: int = 200):
-    ensure_schema()
-    conn = _connect()
-    rows = conn.execute(
-        "SELECT id, image_path, file_name, defect_type, severity, location, score, detail, action, ts "
-        "FROM results ORDER BY datetime(ts) DESC, id DESC LIMIT ?", (limit,)
-    ).fetchall()
-    conn.close()
-    return rows
+    """최신순 limit건 (본 DB가 모자라면 최근 아카이브부터 이어서)"""
+    return search_results(limit=limit)
 
-def search_results(defect_type=None, severity=None, action=None,
-                   location=None, keyword=None, date_from=None, date_to=None, limit: int = 500):
-    ensure_schema()
-    conn = _connect()
-    base = ("SELECT id, image_path, file_name, defect_type, severity, location, score, detail, action, ts "
-            "FROM results WHERE 1=1")
+# -------- 키워드 검색 (FTS5 trigram) --------
+_FTS_MIN_CHARS = 3   # trigram은 3글자 미만 검색어를 색인으로 찾을 수 없음 → LIKE
+_fts_ready_flag = False
+
+def _fts_ready(conn) -> bool:
+    """results_fts가 있고 기존 행 색인(backfill)까지 끝났는지"""
+    global _fts_ready_flag
+    if not _fts_ready_flag:
+        _fts_ready_flag = has_table(conn, "results_fts") and backfill_done(conn, 4)
+    return _fts_ready_flag
+
+def _fts_phrase(text: str) -> str:
+    """사용자 입력을 FTS5 구문 하나로 (연산자/따옴표 무력화)"""
+    return '"' + text.replace('"', '""') + '"'
+
+_ROW_COLS = ("r.id, r.image_path, r.file_name, r.defect_type, r.severity, r.location, "
+             "r.score, r.detail, r.action, r.ts")
+# results_data는 범주형을 id로 읽고 값은 LIMIT 이후에 붙임 (_with_values)
+_ID_ROW_COLS = ("r.id, r.image_path, r.file_name, r.defect_type_id, r.severity_id, r.location_id, "
+                "r.score, r.detail, r.action_id, r.ts, r.ts_epoch")
+
+def _with_values(inner: str, order: str) -> str:
+    """
+    inner(_ID_ROW_COLS를 고른 results_data 조회)의 결과에만 사전 테이블 값을 붙임 → _ROW_COLS + ts_epoch.
+    order: inner와 같은 정렬 (g. 접두어)
+    """
+    return (f"SELECT g.id, g.image_path, g.file_name, t.value, s.value, l.value, g.score, g.detail, a.value, "
+            f"g.ts, g.ts_epoch FROM ({inner}) g "
+            f"LEFT JOIN {CATEGORY_TABLES['defect_type']} t ON t.id = g.defect_type_id "
+            f"LEFT JOIN {CATEGORY_TABLES['severity']} s ON s.id = g.severity_id "
+            f"LEFT JOIN {CATEGORY_TABLES['location']} l ON l.id = g.location_id "
+            f"LEFT JOIN {CATEGORY_TABLES['action']} a ON a.id = g.action_id{order}")
+
+def _search_where(conn, defect_type=None, severity=None, action=None,
+                  location=None, keyword=None, date_from=None, date_to=None, table: str = "results_data") -> tuple:
+    """
+    검색 조건 → ("FROM ... WHERE ...", args, FTS 사용 여부).
+    본 DB(results_data)는 범주형 조건을 사전 id로 비교 (값 → id는 상수 서브쿼리라 id 인덱스 사용),
+    아카이브 테이블(table)은 값 그대로 비교하고 LIKE로 검색
+    """
+    encoded = table == "results_data"
+    use_fts = encoded and _fts_ready(conn)
+    match = []
+    if keyword and use_fts and len(keyword) >= _FTS_MIN_CHARS:
+        match.append(_fts_phrase(keyword))
+    if location and use_fts and len(location) >= _FTS_MIN_CHARS:
+        match.append("location : " + _fts_phrase(location))
+
+    sql = f" FROM {table} r"
     args = []
+    if match:
+        sql += " JOIN results_fts f ON f.rowid = r.id WHERE results_fts MATCH ?"
+        args.append(" AND ".join(match))
+    else:
+        sql += " WHERE 1=1"
+    def cat(col: str, op: str = "=") -> str:
+        if encoded:
+            return f"r.{col}_id {'=' if op == '=' else 'IN'} (SELECT id FROM {CATEGORY_TABLES[col]} WHERE value {op} ?)"
+        return f"r.{col} {op} ?"
+
     if defect_type:
-        base += " AND defect_type = ?"; args.append(defect_type)
+        sql += " AND " + cat("defect_type"); args.append(defect_type)
     if severity:
-        base += " AND severity = ?"; args.append(severity)
+        sql += " AND " + cat("severity"); args.append(severity)
     if action:
-        base += " AND action = ?"; args.append(action)
-    if location:
-        base += " AND location LIKE ?"; args.append(f"%{location}%")
-    if keyword:
+        sql += " AND " + cat("action"); args.append(action)
+    if location and not (use_fts and len(location) >= _FTS_MIN_CHARS):
+        sql += " AND " + cat("location", "LIKE"); args.append(f"%{location}%")
+    if keyword and not (use_fts and len(keyword) >= _FTS_MIN_CHARS):
         w = f"%{keyword}%"
-        base += " AND (file_name LIKE ? OR detail LIKE ? OR location LIKE ?)"
+        sql += f" AND (r.file_name LIKE ? OR r.detail LIKE ? OR {cat('location', 'LIKE')})"
         args.extend([w, w, w])
+    # ts_epoch 범위 조건 (컬럼을 함수로 감싸지 않아 idx_results_ts_epoch 사용)
     if date_from:
-        base += " AND date(ts) >= date(?)"; args.append(date_from)
+        sql += " AND r.ts_epoch >= ?"; args.append(ts_to_epoch(str(date_from)[:10]))
     if date_to:
-        base += " AND date(ts) <= date(?)"; args.append(date_to)
-    base += " ORDER BY datetime(ts) DESC, id DESC LIMIT ?"; args.append(limit)
-    rows = conn.execute(base, args).fetchall()
-    conn.close()
+        sql += " AND r.ts_epoch < ?"; args.append(ts_to_epoch(str(date_to)[:10]) + 86400)
+    return sql, args, bool(match)
+
+def _date_bounds(date_from=None, date_to=None) -> tuple:
+    """검색 날짜 → ts_epoch 범위 [lo, hi) (None = 제한 없음)"""
+    lo = ts_to_epoch(str(date_from)[:10]) if date_from else None
+    hi = ts_to_epoch(str(date_to)[:10]) + 86400 if date_to else None
+    return lo, hi
+
+def _sort_key(row):
+    """(ts_epoch, id) — 행의 마지막 컬럼이 ts_epoch, 첫 컬럼이 id. ts 없는 행은 가장 오래된 것으로"""
+    return (row[-1] if row[-1] is not None else float("-inf"), row[0])
+
+# v7 행 복사 전 행. v3 backfill 전 행(ts_epoch NULL)은 ts에서 계산 (인덱스가 없는 테이블이라 조회 비용은 같음)
+_LEGACY_ROWS = (f"(SELECT id, file_name, image_path, image_hash, defect_type, severity, location, score, detail, "
+                f"action, ts, phash, {_EPOCH_OR_TS.format(p='l')} AS ts_epoch FROM results_legacy l)")
+
+def _legacy_source(conn) -> list:
+    """v7 행 복사 backfill 중이면 [_LEGACY_ROWS] (아직 results_data로 옮기지 않은 행, 범주형은 값 그대로)"""
+    return [_LEGACY_ROWS] if has_table(conn, "results_legacy") else []
+
+def _partitioned_rows(conn, filters: dict, limit: int, desc: bool = True, extra: str = "",
+                      extra_args=(), bound: int | None = None, include_main: bool = True) -> list:
+    """
+    본 DB와 날짜 범위에 겹치는 아카이브에 같은 조건으로 조회해 (ts_epoch, id) 순으로 limit건 합침.
+    행 끝에 ts_epoch 포함. 아카이브는 기간이 겹치지 않으므로 이미 limit건을 채웠고
+    그보다 바깥 기간이면 파일을 열지 않음 (최근 데이터 조회는 본 DB만 읽음).
+    bound: 커서의 ts_epoch (desc면 이보다 새 기간, 아니면 이보다 오래된 기간은 건너뜀)
+    """
+    lo, hi = _date_bounds(filters.get("date_from"), filters.get("date_to"))
+    if bound is not None:
+        lo, hi = (lo, bound + 1 if hi is None else min(hi, bound + 1)) if desc else \
+                 (bound if lo is None else max(lo, bound), hi)
+    parts = archive.partitions_for(lo, hi)
+    if desc:
+        parts.reverse()
+    order = " ORDER BY r.ts_epoch DESC, r.id DESC" if desc else " ORDER BY r.ts_epoch ASC, r.id ASC"
+
+    rows = []
+    sources = (["results_data"] if include_main else []) + _legacy_source(conn) + parts
+    for src in sources:
+        if src == "results_data":
+            where, args, _ = _search_where(conn, **filters)
+            sql = _with_values(f"SELECT {_ID_ROW_COLS}{where}{extra}{order} LIMIT ?", order.replace("r.", "g."))
+        elif src == _LEGACY_ROWS:
+            # 기간으로 나뉘지 않으므로 항상 읽음
+            where, args, _ = _search_where(conn, **filters, table=src)
+            sql = f"SELECT {_ROW_COLS}, r.ts_epoch{where}{extra}{order} LIMIT ?"
+        else:
+            if len(rows) >= limit:
+                edge = rows[limit - 1][-1]
+                if edge is not None and (edge >= src.hi if desc else edge < src.lo):
+                    break
+            where, args, _ = _search_where(conn, **filters, table=archive.attach(conn, src) + ".results")
+            sql = f"SELECT {_ROW_COLS}, r.ts_epoch{where}{extra}{order} LIMIT ?"
+        rows.extend(conn.execute(sql, args + list(extra_args) + [limit]).fetchall())
+        rows = heapq.nlargest(limit, rows, key=_sort_key) if desc else heapq.nsmallest(limit, rows, key=_sort_key)
     return rows
 
+def search_results(defect_type=None, severity=None, action=None,
+                   location=None, keyword=None, date_from=None, date_to=None, limit: int = 500,
+                   rank: bool = False):
+    """
+    keyword/location은 부분 문자열 검색. 3글자 이상이면 FTS5 색인(results_fts), 미만이면 LIKE.
+    rank=True면 keyword 관련도(bm25) 순, 아니면 최신순
+    날짜 범위에 겹치는 아카이브도 함께 검색 (아카이브는 LIKE, rank=True면 본 DB 결과 뒤에 최신순으로)
+    """
+    ensure_schema()
+    conn = _connect()
+    filters = dict(defect_type=defect_type, severity=severity, action=action, location=location,
+                   keyword=keyword, date_from=date_from, date_to=date_to)
+    where, args, fts = _search_where(conn, **filters)
+    if rank and keyword and fts:
+        rows = conn.execute(
+            _with_values(f"SELECT {_ID_ROW_COLS}, f.rank AS rk{where} ORDER BY f.rank, r.id DESC LIMIT ?",
+                         " ORDER BY g.rk, g.id DESC"), args + [limit]
+        ).fetchall()
+        if len(rows) < limit:
+            rows += _partitioned_rows(conn, filters, limit - len(rows), include_main=False)
+        return [r[:-1] for r in rows]
+    return [r[:-1] for r in _partitioned_rows(conn, filters, limit)]
+
+# -------- 페이지 단위 조회 (keyset) --------
+def _encode_cursor(ts_epoch: int, rid: int, direction: str) -> str:
+    raw = json.dumps([direction, ts_epoch, rid], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, ts_epoch, rid = json.loads(raw)
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return direction, int(ts_epoch), int(rid)
+    except Exception as e:
+        raise ValueError(f"잘못된 페이지 커서: {cursor!r}") from e
+
+def search_results_page(defect_type=None, severity=None, action=None,
+                        location=None, keyword=None, date_from=None, date_to=None,
+                        page_size: int = RESULTS_PAGE_SIZE, cursor: str | None = None) -> dict:
+    """
+    search_results의 페이지 버전 (최신순, (ts_epoch, id) keyset).
+    반환: {"rows": [...], "next": 커서|None, "prev": 커서|None}
+    커서는 불투명 문자열 — 다음/이전 페이지를 받으려면 그대로 다시 넘길 것.
+    몇 번째 페이지든 인덱스 범위 탐색 한 번이라 첫 페이지와 비용이 같음.
+    ts가 없는(ts_epoch NULL) 행은 페이지 탐색에서 제외됨.
+    """
+    ensure_schema()
+    conn = _connect()
+    filters = dict(defect_type=defect_type, severity=severity, action=action, location=location,
+                   keyword=keyword, date_from=date_from, date_to=date_to)
+    n = max(1, int(page_size))
+    direction, bound = "next", None
+    if cursor:
+        direction, c_ts, c_id = _decode_cursor(cursor)
+        op = "<" if direction == "next" else ">"
+        extra, extra_args, bound = f" AND (r.ts_epoch, r.id) {op} (?, ?)", (c_ts, c_id), c_ts
+    else:
+        extra, extra_args = " AND r.ts_epoch IS NOT NULL", ()
+
+    # id는 아카이브로 옮겨도 유지되므로 (ts_epoch, id) 커서가 파일 경계를 넘어 그대로 동작
+    rows = _partitioned_rows(conn, filters, n + 1, direction == "next", extra, extra_args, bound)
+    more = len(rows) > n
+    rows = rows[:n]
+    if direction == "prev":
+        rows.reverse()
+
+    page = {"rows": [r[:-1] for r in rows], "next": None, "prev": None}
+    if rows:
+        first, last = rows[0], rows[-1]
+        has_next = more if direction == "next" else True
+        has_prev = (cursor is not None) if direction == "next" else more
+        if has_next:
+            page["next"] = _encode_cursor(last[-1], last[0], "next")
+        if has_prev:
+            page["prev"] = _encode_cursor(first[-1], first[0], "prev")
+    return page
+
+def fetch_results_page(page_size: int = RESULTS_PAGE_SIZE, cursor: str | None = None) -> dict:
+    """fetch_results의 페이지 버전 (search_results_page와 같은 형식)"""
+    return search_results_page(page_size=page_size, cursor=cursor)
+
+def approx_count(cap: int = 10000, **filters) -> tuple:
+    """
+    검색 조건에 맞는 행 수를 싸게 추정. 반환: (개수, 정확 여부)
+    - cap개까지만 세고 넘으면 멈춤
+    - 조건이 없고 cap을 넘으면 id 범위로 추정 (삭제된 행만큼 오차)
+    - 날짜 범위에 겹치는 아카이브도 cap에 닿을 때까지 더함
+    """
+    ensure_schema()
+    conn = _connect()
+    sources = (["results_data"] + _legacy_source(conn)
+               + archive.partitions_for(*_date_bounds(filters.get("date_from"), filters.get("date_to"))))
+    n = 0
+    for src in sources:
+        table = src if isinstance(src, str) else archive.attach(conn, src) + ".results"
+        where, args, _ = _search_where(conn, **filters, table=table)
+        n += conn.execute(f"SELECT COUNT(*) FROM (SELECT 1{where} LIMIT ?)", args + [cap + 1 - n]).fetchone()[0]
+        if n > cap:
+            break
+    if n <= cap:
+        return n, True
+    if not any(filters.values()):
+        est = 0
+        for src in sources:
+            table = src if isinstance(src, str) else archive.attach(conn, src) + ".results"
+            lo, hi = conn.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+            est += (hi - lo + 1) if lo is not None else 0
+        return max(n, est), False
+    return cap, False
+
+# -------- 저장 여부 일괄 확인 --------
+def _missing_values(conn, column: str, values: list) -> set:
+    """values 중 results.{column}에 없는 값 — 임시 테이블에 넣고 유니크 인덱스로 조인 (아카이브도 확인)"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS _dedup_candidates (v TEXT PRIMARY KEY) WITHOUT ROWID")
+    try:
+        with conn:
+            conn.execute("DELETE FROM temp._dedup_candidates")
+            conn.executemany("INSERT OR IGNORE INTO temp._dedup_candidates (v) VALUES (?)", ((v,) for v in values))
+        missing = {v for (v,) in conn.execute(
+            f"SELECT c.v FROM temp._dedup_candidates c "
+            f"WHERE NOT EXISTS (SELECT 1 FROM results_data r WHERE r.{column} = c.v)"
+        )}
+        if missing and has_table(conn, "results_legacy"):
+            # 인덱스가 없는 테이블이라 한 번 훑으면서 후보(기본 키)를 찾음
+            missing -= {v for (v,) in conn.execute(
+                f"SELECT DISTINCT c.v FROM results_legacy l JOIN temp._dedup_candidates c ON c.v = l.{column}"
+            )}
+        for part in archive.list_partitions():
+            if not missing:
+                break
+            schema = archive.attach(conn, part)
+            missing -= {v for (v,) in conn.execute(
+                f"SELECT c.v FROM temp._dedup_candidates c "
+                f"WHERE EXISTS (SELECT 1 FROM {schema}.results a WHERE a.{column} = c.v)"
+            )}
+        return missing
+    finally:
+        with conn:
+            conn.execute("DELETE FROM temp._dedup_candidates")
+
+def new_image_paths(paths, check_hash: bool = False) -> list:
+    """
+    아직 저장되지 않은 이미지 경로 (입력 순서 유지, 중복 제거)
+    - 경로는 저장 때와 같이 resolve()해서 image_path 유니크 인덱스로 비교
+    - check_hash=True면 같은 내용(sha256)이 다른 경로로 저장된 파일도 제외 (지문 캐시 사용, 못 읽는 파일은 남김)
+    """
+    resolved, seen = {}, set()
+    for p in paths:
+        rp = str(Path(p).resolve())
+        if rp not in seen:
+            seen.add(rp)
+            resolved[p] = rp
+    if not resolved:
+        return []
+    ensure_schema()
+    conn = _connect()
+    missing = _missing_values(conn, "image_path", list(set(resolved.values())))
+    out = [p for p, rp in resolved.items() if rp in missing]
+    if check_hash and out:
+        hashes = file_sha256_many(out)
+        readable = {h for h in hashes.values() if isinstance(h, str)}   # 못 읽은 파일은 예외 객체
+        known = readable - _missing_values(conn, "image_hash", list(readable))
+        out = [p for p in out if hashes[p] not in known]
+    return out
+
+def new_image_hashes(hashes) -> list:
+    """아직 저장되지 않은 sha256 (입력 순서 유지, 중복 제거)"""
+    hashes = list(dict.fromkeys(hashes))
+    if not hashes:
+        return []
+    ensure_schema()
+    missing = _missing_values(_connect(), "image_hash", hashes)
+    return [h for h in hashes if h in missing]
+
 def delete_results(ids):
+    """본 DB와 아카이브(검색에 보이는 행)에서 삭제 → 삭제한 행 수. 아카이브 행은 일별 집계에서도 뺌"""
     if not ids:
         return 0
     ensure_schema()
     conn = _connect()
-    q = "DELETE FROM results WHERE id IN ({})".format(",".join(["?"] * len(ids)))
-    cur = conn.cursor()
-    cur.execute(q, ids)
-    conn.commit()
-    n = cur.rowcount
-    conn.close()
-    return n
\ No newline at end of file
+    marks = ",".join(["?"] * len(ids))
+    with conn:
+        copy_legacy_rows(conn, ids)   # 복사 backfill 중이면 먼저 옮겨서 삭제 트리거가 집계/색인에서 빼도록
+        rest = set(ids) - {rid for (rid,) in conn.execute(f"SELECT id FROM results_data WHERE id IN ({marks})", ids)}
+        n = conn.execute(f"DELETE FROM results_data WHERE id IN ({marks})", ids).rowcount
+    for part in archive.list_partitions():
+        if not rest:
+            break
+        with conn:
+            removed = archive.remove_rows(conn, part, rest)
+        rest -= removed
+        n += len(removed)
+    return n
+
+# -------- 지각 해시 근접 중복 인덱스 --------
+_phash_lock = threading.Lock()
+_phash_tree = None
+_phash_stats = {"lookups": 0, "reused": 0}
+
+def _phash_index() -> BKTree:
+    """results.phash로 만든 BK-tree (처음 조회할 때 DB에서 로드)"""
+    global _phash_tree
+    with _phash_lock:
+        if _phash_tree is None:
+            ensure_schema()
+            tree = BKTree()
+            conn = _connect()
+            for src in ["results_data"] + _legacy_source(conn):
+                for rid, ph in conn.execute(f"SELECT id, phash FROM {src} WHERE phash IS NOT NULL"):
+                    tree.add(ph, rid)
+            _phash_tree = tree
+        return _phash_tree
+
+def _phash_index_add(phash, rid):
+    # 아직 로드 전이면 다음 로드 때 DB에서 함께 읽힘
+    if phash is None or _phash_tree is None:
+        return
+    _phash_tree.add(phash, rid)
+
+def find_near_duplicate(phash: int, max_distance: int):
+    """
+    해밍 거리 max_distance 이내의 기존 결과 중 가장 가까운 것.
+    반환: (distance, row) 또는 None
+    row: (id, image_path, file_name, defect_type, severity, location, score, detail, action, ts)
+    """
+    if phash is None:
+        return None
+    with _phash_lock:
+        _phash_stats["lookups"] += 1
+    conn = _connect()
+    for dist, rid in _phash_index().search(phash, max_distance):
+        row = conn.execute(
+            "SELECT id, image_path, file_name, defect_type, severity, location, score, detail, action, ts "
+            "FROM results WHERE id = ?", (rid,)
+        ).fetchone()
+        if row:  # 삭제된 행은 건너뜀
+            return dist, row
+    return None
+
+def record_phash_reuse(n: int = 1):
+    with _phash_lock:
+        _phash_stats["reused"] += n
+
+def phash_report() -> dict:
+    """근접 중복 재사용으로 절약한 API 호출 수 등"""
+    with _phash_lock:
+        s = dict(_phash_stats)
+    s["api_calls_saved"] = s["reused"]
+    s["indexed"] = _phash_tree.size if _phash_tree is not None else 0
+    return s
@@ -0,0 +1,358 @@
+# db/export.py
+"""
+결과 내보내기 (Parquet / Arrow IPC / CSV) — 스트리밍
+
+- results(+ 날짜 범위에 겹치는 아카이브)를 커서에서 EXPORT_CHUNK행씩 읽어 바로 파일에 씀
+  → 메모리 사용은 테이블 크기와 무관하게 chunk 하나 분량
+- 날짜 범위는 ts_epoch 조건으로 SQL에 넣음 (인덱스 범위 검색, 아카이브는 겹치는 파일만 ATTACH)
+- 컬럼 타입 고정: id/phash int64, score float64, ts timestamp[s](로컬 시각),
+  범주형(defect_type/severity/location/action)은 dictionary<int32, string>
+  사전은 내보내는 동안 누적 (Arrow IPC에서는 새 값만 dictionary delta로 기록)
+- 읽기 전용 연결에서 소스(아카이브 파일/본 DB)마다 읽기 트랜잭션 하나로 읽음 → 저장 중에도 쓰기를 막지 않음
+  (아카이브는 하나씩 붙였다 떼므로 MAX_ATTACHED개보다 많아도 됨)
+- 임시 파일(<경로>.part)에 쓰고 끝나면 이름을 바꿈 (취소/오류 시 삭제)
+- CSV(export_tables_csv / export_frames_csv): 커서/DataFrame을 chunk 단위로 이어 씀,
+  엑셀 호환 utf-8-sig(BOM), 경로가 .gz로 끝나면 gzip 압축
+
+    python -m db.export results.parquet --from 2026-01-01 --to 2026-06-30
+    python -m db.export results.arrow
+    python -m db.export --csv-dir out/ [--gzip]
+"""
+import csv
+import gzip
+import os
+import time
+from contextlib import closing
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from utils.config import EXPORT_CHUNK, EXPORT_COMPRESSION, EXPORT_CSV_GZIP
+from db import archive
+from db import db
+from db.migrations import CATEGORY_TABLES
+
+CATEGORICAL = ("defect_type", "severity", "location", "action")
+COLUMNS = ("id", "file_name", "image_path", "image_hash", "defect_type", "severity", "location",
+           "score", "detail", "action", "ts", "phash")
+# ts는 문자열 대신 ts_epoch(로컬 시각을 UTC로 간주한 초)를 읽어 timestamp로 변환
+_SELECT = ", ".join("ts_epoch" if c == "ts" else c for c in COLUMNS)
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("file_name", pa.string()),
+    ("image_path", pa.string()),
+    ("image_hash", pa.string()),
+    ("defect_type", pa.dictionary(pa.int32(), pa.string())),
+    ("severity", pa.dictionary(pa.int32(), pa.string())),
+    ("location", pa.dictionary(pa.int32(), pa.string())),
+    ("score", pa.float64()),
+    ("detail", pa.string()),
+    ("action", pa.dictionary(pa.int32(), pa.string())),
+    ("ts", pa.timestamp("s")),
+    ("phash", pa.int64()),
+])
+
+# CSV로 내보내지 않는 내부 테이블: 인코딩 원본/값 사전, 집계·지문·분류 캐시(api/cache.py), 마이그레이션 기록
+_CSV_INTERNAL = {"results_data", "results_legacy", "results_daily", "file_fingerprints", "classify_cache",
+                 "schema_migrations", *CATEGORY_TABLES.values()}
+
+FORMATS = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+
+
+def format_of(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"지원하지 않는 확장자: {ext or '(없음)'} — .parquet 또는 .arrow")
+    return FORMATS[ext]
+
+
+class _Dictionaries:
+    """범주형 컬럼별 누적 사전 (값 → 인덱스). 배치마다 지금까지의 전체 사전을 붙임"""
+
+    def __init__(self):
+        self.index = {c: {} for c in CATEGORICAL}
+        self.values = {c: [] for c in CATEGORICAL}
+
+    def encode(self, column: str, col_values) -> pa.DictionaryArray:
+        index, values = self.index[column], self.values[column]
+        codes = []
+        for v in col_values:
+            if v is None:
+                codes.append(None)
+                continue
+            code = index.get(v)
+            if code is None:
+                code = index[v] = len(values)
+                values.append(v)
+            codes.append(code)
+        return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(values, pa.string()))
+
+
+def _batch(rows: list, dicts: _Dictionaries) -> pa.RecordBatch:
+    cols = list(zip(*rows))
+    arrays = []
+    for name, values in zip(COLUMNS, cols):
+        if name in CATEGORICAL:
+            arrays.append(dicts.encode(name, values))
+        elif name == "ts":
+            arrays.append(pa.array(values, pa.int64()).cast(pa.timestamp("s")))
+        else:
+            arrays.append(pa.array(values, SCHEMA.field(name).type))
+    return pa.record_batch(arrays, schema=SCHEMA)
+
+
+def _sources(date_from=None, date_to=None) -> list:
+    """[(Partition 또는 None(본 DB), WHERE 절, 인자)] — 겹치는 아카이브(오래된 순) 다음 본 DB"""
+    lo, hi = db._date_bounds(date_from, date_to)
+    where, args = [], []
+    if lo is not None:
+        where.append("ts_epoch >= ?")
+        args.append(lo)
+    if hi is not None:
+        where.append("ts_epoch < ?")
+        args.append(hi)
+    where = (" WHERE " + " AND ".join(where)) if where else ""
+    return [(p, where, args) for p in archive.partitions_for(lo, hi) + [None]]
+
+
+def _table(conn, part, name: str = "results") -> str:
+    """소스의 테이블 이름 (part=None이면 본 DB). 아카이브는 이때 ATTACH (트랜잭션 밖에서 호출)"""
+    return f'main."{name}"' if part is None else archive.attach(conn, part) + ".results"
+
+
+def _detach(conn, part):
+    if part is not None:
+        conn.execute(f"DETACH DATABASE {part.schema}")
+
+
+def _count(conn, sources, name: str = "results") -> int:
+    total = 0
+    for part, where, args in sources:
+        total += conn.execute(f"SELECT COUNT(*) FROM {_table(conn, part, name)}{where}", args).fetchone()[0]
+        _detach(conn, part)
+    return total
+
+
+def _chunks(conn, sources, select: str, chunk_size: int, name: str = "results"):
+    """
+    sources의 행을 chunk_size개씩 (정렬 없이 인덱스/rowid 순서 그대로).
+    ATTACH는 트랜잭션 안에서 못 하고 한 번에 MAX_ATTACHED개까지라, 소스마다 붙이고 →
+    읽기 트랜잭션 하나로 읽고 → 떼어 냄 (아카이브 개수와 무관, 스냅샷은 소스 단위)
+    """
+    for part, where, args in sources:
+        table = _table(conn, part, name)
+        conn.execute("BEGIN")
+        cur = conn.execute(f"SELECT {select} FROM {table}{where}", args)
+        try:
+            yield from iter(lambda: cur.fetchmany(chunk_size), [])
+        finally:
+            cur.close()
+            conn.execute("COMMIT")
+            _detach(conn, part)
+
+
+def export_results(path: str, date_from=None, date_to=None, fmt: str | None = None,
+                   chunk_size: int = EXPORT_CHUNK, progress=None, cancel=None) -> dict:
+    """
+    결과를 path로 스트리밍 저장. fmt = "parquet" / "arrow" (None이면 확장자로 판단)
+    progress(written, total): chunk마다 호출, cancel: is_set()이 True가 되면 중단
+    반환: {"path", "rows", "cancelled", "seconds"}
+    """
+    fmt = fmt or format_of(path)
+    chunk_size = max(1, int(chunk_size))
+    db.ensure_schema()
+    tmp_path = path + ".part"
+    t0 = time.perf_counter()
+    written, cancelled = 0, False
+
+    conn = db._open_readonly(db.get_db_path())
+    conn.execute("PRAGMA mmap_size=0")   # 한 번 훑고 끝나는 읽기라 매핑해 둘 이유가 없음 (RSS가 DB 크기만큼 늘지 않도록)
+    try:
+        sources = _sources(date_from, date_to)
+        total = _count(conn, sources)
+        if progress:
+            progress(0, total)
+
+        if fmt == "parquet":
+            writer = pq.ParquetWriter(tmp_path, SCHEMA, compression=EXPORT_COMPRESSION)
+        else:
+            # IPC 압축은 zstd/lz4만 지원
+            writer = ipc.new_file(tmp_path, SCHEMA, options=ipc.IpcWriteOptions(
+                compression=EXPORT_COMPRESSION if EXPORT_COMPRESSION in ("zstd", "lz4") else None,
+                emit_dictionary_deltas=True))
+        dicts = _Dictionaries()
+        try:
+            with closing(_chunks(conn, sources, _SELECT, chunk_size)) as chunks:
+                for rows in chunks:
+                    writer.write_batch(_batch(rows, dicts))
+                    written += len(rows)
+                    if progress:
+                        progress(written, total)
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        break
+        finally:
+            writer.close()
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        conn.close()
+
+    if cancelled:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    seconds = time.perf_counter() - t0
+    print("[EXPORT]", f"{fmt} {written}행 {seconds:.1f}s", "(취소됨)" if cancelled else path)
+    return {"path": path, "rows": written, "cancelled": cancelled, "seconds": seconds}
+
+
+# -------- CSV --------
+
+class _Progress:
+    """여러 파일에 걸친 누적 행 수 → progress(written, total), cancel 확인"""
+
+    def __init__(self, total: int, progress=None, cancel=None):
+        self.total = total
+        self.written = 0
+        self.progress = progress
+        self.cancel = cancel
+        if progress:
+            progress(0, total)
+
+    def advance(self, n: int) -> bool:
+        """n행 더 씀. 취소 요청이 있으면 False"""
+        self.written += n
+        if self.progress:
+            self.progress(self.written, self.total)
+        return not (self.cancel is not None and self.cancel.is_set())
+
+
+def _open_csv(path: str, compressed: bool):
+    # utf-8-sig: 엑셀에서 한글이 깨지지 않도록 BOM 포함
+    if compressed:
+        return gzip.open(path, "wt", encoding="utf-8-sig", newline="")
+    return open(path, "w", encoding="utf-8-sig", newline="")
+
+
+def _write_csv(path: str, columns, chunks, state: _Progress) -> bool:
+    """chunks(행 목록들)를 path에 이어 씀 (.part에 쓰고 끝나면 이름 변경). 취소되면 파일을 지우고 False"""
+    tmp_path = path + ".part"
+    ok = True
+    try:
+        with _open_csv(tmp_path, path.endswith(".gz")) as f:
+            w = csv.writer(f)
+            w.writerow(columns)
+            for rows in chunks:
+                w.writerows(rows)
+                if not state.advance(len(rows)):
+                    ok = False
+                    break
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if ok:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+    return ok
+
+
+def csv_tables(conn) -> list:
+    """
+    CSV로 내보낼 테이블: 사용자 테이블과 뷰(results는 값 그대로)
+    내부 테이블(_CSV_INTERNAL, *_backfill, sqlite_*)과 FTS 등 가상 테이블, 그 shadow 테이블은 제외
+    """
+    rows = conn.execute("SELECT type, name, sql FROM sqlite_master WHERE type IN ('table', 'view')").fetchall()
+    virtual = [name for _, name, sql in rows if (sql or "").upper().startswith("CREATE VIRTUAL TABLE")]
+    return [name for _, name, _ in rows
+            if name not in _CSV_INTERNAL and not name.startswith("sqlite_") and not name.endswith("_backfill")
+            and not any(name == v or name.startswith(v + "_") for v in virtual)]
+
+
+def export_tables_csv(out_dir: str, tables=None, compressed: bool = EXPORT_CSV_GZIP,
+                      chunk_size: int = EXPORT_CHUNK, progress=None, cancel=None) -> dict:
+    """
+    DB 테이블마다 out_dir/<테이블>.csv(.gz)로 저장 (chunk_size행씩 fetchmany)
+    results는 export_results처럼 아카이브(오래된 순) 다음 본 DB를 한 파일로 이어 씀
+    오류는 그대로 올림 (쓰던 파일은 지우고, 빠지거나 잘린 CSV를 완료로 보고하지 않음)
+    반환: {"paths", "rows", "cancelled", "seconds"}
+    """
+    db.ensure_schema()
+    t0 = time.perf_counter()
+    chunk_size = max(1, int(chunk_size))
+    paths, cancelled = [], False
+    os.makedirs(out_dir, exist_ok=True)
+
+    conn = db._open_readonly(db.get_db_path())
+    conn.execute("PRAGMA mmap_size=0")
+    try:
+        tables = list(tables) if tables is not None else csv_tables(conn)
+        # results만 아카이브까지, 나머지는 본 DB 테이블 그대로
+        jobs = [(t, _sources() if t == "results" else [(None, "", [])],
+                 archive.COLUMNS if t == "results" else "*") for t in tables]
+        state = _Progress(sum(_count(conn, src, t) for t, src, _ in jobs), progress, cancel)
+        for t, src, select in jobs:
+            path = os.path.join(out_dir, f"{t}.csv" + (".gz" if compressed else ""))
+            columns = [d[0] for d in conn.execute(f'SELECT {select} FROM main."{t}" LIMIT 0').description]
+            with closing(_chunks(conn, src, select, chunk_size, t)) as chunks:
+                if not _write_csv(path, columns, chunks, state):
+                    cancelled = True
+                    break
+            paths.append(path)
+    finally:
+        conn.close()
+
+    seconds = time.perf_counter() - t0
+    print("[EXPORT]", f"csv {state.written}행 {seconds:.1f}s", "(취소됨)" if cancelled else out_dir)
+    return {"paths": paths, "rows": state.written, "cancelled": cancelled, "seconds": seconds}
+
+
+def export_frames_csv(jobs, chunk_size: int = EXPORT_CHUNK, progress=None, cancel=None) -> dict:
+    """jobs = [(경로, DataFrame)] 를 CSV로 저장 (대시보드 표 등). 반환 형식은 export_tables_csv와 같음"""
+    t0 = time.perf_counter()
+    chunk_size = max(1, int(chunk_size))
+    paths, cancelled = [], False
+    state = _Progress(sum(len(df) for _, df in jobs), progress, cancel)
+    for path, df in jobs:
+        chunks = (list(df.iloc[i:i + chunk_size].itertuples(index=False, name=None))
+                  for i in range(0, len(df), chunk_size))
+        if not _write_csv(path, list(df.columns), chunks, state):
+            cancelled = True
+            break
+        paths.append(path)
+    seconds = time.perf_counter() - t0
+    return {"paths": paths, "rows": state.written, "cancelled": cancelled, "seconds": seconds}
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="결과를 Parquet/Arrow IPC/CSV로 내보내기")
+    ap.add_argument("path", nargs="?", help="출력 파일 (.parquet / .arrow)")
+    ap.add_argument("--from", dest="date_from", help="YYYY-MM-DD (포함)")
+    ap.add_argument("--to", dest="date_to", help="YYYY-MM-DD (포함)")
+    ap.add_argument("--chunk", type=int, default=EXPORT_CHUNK, help="한 번에 읽고 쓰는 행 수")
+    ap.add_argument("--csv-dir", help="테이블별 CSV를 저장할 폴더 (path 대신)")
+    ap.add_argument("--gzip", action="store_true", help="CSV를 .csv.gz로 압축")
+    args = ap.parse_args()
+    if not args.path and not args.csv_dir:
+        ap.error("path 또는 --csv-dir가 필요합니다")
+
+    print("[DB PATH]", db.get_db_path())
+    show = lambda n, total: print(f"\r{n}/{total}", end="", flush=True)
+    if args.csv_dir:
+        os.makedirs(args.csv_dir, exist_ok=True)
+        export_tables_csv(args.csv_dir, compressed=args.gzip or EXPORT_CSV_GZIP, chunk_size=args.chunk, progress=show)
+    else:
+        export_results(args.path, args.date_from, args.date_to, chunk_size=args.chunk, progress=show)
+    print()
+
+
+if __name__ == "__main__":
+    main()
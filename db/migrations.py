@@ -0,0 +1,798 @@
+# db/migrations.py
+"""
+PRAGMA user_version 기반 스키마 마이그레이션
+
+- MIGRATIONS의 단계를 버전 순서대로 적용, 단계마다 한 트랜잭션(DDL + user_version 갱신)
+- DDL은 짧게 끝나는 것만 두고, 기존 행을 채우는 작업은 backfill로 분리
+  · backfill은 chunk_size행씩 별도 트랜잭션으로 진행하며 마지막 id를 schema_migrations에 기록
+  · 중단돼도 다음 실행 때 그 지점부터 이어서 진행 (앱은 backfill 도중에도 사용 가능)
+  · 조회 결과가 달라지는 backfill(blocking=True)은 migrate()에서 바로 끝까지 진행
+- DB 버전이 앱이 아는 최신 버전보다 높으면 SchemaVersionError (구버전 앱으로 연 경우)
+
+상태 확인/백필 실행:
+    python -m db.migrations --status
+    python -m db.migrations --backfill
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+from utils.config import DB_MIGRATION_CHUNK
+from utils.phash import dhash, to_signed
+
+
+class SchemaVersionError(RuntimeError):
+    """DB 스키마 버전이 앱이 지원하는 범위를 벗어남"""
+
+
+class Migration:
+    def __init__(self, version: int, name: str, up, backfill=None, blocking: bool = False):
+        self.version = version
+        self.name = name
+        self.up = up              # up(conn): 짧은 DDL
+        self.backfill = backfill  # backfill(conn, after_id, limit) -> 처리한 마지막 id 또는 None(끝)
+        self.blocking = blocking  # True면 앱 시작 전에 backfill 완료 (쿼리가 새 컬럼에 의존)
+
+
+# -------- 단계 정의 (추가만 하고 기존 단계는 수정하지 말 것) --------
+
+def _v1_results(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_name   TEXT,
+            image_path  TEXT NOT NULL,
+            image_hash  TEXT,
+            defect_type TEXT,
+            severity    TEXT,
+            location    TEXT,
+            score       REAL,
+            detail      TEXT,
+            action      TEXT,
+            ts          TEXT DEFAULT (datetime('now','localtime'))
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_image_path ON results(image_path)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_image_hash ON results(image_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_results_type_sev_ts ON results(defect_type, severity, ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_results_location ON results(location)")
+
+
+def _v2_phash(conn):
+    if "phash" not in _columns(conn, "results"):
+        conn.execute("ALTER TABLE results ADD COLUMN phash INTEGER")
+
+
+def _v2_phash_backfill(conn, after_id: int, limit: int):
+    rows = conn.execute(
+        "SELECT id, image_path FROM results WHERE id > ? AND phash IS NULL ORDER BY id LIMIT ?",
+        (after_id, limit)
+    ).fetchall()
+    if not rows:
+        return None
+    updates = []
+    for rid, path in rows:
+        try:
+            updates.append((to_signed(dhash(path)), rid))
+        except Exception:
+            pass  # 파일이 없거나 이미지가 아니면 NULL로 둠
+    with conn:
+        conn.executemany("UPDATE results SET phash=? WHERE id=?", updates)
+    return rows[-1][0]
+
+
+# ts_epoch = ts(로컬 시각 문자열)를 UTC로 간주한 초. 시간대/서머타임 변환 없이 ts와 같은 순서/날짜 경계
+_TS_EPOCH_SQL = "CAST(strftime('%s', {ts}) AS INTEGER)"
+
+
+def _v3_ts_epoch(conn):
+    if "ts_epoch" not in _columns(conn, "results"):
+        conn.execute("ALTER TABLE results ADD COLUMN ts_epoch INTEGER")
+    # 기간 필터/최신순 정렬용. 대시보드 집계(기간 + 결함 + 등급)는 테이블을 읽지 않고 인덱스만으로 처리
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_results_ts_epoch "
+                 "ON results(ts_epoch, defect_type, severity)")
+    # 결함/등급 + 기간: ts 대신 ts_epoch를 끝에 둔 인덱스로 교체 (기간 조건도 인덱스 범위로 처리)
+    conn.execute("DROP INDEX IF EXISTS idx_results_type_sev_ts")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_results_type_sev_epoch "
+                 "ON results(defect_type, severity, ts_epoch)")
+    # 앱은 ts_epoch를 직접 넣고, 넣지 않은 경로(외부 스크립트 등)만 트리거가 ts에서 계산
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_results_ts_epoch_ins AFTER INSERT ON results
+        WHEN NEW.ts_epoch IS NULL
+        BEGIN
+            UPDATE results SET ts_epoch = {_TS_EPOCH_SQL.format(ts="NEW.ts")} WHERE id = NEW.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_results_ts_epoch_upd AFTER UPDATE OF ts ON results
+        WHEN NEW.ts_epoch IS OLD.ts_epoch
+        BEGIN
+            UPDATE results SET ts_epoch = {_TS_EPOCH_SQL.format(ts="NEW.ts")} WHERE id = NEW.id;
+        END
+    """)
+
+
+def _v3_ts_epoch_backfill(conn, after_id: int, limit: int):
+    if has_table(conn, "results_data"):
+        # v7 이후: results_data 행은 모두 ts_epoch가 있고, 남은 results_legacy 행은 v7 복사가 채움
+        return None
+    row = conn.execute(
+        "SELECT MAX(id) FROM (SELECT id FROM results WHERE id > ? ORDER BY id LIMIT ?)", (after_id, limit)
+    ).fetchone()
+    if row[0] is None:
+        return None
+    with conn:
+        conn.execute(
+            f"UPDATE results SET ts_epoch = {_TS_EPOCH_SQL.format(ts='ts')} "
+            "WHERE id > ? AND id <= ? AND ts_epoch IS NULL", (after_id, row[0])
+        )
+    return row[0]
+
+
+def has_table(conn, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name=?", (name,)
+    ).fetchone() is not None
+
+
+def _v4_fts(conn):
+    # trigram 토크나이저: 공백/형태소 분석 없이 3글자 단위로 색인 → 한국어 부분 문자열도 검색 가능
+    # (SQLite 3.34 미만이거나 FTS5가 없는 빌드면 건너뛰고 search_results는 LIKE로 동작)
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+                file_name, detail, location,
+                content='results', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print("[MIGRATE] FTS5(trigram) 사용 불가, 키워드 검색은 LIKE로 동작:", e)
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_results_fts_ins AFTER INSERT ON results BEGIN
+            INSERT INTO results_fts(rowid, file_name, detail, location)
+            VALUES (NEW.id, NEW.file_name, NEW.detail, NEW.location);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_results_fts_del AFTER DELETE ON results BEGIN
+            INSERT INTO results_fts(results_fts, rowid, file_name, detail, location)
+            VALUES ('delete', OLD.id, OLD.file_name, OLD.detail, OLD.location);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_results_fts_upd AFTER UPDATE OF file_name, detail, location ON results
+        BEGIN
+            INSERT INTO results_fts(results_fts, rowid, file_name, detail, location)
+            VALUES ('delete', OLD.id, OLD.file_name, OLD.detail, OLD.location);
+            INSERT INTO results_fts(rowid, file_name, detail, location)
+            VALUES (NEW.id, NEW.file_name, NEW.detail, NEW.location);
+        END
+    """)
+    # 트리거 생성 이후 행은 트리거가 색인하므로 backfill은 이 id까지만
+    last = conn.execute("SELECT IFNULL(MAX(id), 0) FROM results").fetchone()[0]
+    conn.execute("CREATE TABLE IF NOT EXISTS results_fts_backfill (upto INTEGER)")
+    conn.execute("DELETE FROM results_fts_backfill")
+    conn.execute("INSERT INTO results_fts_backfill (upto) VALUES (?)", (last,))
+
+
+def _v4_fts_backfill(conn, after_id: int, limit: int):
+    if not has_table(conn, "results_fts_backfill"):
+        return None
+    upto = conn.execute("SELECT upto FROM results_fts_backfill").fetchone()[0]
+    row = conn.execute(
+        "SELECT MAX(id) FROM (SELECT id FROM results WHERE id > ? AND id <= ? ORDER BY id LIMIT ?)",
+        (after_id, upto, limit)
+    ).fetchone()
+    if row[0] is None:
+        with conn:
+            conn.execute("DROP TABLE results_fts_backfill")
+        return None
+    with conn:
+        conn.execute(
+            "INSERT INTO results_fts(rowid, file_name, detail, location) "
+            "SELECT id, file_name, detail, location FROM results WHERE id > ? AND id <= ?",
+            (after_id, row[0])
+        )
+    return row[0]
+
+
+# ts_epoch backfill(v3) 전 행은 ts에서 계산한 값으로 (backfill이 같은 값을 채우므로 집계 키가 바뀌지 않음)
+_EPOCH_OR_TS = "IFNULL({p}.ts_epoch, " + _TS_EPOCH_SQL.format(ts="{p}.ts") + ")"
+
+# 일별 집계 키: day = ts_epoch의 0시(ts 없음 = -1), 나머지 NULL은 ''
+_ROLLUP_KEY = (f"{_EPOCH_OR_TS} - {_EPOCH_OR_TS} % 86400", "IFNULL({p}.defect_type, '')",
+               "IFNULL({p}.severity, '')", "IFNULL({p}.location, '')", "IFNULL({p}.action, '')")
+
+
+def _rollup_key(prefix: str) -> str:
+    day, *rest = (k.format(p=prefix) for k in _ROLLUP_KEY)
+    return ", ".join([f"IFNULL({day}, -1)"] + rest)
+
+
+def _v5_rollup(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS results_daily (
+            day         INTEGER NOT NULL,   -- 그날 0시의 ts_epoch
+            defect_type TEXT NOT NULL,
+            severity    TEXT NOT NULL,
+            location    TEXT NOT NULL,
+            action      TEXT NOT NULL,
+            cnt         INTEGER NOT NULL,
+            PRIMARY KEY (day, defect_type, severity, location, action)
+        ) WITHOUT ROWID
+    """)
+    upsert = ("INSERT INTO results_daily (day, defect_type, severity, location, action, cnt) "
+              "VALUES ({key}, {d}) ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt;")
+    add, sub = upsert.format(key=_rollup_key("NEW"), d=1), upsert.format(key=_rollup_key("OLD"), d=-1)
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_results_daily_ins AFTER INSERT ON results BEGIN {add} END")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_results_daily_del AFTER DELETE ON results BEGIN {sub} END")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_results_daily_upd
+        AFTER UPDATE OF ts, ts_epoch, defect_type, severity, location, action ON results
+        BEGIN {sub} {add} END
+    """)
+    # 트리거 이전 행만 backfill로 집계
+    last = conn.execute("SELECT IFNULL(MAX(id), 0) FROM results").fetchone()[0]
+    conn.execute("DELETE FROM results_daily")
+    conn.execute("CREATE TABLE IF NOT EXISTS results_daily_backfill (upto INTEGER)")
+    conn.execute("DELETE FROM results_daily_backfill")
+    conn.execute("INSERT INTO results_daily_backfill (upto) VALUES (?)", (last,))
+
+
+def _rollup_add_range(conn, lo_id: int, hi_id: int):
+    conn.execute(f"""
+        INSERT INTO results_daily (day, defect_type, severity, location, action, cnt)
+        SELECT {_rollup_key("r")}, COUNT(*) FROM results r
+        WHERE r.id > ? AND r.id <= ?
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt
+    """, (lo_id, hi_id))
+
+
+def _v5_rollup_backfill(conn, after_id: int, limit: int):
+    if not has_table(conn, "results_daily_backfill"):
+        return None
+    upto = conn.execute("SELECT upto FROM results_daily_backfill").fetchone()[0]
+    # 집계는 행 단위 UPDATE보다 훨씬 가벼우므로 chunk를 크게 잡음
+    row = conn.execute(
+        "SELECT MAX(id) FROM (SELECT id FROM results WHERE id > ? AND id <= ? ORDER BY id LIMIT ?)",
+        (after_id, upto, limit * 25)
+    ).fetchone()
+    if row[0] is None:
+        with conn:
+            conn.execute("DROP TABLE results_daily_backfill")
+        return None
+    with conn:
+        _rollup_add_range(conn, after_id, row[0])
+    return row[0]
+
+
+def rebuild_daily_rollup(conn, extra=()):
+    """
+    results_daily를 results에서 처음부터 다시 집계 (한 트랜잭션)
+    extra: 같은 트랜잭션에서 더할 [(day, defect_type, severity, location, action, cnt)] (아카이브 집계 등)
+    """
+    with conn:
+        conn.execute("DELETE FROM results_daily")
+        if has_table(conn, "results_data") and not has_table(conn, "results_legacy"):
+            conn.execute(f"""
+                INSERT INTO results_daily (day, defect_type, severity, location, action, cnt)
+                {rollup_counts_sql()}
+                ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt
+            """)
+        else:
+            _rollup_add_range(conn, -1, 1 << 62)
+        conn.executemany("""
+            INSERT INTO results_daily (day, defect_type, severity, location, action, cnt)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt
+        """, extra)
+
+
+def _v6_fingerprints(conn):
+    # 파일 지문 캐시: stat 값이 그대로면 sha256을 다시 읽지 않음
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_fingerprints (
+            path       TEXT PRIMARY KEY,   -- 절대 경로
+            size       INTEGER NOT NULL,
+            mtime_ns   INTEGER NOT NULL,
+            inode      INTEGER NOT NULL,
+            sha256     TEXT NOT NULL,
+            checked_ts TEXT
+        ) WITHOUT ROWID
+    """)
+
+
+# 범주형 컬럼 → 값 사전 테이블 (results_data에는 {컬럼}_id 정수만 저장)
+CATEGORY_TABLES = {
+    "defect_type": "results_defect_types",
+    "severity": "results_severities",
+    "location": "results_locations",
+    "action": "results_actions",
+}
+
+_DATA_COLUMNS = ("id", "file_name", "image_path", "image_hash", "defect_type", "severity", "location",
+                 "score", "detail", "action", "ts", "phash", "ts_epoch")
+
+
+def _cat_value(col: str, prefix: str) -> str:
+    return f"(SELECT value FROM {CATEGORY_TABLES[col]} WHERE id = {prefix}.{col}_id)"
+
+
+def _cat_id(col: str, expr: str) -> str:
+    return f"(SELECT id FROM {CATEGORY_TABLES[col]} WHERE value = {expr})"
+
+
+def rollup_counts_sql(table: str = "results_data", where: str = "1") -> str:
+    """
+    results_data 행(조건 where)을 일별 집계 키별로 세는 SELECT → (day, 결함, 등급, 위치, 처리, cnt).
+    범주형 id로 GROUP BY 한 뒤 사전 테이블 값을 붙임 (뷰 results로 세면 행마다 조인)
+    """
+    return f"""
+        SELECT g.day, IFNULL(t.value, ''), IFNULL(s.value, ''), IFNULL(l.value, ''), IFNULL(a.value, ''), g.n
+        FROM (SELECT IFNULL(ts_epoch - ts_epoch % 86400, -1) AS day,
+                     defect_type_id, severity_id, location_id, action_id, COUNT(*) AS n
+              FROM {table} WHERE {where} GROUP BY 1, 2, 3, 4, 5) g
+        LEFT JOIN {CATEGORY_TABLES["defect_type"]} t ON t.id = g.defect_type_id
+        LEFT JOIN {CATEGORY_TABLES["severity"]} s ON s.id = g.severity_id
+        LEFT JOIN {CATEGORY_TABLES["location"]} l ON l.id = g.location_id
+        LEFT JOIN {CATEGORY_TABLES["action"]} a ON a.id = g.action_id
+        WHERE true
+    """
+
+
+def _v7_rollup_key(p: str) -> str:
+    """results_data 행({p})의 일별 집계 키 (범주형 id → 값)"""
+    return ", ".join([f"IFNULL({p}.ts_epoch - {p}.ts_epoch % 86400, -1)"]
+                     + [f"IFNULL({_cat_value(c, p)}, '')" for c in ("defect_type", "severity", "location", "action")])
+
+
+def _v7_view(conn, legacy: bool):
+    """
+    호환 뷰 results + 뷰 쓰기용 INSTEAD OF 트리거 (외부 스크립트, 이전 단계 backfill용. 앱은 results_data에 직접 씀).
+    legacy=True(행 복사 backfill 중)면 아직 옮기지 않은 results_legacy 행도 뷰에 포함하고 수정/삭제도 양쪽에 반영
+    """
+    conn.execute("DROP VIEW IF EXISTS results")   # 뷰의 INSTEAD OF 트리거도 함께 삭제
+    conn.execute(f"""
+        CREATE VIEW results AS
+        SELECT d.id, d.file_name, d.image_path, d.image_hash,
+               t.value AS defect_type, s.value AS severity, l.value AS location,
+               d.score, d.detail, a.value AS action, d.ts, d.phash, d.ts_epoch
+        FROM results_data d
+        LEFT JOIN {CATEGORY_TABLES["defect_type"]} t ON t.id = d.defect_type_id
+        LEFT JOIN {CATEGORY_TABLES["severity"]} s ON s.id = d.severity_id
+        LEFT JOIN {CATEGORY_TABLES["location"]} l ON l.id = d.location_id
+        LEFT JOIN {CATEGORY_TABLES["action"]} a ON a.id = d.action_id
+    """ + (f" UNION ALL SELECT {', '.join(_DATA_COLUMNS[:-1])}, {_EPOCH_OR_TS.format(p='results_legacy')} "
+           f"FROM results_legacy" if legacy else ""))
+
+    def add_value(col: str) -> str:
+        return f"INSERT OR IGNORE INTO {CATEGORY_TABLES[col]} (value) SELECT NEW.{col} WHERE NEW.{col} IS NOT NULL;"
+
+    data_cols = ", ".join(c + "_id" if c in CATEGORY_TABLES else c for c in _DATA_COLUMNS)
+    new_values = ", ".join(
+        _cat_id(c, f"NEW.{c}") if c in CATEGORY_TABLES
+        else ("IFNULL(NEW.ts, datetime('now','localtime'))" if c == "ts" else f"NEW.{c}")
+        for c in _DATA_COLUMNS
+    )
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_view_ins INSTEAD OF INSERT ON results BEGIN
+            {" ".join(add_value(c) for c in CATEGORY_TABLES)}
+            INSERT INTO results_data ({data_cols}) VALUES ({new_values});
+        END
+    """)
+    # UPDATE는 SET에 나온 컬럼만 옮기도록 컬럼별 트리거 (FTS/집계 트리거가 불필요하게 돌지 않게)
+    for c in _DATA_COLUMNS[1:]:
+        body = (f"{add_value(c)} UPDATE results_data SET {c}_id = {_cat_id(c, f'NEW.{c}')} WHERE id = OLD.id;"
+                if c in CATEGORY_TABLES else f"UPDATE results_data SET {c} = NEW.{c} WHERE id = OLD.id;")
+        if legacy:
+            body += f" UPDATE results_legacy SET {c} = NEW.{c} WHERE id = OLD.id;"
+        conn.execute(f"CREATE TRIGGER trg_results_view_upd_{c} INSTEAD OF UPDATE OF {c} ON results BEGIN {body} END")
+    legacy_del = ""
+    if legacy:
+        # 아직 안 옮긴 행의 삭제: 집계/색인에서 빼고 삭제 (복사로 인한 삭제는 반영하지 않도록 트리거 대신 여기서)
+        legacy_del = (f"INSERT INTO results_daily (day, defect_type, severity, location, action, cnt) "
+                      f"SELECT {_rollup_key('l')}, -1 FROM results_legacy l WHERE l.id = OLD.id "
+                      f"ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt;")
+        if has_table(conn, "results_fts"):
+            legacy_del += ("INSERT INTO results_fts(results_fts, rowid, file_name, detail, location) "
+                           "SELECT 'delete', id, file_name, detail, location FROM results_legacy WHERE id = OLD.id;")
+        legacy_del += "DELETE FROM results_legacy WHERE id = OLD.id;"
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_view_del INSTEAD OF DELETE ON results BEGIN
+            DELETE FROM results_data WHERE id = OLD.id;
+            {legacy_del}
+        END
+    """)
+
+
+def _v7_legacy_triggers(conn):
+    """복사 중인 results_legacy 행을 뷰로 수정할 때 ts_epoch/FTS/일별 집계 유지 (v3~v5 UPDATE 트리거와 같은 내용)"""
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_legacy_ts_epoch_upd AFTER UPDATE OF ts ON results_legacy
+        WHEN NEW.ts_epoch IS OLD.ts_epoch
+        BEGIN
+            UPDATE results_legacy SET ts_epoch = {_TS_EPOCH_SQL.format(ts="NEW.ts")} WHERE id = NEW.id;
+        END
+    """)
+    upsert = ("INSERT INTO results_daily (day, defect_type, severity, location, action, cnt) "
+              "VALUES ({key}, {d}) ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt;")
+    add, sub = upsert.format(key=_rollup_key("NEW"), d=1), upsert.format(key=_rollup_key("OLD"), d=-1)
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_legacy_daily_upd
+        AFTER UPDATE OF ts, ts_epoch, defect_type, severity, location, action ON results_legacy
+        BEGIN {sub} {add} END
+    """)
+    if has_table(conn, "results_fts"):
+        conn.execute("""
+            CREATE TRIGGER trg_results_legacy_fts_upd AFTER UPDATE OF file_name, detail, location ON results_legacy
+            BEGIN
+                INSERT INTO results_fts(results_fts, rowid, file_name, detail, location)
+                VALUES ('delete', OLD.id, OLD.file_name, OLD.detail, OLD.location);
+                INSERT INTO results_fts(rowid, file_name, detail, location)
+                VALUES (NEW.id, NEW.file_name, NEW.detail, NEW.location);
+            END
+        """)
+
+
+def _v7_insert_triggers(conn, copied_upto: int | None = None):
+    """
+    results_data INSERT 시 FTS 색인/일별 집계 트리거.
+    copied_upto: 행 복사 backfill 중에는 이 id 이하(results_legacy에서 옮겨 오는 행, 이미 색인·집계됨)는 건너뜀
+    """
+    when = f"WHEN NEW.id > {int(copied_upto)}" if copied_upto is not None else ""
+    conn.execute("DROP TRIGGER IF EXISTS trg_results_fts_ins")
+    conn.execute("DROP TRIGGER IF EXISTS trg_results_daily_ins")
+    if has_table(conn, "results_fts"):
+        conn.execute(f"""
+            CREATE TRIGGER trg_results_fts_ins AFTER INSERT ON results_data {when} BEGIN
+                INSERT INTO results_fts(rowid, file_name, detail, location)
+                VALUES (NEW.id, NEW.file_name, NEW.detail, {_cat_value("location", "NEW")});
+            END
+        """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_daily_ins AFTER INSERT ON results_data {when} BEGIN
+            INSERT INTO results_daily (day, defect_type, severity, location, action, cnt)
+            VALUES ({_v7_rollup_key("NEW")}, 1) ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt;
+        END
+    """)
+
+
+def _v7_categories(conn):
+    """
+    results 테이블을 results_data(범주형은 정수 id) + 값 사전 테이블로 재구성하고,
+    같은 이름/컬럼 순서의 호환 뷰 results를 만듦 (조회 쿼리/CSV 내보내기/FTS content는 그대로 동작)
+    여기서는 기존 테이블 이름만 results_legacy로 바꾸고, 행 복사는 backfill이 chunk 단위로 진행 (id 유지)
+    """
+    for table in CATEGORY_TABLES.values():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+    conn.execute("""
+        CREATE TABLE results_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_name      TEXT,
+            image_path     TEXT NOT NULL,
+            image_hash     TEXT,
+            defect_type_id INTEGER REFERENCES results_defect_types(id),
+            severity_id    INTEGER REFERENCES results_severities(id),
+            location_id    INTEGER REFERENCES results_locations(id),
+            score          REAL,
+            detail         TEXT,
+            action_id      INTEGER REFERENCES results_actions(id),
+            ts             TEXT DEFAULT (datetime('now','localtime')),
+            phash          INTEGER,
+            ts_epoch       INTEGER
+        )
+    """)
+    # AUTOINCREMENT: 새 행은 기존 id(삭제된 마지막 id 포함) 다음부터 → 복사해 올 행과 겹치지 않음
+    last = conn.execute("""
+        SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'results'), 0),
+                   IFNULL((SELECT MAX(id) FROM results), 0))
+    """).fetchone()[0]
+    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('results_data', ?)", (last,))
+
+    # 기존 테이블의 인덱스/트리거는 같은 이름으로 results_data에 다시 만듦 (인덱스는 남은 복사를 느리게 할 뿐)
+    for kind, name in conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE tbl_name = 'results' AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL"
+    ).fetchall():
+        conn.execute(f"DROP {kind.upper()} {name}")
+    conn.execute("ALTER TABLE results RENAME TO results_legacy")
+    _v7_legacy_triggers(conn)   # 복사가 끝나 results_legacy를 지울 때 함께 삭제됨
+
+    conn.execute("CREATE UNIQUE INDEX idx_results_image_path ON results_data(image_path)")
+    conn.execute("CREATE UNIQUE INDEX idx_results_image_hash ON results_data(image_hash)")
+    conn.execute("CREATE INDEX idx_results_ts_epoch ON results_data(ts_epoch, defect_type_id, severity_id)")
+    conn.execute("CREATE INDEX idx_results_type_sev_epoch ON results_data(defect_type_id, severity_id, ts_epoch)")
+    conn.execute("CREATE INDEX idx_results_location ON results_data(location_id)")
+    _v7_view(conn, legacy=True)
+
+    # v3 ts_epoch 트리거
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_ts_epoch_ins AFTER INSERT ON results_data
+        WHEN NEW.ts_epoch IS NULL
+        BEGIN
+            UPDATE results_data SET ts_epoch = {_TS_EPOCH_SQL.format(ts="NEW.ts")} WHERE id = NEW.id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_ts_epoch_upd AFTER UPDATE OF ts ON results_data
+        WHEN NEW.ts_epoch IS OLD.ts_epoch
+        BEGIN
+            UPDATE results_data SET ts_epoch = {_TS_EPOCH_SQL.format(ts="NEW.ts")} WHERE id = NEW.id;
+        END
+    """)
+
+    # v4 FTS 트리거 (색인 내용은 그대로, content='results'는 이제 뷰를 읽음)
+    if has_table(conn, "results_fts"):
+        if has_table(conn, "results_fts_backfill"):
+            # 색인 backfill이 남아 있으면 여기서 전체 재색인 (이후 트리거는 모든 행이 색인돼 있다고 가정)
+            conn.execute("INSERT INTO results_fts(results_fts) VALUES ('rebuild')")
+            conn.execute("DROP TABLE results_fts_backfill")
+            conn.execute("UPDATE schema_migrations SET backfill_done = 1 WHERE version = 4")
+        new_loc, old_loc = _cat_value("location", "NEW"), _cat_value("location", "OLD")
+        conn.execute(f"""
+            CREATE TRIGGER trg_results_fts_del AFTER DELETE ON results_data BEGIN
+                INSERT INTO results_fts(results_fts, rowid, file_name, detail, location)
+                VALUES ('delete', OLD.id, OLD.file_name, OLD.detail, {old_loc});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER trg_results_fts_upd AFTER UPDATE OF file_name, detail, location_id ON results_data
+            BEGIN
+                INSERT INTO results_fts(results_fts, rowid, file_name, detail, location)
+                VALUES ('delete', OLD.id, OLD.file_name, OLD.detail, {old_loc});
+                INSERT INTO results_fts(rowid, file_name, detail, location)
+                VALUES (NEW.id, NEW.file_name, NEW.detail, {new_loc});
+            END
+        """)
+
+    # v5 일별 집계 트리거 (집계 테이블은 값 그대로 유지)
+    upsert = ("INSERT INTO results_daily (day, defect_type, severity, location, action, cnt) "
+              "VALUES ({key}, {d}) ON CONFLICT DO UPDATE SET cnt = cnt + excluded.cnt;")
+    add, sub = upsert.format(key=_v7_rollup_key("NEW"), d=1), upsert.format(key=_v7_rollup_key("OLD"), d=-1)
+    conn.execute(f"CREATE TRIGGER trg_results_daily_del AFTER DELETE ON results_data BEGIN {sub} END")
+    conn.execute(f"""
+        CREATE TRIGGER trg_results_daily_upd
+        AFTER UPDATE OF ts_epoch, defect_type_id, severity_id, location_id, action_id ON results_data
+        BEGIN {sub} {add} END
+    """)
+    if conn.execute("SELECT 1 FROM results_legacy LIMIT 1").fetchone() is None:
+        # 옮길 행이 없으면(새 DB) 바로 최종 형태로
+        conn.execute("DROP TABLE results_legacy")
+        _v7_view(conn, legacy=False)
+        _v7_insert_triggers(conn)
+    else:
+        _v7_insert_triggers(conn, copied_upto=last)
+
+
+def _v7_categories_backfill(conn, after_id: int, limit: int):
+    """results_legacy → results_data 행 복사 (한 chunk = 사전 값 추가 + 복사 + 원본 삭제, 한 트랜잭션)"""
+    if not has_table(conn, "results_legacy"):
+        return None
+    # 행을 옮기기만 하므로 chunk를 크게 잡음
+    row = conn.execute(
+        "SELECT MAX(id) FROM (SELECT id FROM results_legacy WHERE id > ? ORDER BY id LIMIT ?)",
+        (after_id, limit * 5)
+    ).fetchone()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if row[0] is None:
+            # 다 옮김: 빈 원본 삭제, 뷰와 INSERT 트리거를 최종 형태로
+            conn.execute("DROP TABLE results_legacy")
+            _v7_view(conn, legacy=False)
+            _v7_insert_triggers(conn)
+            return None
+        _v7_copy(conn, "id > ? AND id <= ?", (after_id, row[0]))
+    return row[0]
+
+
+def _v7_copy(conn, where: str, args):
+    """results_legacy에서 조건(where)에 맞는 행을 results_data로 옮김 (호출한 쪽 트랜잭션 안에서)"""
+    for col, table in CATEGORY_TABLES.items():
+        conn.execute(f"INSERT OR IGNORE INTO {table} (value) SELECT DISTINCT {col} FROM results_legacy "
+                     f"WHERE {where} AND {col} IS NOT NULL ORDER BY 1", args)
+    # 복사 도중 다른 프로세스가 같은 이미지를 새로 저장했으면 새 행을 남김
+    conn.execute(f"""
+        INSERT OR IGNORE INTO results_data
+        SELECT id, file_name, image_path, image_hash,
+               {_cat_id("defect_type", "r.defect_type")}, {_cat_id("severity", "r.severity")},
+               {_cat_id("location", "r.location")}, score, detail, {_cat_id("action", "r.action")},
+               ts, phash, IFNULL(ts_epoch, {_TS_EPOCH_SQL.format(ts="r.ts")})
+        FROM results_legacy r WHERE {where} ORDER BY id
+    """, args)
+    conn.execute(f"DELETE FROM results_legacy WHERE {where}", args)
+
+
+def copy_legacy_rows(conn, ids):
+    """
+    v7 행 복사 backfill 중 아직 results_legacy에 있는 행(ids 중)을 먼저 results_data로 옮김.
+    수정/삭제 전에 호출하면 results_data 트리거가 색인/집계를 유지 (복사 자체는 색인·집계를 바꾸지 않음)
+    """
+    ids = list(ids)
+    if not ids or not has_table(conn, "results_legacy"):
+        return
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        _v7_copy(conn, f"id IN ({','.join(['?'] * len(part))})", part)
+
+
+MIGRATIONS = [
+    Migration(1, "results 테이블/인덱스", _v1_results),
+    Migration(2, "지각 해시 컬럼", _v2_phash, _v2_phash_backfill),
+    # backfill 전 행(ts_epoch NULL)은 집계 키/뷰/앱 조회가 ts에서 계산한 값을 씀
+    Migration(3, "정수 시각 컬럼(ts_epoch)", _v3_ts_epoch, _v3_ts_epoch_backfill),
+    # 색인이 끝나기 전(backfill 진행 중)에는 search_results가 LIKE로 검색
+    Migration(4, "키워드 전문 검색 색인(FTS5)", _v4_fts, _v4_fts_backfill),
+    # 백필 전 행이 수정/삭제되면 집계가 어긋나므로 시작 시 끝까지 진행
+    Migration(5, "일별 집계 테이블(results_daily)", _v5_rollup, _v5_rollup_backfill, blocking=True),
+    Migration(6, "파일 지문 캐시(file_fingerprints)", _v6_fingerprints),
+    # 이후 results는 뷰. 쓰기는 results_data(범주형 id)로. 복사가 끝날 때까지 앱은 results_legacy도 함께 읽고
+    # 수정/삭제할 행은 copy_legacy_rows로 먼저 옮김 (아카이브 이동은 복사가 끝난 뒤)
+    Migration(7, "범주형 컬럼 사전 인코딩(results_data + 호환 뷰)", _v7_categories, _v7_categories_backfill),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# -------- 실행 --------
+
+def backfill_done(conn, version: int) -> bool:
+    row = conn.execute("SELECT backfill_done FROM schema_migrations WHERE version=?", (version,)).fetchone()
+    return bool(row and row[0])
+
+
+def _columns(conn, table: str) -> set:
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _ensure_log(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT,
+            applied_ts  TEXT,
+            backfill_id INTEGER DEFAULT 0,   -- backfill이 처리한 마지막 results.id
+            backfill_done INTEGER DEFAULT 0
+        )
+    """)
+    conn.commit()
+
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_version(conn) -> int:
+    """시작 시 확인: 앱보다 새 스키마면 SchemaVersionError, 아니면 현재 버전"""
+    v = current_version(conn)
+    if v > LATEST_VERSION:
+        raise SchemaVersionError(
+            f"DB 스키마 버전 {v}이(가) 이 앱이 지원하는 버전 {LATEST_VERSION}보다 높습니다. 앱을 업데이트하세요."
+        )
+    return v
+
+
+def migrate(conn, target: int = LATEST_VERSION) -> int:
+    """
+    target 버전까지 DDL 단계를 적용하고 적용 후 버전을 반환.
+    BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡으므로 여러 프로세스가 동시에 열어도 한 번만 적용됨.
+    """
+    check_version(conn)
+    _ensure_log(conn)
+    for m in MIGRATIONS:
+        if m.version > target:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= m.version:  # 다른 프로세스가 먼저 적용
+                conn.rollback()
+                continue
+            m.up(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO schema_migrations (version, name, applied_ts, backfill_id, backfill_done) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (m.version, m.name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), int(m.backfill is None))
+            )
+            conn.execute(f"PRAGMA user_version = {int(m.version)}")
+            conn.commit()
+            print(f"[MIGRATE] v{m.version} {m.name}")
+        except Exception:
+            conn.rollback()
+            raise
+    run_backfills(conn, blocking_only=True)
+    return current_version(conn)
+
+
+def pending_backfills(conn) -> list:
+    _ensure_log(conn)
+    done = {v for v, in conn.execute("SELECT version FROM schema_migrations WHERE backfill_done = 1")}
+    v = current_version(conn)
+    return [m for m in MIGRATIONS if m.backfill and m.version <= v and m.version not in done]
+
+
+def run_backfills(conn, chunk_size: int = DB_MIGRATION_CHUNK, stop_event=None,
+                  blocking_only: bool = False) -> bool:
+    """
+    남은 backfill을 chunk_size행씩 진행. stop_event가 set되면 현재 chunk까지만 하고 중단.
+    반환: 모두 끝났으면 True
+    """
+    for m in pending_backfills(conn):
+        if blocking_only and not m.blocking:
+            continue
+        row = conn.execute("SELECT backfill_id FROM schema_migrations WHERE version=?", (m.version,)).fetchone()
+        after = row[0] if row else 0
+        n = 0
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                print(f"[MIGRATE] v{m.version} backfill 중단 (id {after}까지, 다음 실행 때 이어서 진행)")
+                return False
+            last = m.backfill(conn, after, chunk_size)
+            with conn:
+                if last is None:
+                    conn.execute("UPDATE schema_migrations SET backfill_done=1 WHERE version=?", (m.version,))
+                else:
+                    conn.execute("UPDATE schema_migrations SET backfill_id=? WHERE version=?", (last, m.version))
+            if last is None:
+                print(f"[MIGRATE] v{m.version} backfill 완료 ({n}개 chunk)")
+                break
+            after = last
+            n += 1
+    return True
+
+
+def run_backfills_in_background(db_path: str, chunk_size: int = DB_MIGRATION_CHUNK) -> threading.Event:
+    """데몬 스레드에서 backfill 진행 (전용 연결 사용). 반환된 Event를 set하면 중단"""
+    stop = threading.Event()
+
+    def _run():
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            run_backfills(conn, chunk_size, stop)
+        except Exception as e:
+            print("[MIGRATE] backfill 오류:", e)
+        finally:
+            conn.close()
+
+    threading.Thread(target=_run, name="db-backfill", daemon=True).start()
+    return stop
+
+
+def status(conn) -> dict:
+    _ensure_log(conn)
+    return {
+        "user_version": current_version(conn),
+        "latest": LATEST_VERSION,
+        "applied": conn.execute(
+            "SELECT version, name, applied_ts, backfill_id, backfill_done FROM schema_migrations ORDER BY version"
+        ).fetchall(),
+        "pending_backfills": [m.version for m in pending_backfills(conn)],
+    }
+
+
+def main():
+    import argparse
+    from db.db import get_db_path, get_connection, rebuild_rollups
+
+    ap = argparse.ArgumentParser(description="DB 스키마 마이그레이션")
+    ap.add_argument("--status", action="store_true", help="버전/백필 상태만 출력")
+    ap.add_argument("--backfill", action="store_true", help="남은 backfill을 끝까지 실행")
+    ap.add_argument("--rebuild-rollup", action="store_true", help="일별 집계(results_daily)를 처음부터 다시 계산")
+    ap.add_argument("--chunk-size", type=int, default=DB_MIGRATION_CHUNK)
+    args = ap.parse_args()
+
+    conn = get_connection()
+    print("[DB PATH]", get_db_path())
+    if not args.status:
+        migrate(conn)
+        if args.backfill:
+            run_backfills(conn, args.chunk_size)
+        if args.rebuild_rollup:
+            rebuild_rollups()   # 아카이브로 옮긴 행의 집계도 포함
+            print("[MIGRATE] results_daily 재집계 완료")
+    for k, v in status(conn).items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
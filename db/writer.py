@@ -0,0 +1,270 @@
+# db/writer.py
+"""
+결과 저장 전용 스레드 (write-behind)
+
+- submit()은 레코드를 큐에 넣고 바로 Future를 반환 — 파일 해시 계산과 커밋은 writer 스레드에서
+- writer 스레드가 큐를 비우며 DB_WRITE_CHUNK개가 모이거나 DB_WRITER_WINDOW_MS가 지나면
+  한 트랜잭션으로 묶어 커밋 (group commit, db.db._write_chunk 재사용)
+  결과를 바로 기다리는 호출(urgent: insert_result/upsert_result, 단건 저장, flush)이 있으면
+  window를 기다리지 않고 이미 큐에 들어와 있는 것만 묶어 바로 커밋
+- 결과 외의 작은 쓰기(분류 캐시, 파일 지문, 일괄 저장 chunk)도 run_write로 이 스레드에서 실행
+  → 앱의 평상시 쓰기는 연결 하나로 직렬화되어 저장끼리 잠금 경합 없음
+  (예외: 마이그레이션/backfill, 아카이브 이동, 집계 재계산, 삭제 같은 관리 작업은 각자 연결에서
+   짧은 트랜잭션으로 쓰고 busy_timeout으로 대기)
+- 큐는 DB_WRITER_QUEUE개로 제한 (가득 차면 submit이 대기 = 메모리 상한)
+- Future 결과: (outcome, id) — outcome은 "inserted" / "updated" / "duplicate".
+  파일을 못 읽는 등 준비 실패와 DB 오류는 Future의 예외로 전달
+- add_done_callback/ callback은 writer 스레드에서 호출됨 (GUI 갱신은 Qt 시그널로 넘길 것)
+- shutdown()은 큐에 남은 레코드를 모두 저장한 뒤 스레드를 끝냄 (프로세스 종료 시 atexit로도 호출)
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from utils.config import DB_WRITE_CHUNK, DB_HASH_WORKERS, DB_WRITER_QUEUE, DB_WRITER_WINDOW_MS
+from db import db
+
+_STOP = object()
+
+
+class ResultWriter:
+    def __init__(self, maxsize: int = DB_WRITER_QUEUE, batch_size: int = DB_WRITE_CHUNK,
+                 window_ms: int = DB_WRITER_WINDOW_MS, workers: int = DB_HASH_WORKERS):
+        self.batch_size = max(1, int(batch_size))
+        self.window = max(0, int(window_ms)) / 1000.0
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._lock = threading.Lock()          # 통계용
+        self._submit_lock = threading.Lock()   # 종료 표시와 큐 넣기 순서 보장 (큐가 차서 대기해도 writer는 계속 비움)
+        self._closed = False
+        self._stats = {"submitted": 0, "written": 0, "errors": 0, "commits": 0, "max_batch": 0, "jobs": 0}
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    # -------- 생산자 쪽 --------
+    def submit(self, record: dict, upsert: bool = False, callback=None, timeout: float | None = None,
+               urgent: bool = False) -> Future:
+        """
+        record: insert_result 인자와 같은 키의 dict (image_path 필수)
+        upsert=True면 같은 이미지 해시(없으면 같은 경로)의 행을 갱신
+        callback(future)는 저장이 끝나면 writer 스레드에서 호출
+        urgent=True: 호출자가 결과를 바로 기다림 → group commit window 없이 커밋
+        큐가 가득 차 timeout 안에 넣지 못하면 queue.Full
+        """
+        fut = Future()
+        if callback is not None:
+            fut.add_done_callback(callback)
+        self._put((dict(record), bool(upsert), fut, bool(urgent)), timeout)
+        with self._lock:
+            self._stats["submitted"] += 1
+        return fut
+
+    def call(self, fn, urgent: bool = False, timeout: float | None = None) -> Future:
+        """fn(conn)을 writer 스레드의 연결에서 큐 순서대로 실행 → Future(fn의 반환값). 커밋은 fn 안에서"""
+        fut = Future()
+        self._put((fn, False, fut, bool(urgent)), timeout)
+        return fut
+
+    def _put(self, item: tuple, timeout: float | None = None):
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("저장 스레드가 이미 종료되었습니다.")
+            self._queue.put(item, timeout=timeout)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """지금까지 submit된 레코드가 모두 커밋될 때까지 대기. timeout이면 False"""
+        barrier = Future()
+        with self._submit_lock:
+            if self._closed:
+                self._thread.join(timeout)
+                return not self._thread.is_alive()
+            self._queue.put((None, False, barrier, True))
+        try:
+            barrier.result(timeout)
+            return True
+        except FutureTimeout:
+            return False
+
+    def shutdown(self, timeout: float | None = None) -> bool:
+        """남은 레코드를 모두 저장하고 스레드 종료 (여러 번 호출해도 됨)"""
+        with self._submit_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(_STOP)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["queued"] = self._queue.qsize()
+        return s
+
+    # -------- writer 스레드 --------
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = []
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)
+                urgent = item[3]
+                deadline = time.monotonic() + self.window
+                # 첫 레코드 이후 window 동안, 또는 batch_size개가 찰 때까지 모아서 한 번에 커밋.
+                # 결과를 기다리는 호출자가 있으면 기다리지 않고 이미 들어와 있는 것만 묶음
+                while len(batch) < self.batch_size:
+                    remaining = 0 if urgent else deadline - time.monotonic()
+                    try:
+                        nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is _STOP:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                    urgent = urgent or nxt[3]
+            if stop:
+                # 종료 요청 전에 들어온 레코드까지 모두 저장
+                while True:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is not _STOP:
+                        batch.append(nxt)
+            for k in range(0, len(batch), self.batch_size):
+                self._write(batch[k:k + self.batch_size])
+        db.close_connection()
+
+    def _write(self, items: list):
+        """큐 순서대로: 결과 레코드는 모아서 저장, 작업(call)과 flush 대기 지점은 앞의 저장이 끝난 뒤 실행"""
+        records = []
+        for rec, upsert, fut, _ in items + [(None, False, None, False)]:
+            if isinstance(rec, dict):
+                if fut.set_running_or_notify_cancel():
+                    records.append((rec, upsert, fut))
+                continue
+            self._write_records(records)
+            records = []
+            if fut is None:
+                break
+            if rec is None:
+                fut.set_result(True)   # flush() 대기 지점
+            else:
+                self._run_job(rec, fut)
+
+    def _write_records(self, records: list):
+        # 같은 모드(insert/upsert)끼리 순서대로 묶어 저장
+        k = 0
+        while k < len(records):
+            j = k
+            while j < len(records) and records[j][1] == records[k][1]:
+                j += 1
+            self._write_group(records[k:j], records[k][1])
+            k = j
+
+    def _run_job(self, fn, fut: Future):
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            db.ensure_schema()
+            result = fn(db._connect())
+        except Exception as e:
+            print("[WRITER] 작업 실패:", e)
+            self._fail(fut, e)
+            return
+        with self._lock:
+            self._stats["jobs"] += 1
+        fut.set_result(result)
+
+    def _write_group(self, group: list, upsert: bool):
+        futures = [fut for _, _, fut in group]
+        ready = []
+        try:
+            db.ensure_schema()
+            for i, r in db._prepare_many([rec for rec, _, _ in group], self.workers):
+                if isinstance(r, Exception):
+                    self._fail(futures[i], r)
+                else:
+                    ready.append((i, r))
+            if not ready:
+                return
+            conn = db._connect()
+            outcomes = [None] * len(group)
+            db._write_chunk(conn, ready, upsert, outcomes)
+            by_hash = db._existing_rows(conn, "image_hash", [r["image_hash"] for _, r in ready])
+            by_path = db._existing_rows(conn, "image_path", [r["image_path"] for _, r in ready])
+        except Exception as e:
+            print("[WRITER] 저장 실패:", e)
+            for fut in futures:
+                if not fut.done():
+                    self._fail(fut, e)
+            return
+
+        with self._lock:
+            self._stats["written"] += len(ready)
+            self._stats["commits"] += 1
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(ready))
+        for i, r in ready:
+            row = by_hash.get(r["image_hash"]) or by_path.get(r["image_path"])
+            futures[i].set_result((outcomes[i], row[0] if row else None))
+
+    def _fail(self, fut: Future, exc: Exception):
+        with self._lock:
+            self._stats["errors"] += 1
+        fut.set_exception(exc)
+
+
+# -------- 프로세스 공용 writer --------
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> ResultWriter:
+    """공용 writer (처음 호출 시 스레드 시작, shutdown 후 다시 호출하면 새로 시작)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer._closed:
+            _writer = ResultWriter()
+        return _writer
+
+
+def submit_result(record: dict, upsert: bool = False, callback=None, urgent: bool = False) -> Future:
+    return get_writer().submit(record, upsert, callback, urgent=urgent)
+
+
+def run_write(fn, urgent: bool = False) -> Future:
+    """
+    fn(conn)을 공용 writer 스레드의 연결에서 실행 → Future(fn의 반환값)
+    writer 스레드 안에서 부르면(결과 저장 중 지문 캐시 등) 기다리지 않고 그 자리에서 실행
+    """
+    w = get_writer()
+    if threading.current_thread() is w._thread:
+        fut = Future()
+        try:
+            fut.set_result(fn(db._connect()))
+        except Exception as e:
+            print("[WRITER] 작업 실패:", e)
+            fut.set_exception(e)
+        return fut
+    return w.call(fn, urgent)
+
+
+def writer_report() -> dict:
+    with _writer_lock:
+        return _writer.stats() if _writer is not None else {}
+
+
+def shutdown_writer(timeout: float | None = None) -> bool:
+    """남은 저장을 끝내고 공용 writer 종료 (앱 종료 시 호출)"""
+    with _writer_lock:
+        w = _writer
+    return w.shutdown(timeout) if w is not None else True
+
+
+atexit.register(shutdown_writer)
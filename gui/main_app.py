@@ -3,36 +3,46 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 from gui.main_window import Ui_MainWindow
 
 from utils.file_handler import get_image_file
-from api.openai_api import classify_image
 from db.db import (
     ensure_schema, get_db_path,
-    insert_result, upsert_result,
-    fetch_results, search_results, delete_results
+    search_results, delete_results,
+    search_results_page, approx_count, new_image_paths, archive_in_background
 )
-from utils.config import DEFECT_LABELS
+from utils.config import DEFECT_LABELS, ACTIONS, HTTP_WARMUP, RESULTS_PAGE_SIZE, ARCHIVE_ON_START
+from api.backends import warm_up_in_background
+from db.migrations import SchemaVersionError, run_backfills_in_background
+from db.writer import submit_result, shutdown_writer
 
 from pathlib import Path
 
 import os
-import sqlite3
-import pandas as pd
 
 # 통계 대시보드 연결
 from gui.stats_view import StatsDashboard
-
-# Action에 Pass 추가 (정상일 때)
-ACTIONS = ["Pass", "Rework", "Scrap", "Hold", "Reject"]
+# 폴더 일괄 판정 백그라운드 작업
+from gui.workers import BatchClassifyWorker, ClassifyWorker, ExportWorker, CsvExportWorker
 
 
 class MainWindow(QtWidgets.QMainWindow):
+    save_done = QtCore.pyqtSignal(str, object)   # 경로, 저장 Future (저장 스레드 → GUI 스레드)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+        self.save_done.connect(self._on_save_done)
 
+        self._backfill_stop = None
         try:
             ensure_schema()
             print("[DB PATH]", get_db_path())
+            # 마이그레이션의 기존 행 채우기는 앱 사용 중 백그라운드에서 이어서 진행
+            self._backfill_stop = run_backfills_in_background(get_db_path())
+            # 끝난 기간의 결과를 아카이브 DB로 이동 (db/archive.py)
+            if ARCHIVE_ON_START:
+                archive_in_background()
+        except SchemaVersionError as e:
+            QtWidgets.QMessageBox.critical(self, "DB 버전 오류", str(e))
         except Exception as e:
             print("[DB] ensure_schema error:", e)
 
@@ -41,6 +51,15 @@ class MainWindow(QtWidgets.QMainWindow):
         self._batch_idx = -1
         self._last_classify = None
         self._last_search = None
+        self._page = None           # 현재 페이지 {"rows", "next", "prev"}
+        self._page_cursor = None    # 현재 페이지를 불러온 커서 (None = 첫 페이지)
+        self._page_no = 1
+        self._page_total = None     # approx_count 결과 (개수, 정확 여부)
+        self._batch_worker = None
+        self._classify_worker = None
+        self._export_worker = None
+        self._csv_worker = None
+        self._stream_fields = {}
 
         self._prepare_table_headers()
 
@@ -60,6 +79,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self._ensure_toolbar_for_search_and_delete()
         self._refresh_results()
 
+        # 첫 분류가 느리지 않도록 API 연결을 미리 열어 둠
+        if HTTP_WARMUP:
+            warm_up_in_background()
+
     # -------- UI 초기화 --------
     def _prepare_table_headers(self):
         t = self.ui.tableResults
@@ -94,11 +117,47 @@ class MainWindow(QtWidgets.QMainWindow):
         if not self.current_image_path:
             QtWidgets.QMessageBox.information(self, "안내", "먼저 이미지를 업로드하세요.")
             return
+        if self._classify_worker is not None and self._classify_worker.isRunning():
+            return
+        self._last_classify = None
+        self._stream_fields = {}
         self.ui.txtResult.setPlainText("불량 유형 분류 중…")
-        result = classify_image(self.current_image_path)  # label, confidence, description, severity, location, action
-        self._last_classify = result
+        self.ui.btnClassify.setEnabled(False)
+
+        worker = ClassifyWorker(self.current_image_path, parent=self)
+        worker.field_ready.connect(self._on_classify_field)
+        worker.succeeded.connect(self._on_classify_done)
+        worker.failed.connect(self._on_classify_failed)
+        self._classify_worker = worker
+        worker.start()
+
+    def _on_classify_field(self, key: str, value):
+        # 스트리밍 중간 표시 (최종 결과가 오면 설명으로 교체)
+        if key not in ("label", "severity", "action", "location", "confidence"):
+            return
+        self._stream_fields[key] = value
+        lines = [f"{k}: {self._stream_fields[k]}"
+                 for k in ("label", "confidence", "severity", "location", "action")
+                 if k in self._stream_fields]
+        self.ui.txtResult.setPlainText("불량 유형 분류 중…\n" + "\n".join(lines))
+
+    def _on_classify_done(self, path: str, result: dict):
+        self.ui.btnClassify.setEnabled(True)
+        self._classify_worker = None
+        if path != self.current_image_path:
+            return  # 그 사이 다른 이미지를 선택함
+        self._last_classify = result  # label, confidence, description, severity, location, action
         self.ui.txtResult.setPlainText(result.get("description") or "")
 
+    def _on_classify_failed(self, path: str, message: str):
+        self.ui.btnClassify.setEnabled(True)
+        self._classify_worker = None
+        if path != self.current_image_path:
+            return
+        self._last_classify = None
+        self.ui.txtResult.clear()
+        QtWidgets.QMessageBox.warning(self, "분류 실패", f"분류하지 못했습니다. 잠시 후 다시 시도하세요.\n{message}")
+
     def on_save(self):
         if not self.current_image_path:
             QtWidgets.QMessageBox.information(self, "안내", "이미지를 먼저 업로드하세요.")
@@ -146,27 +205,32 @@ class MainWindow(QtWidgets.QMainWindow):
 
         try:
             abs_path = str(Path(self.current_image_path).resolve())
-            upsert_result(
-                abs_path,
-                defect_type,
-                severity,
-                location,  
-                score,
-                desc,
-                action
+            # 해시 계산/커밋은 저장 스레드에서 — 끝나면 save_done 시그널로 결과를 받음 (단건이라 바로 커밋)
+            submit_result(
+                dict(image_path=abs_path, defect_type=defect_type, severity=severity,
+                     location=location, score=score, detail=desc, action=action),
+                upsert=True,
+                callback=lambda fut, p=abs_path: self.save_done.emit(p, fut),
+                urgent=True,
             )
-            QtWidgets.QMessageBox.information(self, "완료", "DB 저장 완료.")
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "DB 오류", f"저장 중 오류 발생: {e}")
             return
 
-        self._refresh_results()
         self._advance_batch_if_any()
 
+    def _on_save_done(self, path: str, fut):
+        try:
+            fut.result()
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "DB 오류", f"저장 중 오류 발생: {e}\n{path}")
+            return
+        self.ui.statusbar.showMessage(f"DB 저장 완료: {Path(path).name}", 3000)
+        self._refresh_results()
+
     def on_view_results(self):
-        rows = fetch_results(limit=200)
         self._last_search = None
-        self._render_rows(rows)
+        self._load_page(None)
 
     # -------- 폴더 업로드 --------
     def on_upload_folder(self):
@@ -183,21 +247,12 @@ class MainWindow(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.information(self, "No images", "선택한 폴더에 이미지가 없습니다.")
             return
 
-        # 이미 저장된 경로 스킵
+        # 이미 저장된 경로 스킵 (DB 쪽 인덱스 조인, 테이블 크기와 무관)
         try:
-            existing_rows = fetch_results(limit=100000)
-            existing_paths = {row[1] for row in existing_rows}  # image_path
-        except Exception:
-            existing_paths = set()
-
-        unique_paths, seen = [], set()
-        for f in candidates:
-            if f in seen:
-                continue
-            seen.add(f)
-            if f in existing_paths:
-                continue
-            unique_paths.append(f)
+            unique_paths = new_image_paths(candidates)
+        except Exception as e:
+            print("[DEDUP ERROR]", e)
+            unique_paths = list(dict.fromkeys(candidates))
 
         if not unique_paths:
             QtWidgets.QMessageBox.information(self, "안내", "새로 저장할 이미지가 없습니다.")
@@ -206,71 +261,37 @@ class MainWindow(QtWidgets.QMainWindow):
         prog = QtWidgets.QProgressDialog("폴더 내 일괄 판정/저장 중…", "취소", 0, len(unique_paths), self)
         prog.setWindowModality(QtCore.Qt.WindowModal)
         prog.setMinimumDuration(300)
+        prog.setAutoClose(False)
+        prog.setAutoReset(False)
+
+        worker = BatchClassifyWorker(unique_paths, parent=self)
+        worker.progress.connect(lambda done, total: prog.setValue(done))
+        worker.item_done.connect(self._on_batch_item_done)
+        worker.finished_summary.connect(
+            lambda saved, errors, canceled, reused:
+                self._on_batch_finished(prog, len(unique_paths), saved, errors, canceled, reused)
+        )
+        prog.canceled.connect(worker.cancel)
 
-        saved, errors = 0, 0
-
-        for i, fpath in enumerate(unique_paths, start=1):
-            if prog.wasCanceled():
-                break
-            try:
-                self.current_image_path = fpath
-                self._set_preview(fpath)
-
-                result = classify_image(fpath)
-
-                label = result.get("label") or DEFECT_LABELS[0]
-                if label not in DEFECT_LABELS:
-                    label = DEFECT_LABELS[0]
+        self._batch_worker = worker
+        self.ui.pushButton.setEnabled(False)
+        worker.start()
 
-                try:
-                    conf = float(result.get("confidence") or 0.0)
-                except Exception:
-                    conf = 0.0
-
-                desc = result.get("description") or ""
-
-                severity = result.get("severity", "C")
-                if severity not in ["A", "B", "C"]:
-                    severity = "C"
-
-                location = (result.get("location") or "unknown").strip()
-
-                action = result.get("action", "Hold")
-                if action not in ACTIONS:
-                    action = "Hold"
-
-                # 정상(불량 없음) 규칙
-                if label in {"none", "ok", "normal", "no_defect"}:
-                    action = "Pass"
-                    severity = "C"
-                    location = "none"
-
-                abs_path = str(Path(fpath).resolve())
-                insert_result(
-                    image_path=abs_path,
-                    defect_type=label,
-                    severity=severity,
-                    location=location, 
-                    score=conf,
-                    detail=desc,
-                    action=action
-                )
-                saved += 1
-                self.ui.txtResult.setPlainText(desc)
-
-            except Exception as e:
-                print("[BATCH ERROR]", fpath, e)
-                errors += 1
-
-            prog.setValue(i)
-            QtWidgets.QApplication.processEvents()
+    def _on_batch_item_done(self, fpath: str, result: dict):
+        self.current_image_path = fpath
+        self._set_preview(fpath)
+        self.ui.txtResult.setPlainText(result.get("description") or "")
 
+    def _on_batch_finished(self, prog, total: int, saved: int, errors: int, canceled: bool, reused: int = 0):
         prog.close()
+        self.ui.pushButton.setEnabled(True)
+        self._batch_worker = None
         QtWidgets.QMessageBox.information(
             self, "완료",
-            f"총 {len(unique_paths)}개 중 {saved}개 저장"
+            f"총 {total}개 중 {saved}개 저장"
             + (f", 오류 {errors}개" if errors else "")
-            + (", 취소됨" if saved + errors < len(unique_paths) else "")
+            + (", 취소됨" if canceled else "")
+            + (f"\n유사 이미지 결과 재사용 {reused}개 (API 호출 {reused}회 절약)" if reused else "")
         )
         self._refresh_results()
 
@@ -336,6 +357,22 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.lblImage.setPixmap(pix)
         self.ui.lblImage.setToolTip(path)
 
+    def closeEvent(self, event):
+        # 진행 중인 일괄 판정이 있으면 취소 후 종료 대기
+        if self._batch_worker is not None and self._batch_worker.isRunning():
+            self._batch_worker.cancel()
+            self._batch_worker.wait()
+        if self._classify_worker is not None and self._classify_worker.isRunning():
+            self._classify_worker.wait()
+        for w in (self._export_worker, self._csv_worker):
+            if w is not None and w.isRunning():
+                w.cancel()
+                w.wait()
+        shutdown_writer()  # 큐에 남은 저장을 마저 커밋
+        if self._backfill_stop is not None:
+            self._backfill_stop.set()  # 진행 위치는 저장되어 있어 다음 실행 때 이어서 진행
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if self.current_image_path and self.ui.lblImage.pixmap():
@@ -387,6 +424,23 @@ class MainWindow(QtWidgets.QMainWindow):
         tb.addAction(self.actDelete)
         self.addAction(self.actDelete)
 
+        # --- 결과 목록 페이지 이동 ---
+        tb.addSeparator()
+        self.actPrevPage = QtWidgets.QAction("◀ Prev", self)
+        self.actPrevPage.setShortcut("Alt+Left")
+        self.actPrevPage.triggered.connect(self.on_prev_page)
+        tb.addAction(self.actPrevPage)
+        self.addAction(self.actPrevPage)
+
+        self.lblPage = QtWidgets.QLabel("", self)
+        tb.addWidget(self.lblPage)
+
+        self.actNextPage = QtWidgets.QAction("Next ▶", self)
+        self.actNextPage.setShortcut("Alt+Right")
+        self.actNextPage.triggered.connect(self.on_next_page)
+        tb.addAction(self.actNextPage)
+        self.addAction(self.actNextPage)
+
         # --- ADD: Export DB (CSV) 액션 ---
         tb.addSeparator()
         self.actExportDBCSV = QtWidgets.QAction("Export DB (CSV)", self)
@@ -396,6 +450,13 @@ class MainWindow(QtWidgets.QMainWindow):
         tb.addAction(self.actExportDBCSV)
         self.addAction(self.actExportDBCSV)
 
+        # --- 결과 내보내기 (Parquet/Arrow, 백그라운드 스트리밍) ---
+        self.actExportResults = QtWidgets.QAction("Export Results (Parquet)", self)
+        self.actExportResults.setStatusTip("Stream results to a Parquet / Arrow IPC file")
+        self.actExportResults.triggered.connect(self.on_export_results)
+        tb.addAction(self.actExportResults)
+        self.addAction(self.actExportResults)
+
     def on_search_dialog(self):
         dlg = QtWidgets.QDialog(self)
         dlg.setWindowTitle("Search")
@@ -410,6 +471,7 @@ class MainWindow(QtWidgets.QMainWindow):
         edtFrom.setDate(QtCore.QDate.currentDate().addMonths(-1))
         edtTo = QtWidgets.QDateEdit(dlg); edtTo.setCalendarPopup(True); edtTo.setDisplayFormat("yyyy-MM-dd")
         edtTo.setDate(QtCore.QDate.currentDate())
+        chkRank = QtWidgets.QCheckBox("Keyword 관련도순 정렬", dlg)
 
         form.addRow("Defect Type:", edtType)
         form.addRow("Severity:", edtSeverity)
@@ -418,6 +480,7 @@ class MainWindow(QtWidgets.QMainWindow):
         form.addRow("Keyword:", edtKeyword)
         form.addRow("From:", edtFrom)
         form.addRow("To:", edtTo)
+        form.addRow("", chkRank)
 
         btns = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel, parent=dlg)
         form.addRow(btns)
@@ -434,23 +497,9 @@ class MainWindow(QtWidgets.QMainWindow):
         keyword = edtKeyword.text().strip() or None
         date_from = edtFrom.date().toString("yyyy-MM-dd")
         date_to = edtTo.date().toString("yyyy-MM-dd")
+        rank = chkRank.isChecked()
 
-        try:
-            rows = search_results(
-                defect_type=defect_type,
-                severity=severity,
-                action=action,
-                location=location,
-                keyword=keyword,
-                date_from=date_from,
-                date_to=date_to,
-                limit=500
-            )
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "검색 오류", str(e))
-            return
-
-        self._last_search = {
+        search = {
             "defect_type": defect_type,
             "severity": severity,
             "action": action,
@@ -458,8 +507,14 @@ class MainWindow(QtWidgets.QMainWindow):
             "keyword": keyword,
             "date_from": date_from,
             "date_to": date_to,
+            "rank": rank,
         }
-        self._render_rows(rows)
+        try:
+            self._load_page(None, search)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "검색 오류", str(e))
+            return
+        self._last_search = search
 
     def on_delete_selected(self):
         t = self.ui.tableResults
@@ -501,57 +556,128 @@ class MainWindow(QtWidgets.QMainWindow):
         QtWidgets.QApplication.processEvents()
 
     def on_export_db_csv(self):
-        try:
-            # 1) DB 경로
-            db_path = get_db_path()
-            if not os.path.exists(db_path):
-                QtWidgets.QMessageBox.warning(
-                    self, "Export DB (CSV)",
-                    f"DB 파일을 찾을 수 없습니다.\n{os.path.abspath(db_path)}"
-                )
-                return
-
-            # 2) 저장할 폴더 선택 (테이블별 개별 CSV 저장)
-            out_dir = QtWidgets.QFileDialog.getExistingDirectory(
-                self, "폴더 선택 (테이블별 CSV 저장)"
+        if self._csv_worker is not None:
+            QtWidgets.QMessageBox.information(self, "Export DB (CSV)", "이미 내보내는 중입니다.")
+            return
+        # 1) DB 경로
+        db_path = get_db_path()
+        if not os.path.exists(db_path):
+            QtWidgets.QMessageBox.warning(
+                self, "Export DB (CSV)",
+                f"DB 파일을 찾을 수 없습니다.\n{os.path.abspath(db_path)}"
+            )
+            return
+
+        # 2) 저장할 폴더 선택 (테이블별 개별 CSV 저장)
+        out_dir = QtWidgets.QFileDialog.getExistingDirectory(
+            self, "폴더 선택 (테이블별 CSV 저장)"
+        )
+        if not out_dir:
+            return
+
+        # 3) 백그라운드에서 테이블마다 커서를 chunk 단위로 읽어 이어 씀 (EXPORT_CSV_GZIP=1이면 .csv.gz)
+        prog = QtWidgets.QProgressDialog("CSV 내보내는 중…", "취소", 0, 0, self)
+        prog.setMinimumDuration(300)
+        prog.setAutoClose(False)
+        prog.setAutoReset(False)
+
+        worker = CsvExportWorker(out_dir=out_dir, parent=self)
+        worker.progress.connect(lambda n, total, rate: (
+            prog.setMaximum(max(total, 1)), prog.setValue(n),
+            prog.setLabelText(f"CSV 내보내는 중… {n:,} / {total:,}행 ({rate:,.0f}행/초)")
+        ))
+        worker.finished_export.connect(lambda result: self._on_csv_export_finished(prog, result, None))
+        worker.failed.connect(lambda msg: self._on_csv_export_finished(prog, None, msg))
+        prog.canceled.connect(worker.cancel)
+
+        self._csv_worker = worker
+        self.actExportDBCSV.setEnabled(False)
+        worker.start()
+
+    def _on_csv_export_finished(self, prog, result, error):
+        prog.close()
+        self.actExportDBCSV.setEnabled(True)
+        self._csv_worker = None
+        if error:
+            QtWidgets.QMessageBox.critical(self, "Export DB (CSV) 실패", error)
+        elif result["cancelled"]:
+            QtWidgets.QMessageBox.information(self, "Export DB (CSV)", "취소했습니다.")
+        elif result["paths"]:
+            QtWidgets.QMessageBox.information(
+                self, "Export DB (CSV)", "저장 완료:\n" + "\n".join(result["paths"])
+            )
+        else:
+            QtWidgets.QMessageBox.warning(self, "Export DB (CSV)", "저장된 파일이 없습니다.")
+
+    # -------- 결과 내보내기 (Parquet/Arrow) --------
+    def on_export_results(self):
+        if self._export_worker is not None:
+            QtWidgets.QMessageBox.information(self, "Export Results", "이미 내보내는 중입니다.")
+            return
+
+        # 기간 (선택) — SQL 조건으로 넣어 해당 범위만 읽음
+        dlg = QtWidgets.QDialog(self)
+        dlg.setWindowTitle("Export Results")
+        form = QtWidgets.QFormLayout(dlg)
+        chkRange = QtWidgets.QCheckBox("기간 지정", dlg)
+        edtFrom = QtWidgets.QDateEdit(dlg); edtFrom.setCalendarPopup(True); edtFrom.setDisplayFormat("yyyy-MM-dd")
+        edtFrom.setDate(QtCore.QDate.currentDate().addMonths(-1))
+        edtTo = QtWidgets.QDateEdit(dlg); edtTo.setCalendarPopup(True); edtTo.setDisplayFormat("yyyy-MM-dd")
+        edtTo.setDate(QtCore.QDate.currentDate())
+        for w in (edtFrom, edtTo):
+            w.setEnabled(False)
+            chkRange.toggled.connect(w.setEnabled)
+        form.addRow("", chkRange)
+        form.addRow("From:", edtFrom)
+        form.addRow("To:", edtTo)
+        btns = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel, parent=dlg)
+        form.addRow(btns)
+        btns.accepted.connect(dlg.accept)
+        btns.rejected.connect(dlg.reject)
+        if dlg.exec_() != QtWidgets.QDialog.Accepted:
+            return
+        date_from = edtFrom.date().toString("yyyy-MM-dd") if chkRange.isChecked() else None
+        date_to = edtTo.date().toString("yyyy-MM-dd") if chkRange.isChecked() else None
+
+        path, flt = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Results", "results.parquet", "Parquet (*.parquet);;Arrow IPC (*.arrow)"
+        )
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += ".arrow" if "Arrow" in flt else ".parquet"
+        self._start_export(path, date_from, date_to)
+
+    def _start_export(self, path: str, date_from=None, date_to=None):
+        prog = QtWidgets.QProgressDialog("결과 내보내는 중…", "취소", 0, 0, self)
+        prog.setMinimumDuration(300)
+        prog.setAutoClose(False)
+        prog.setAutoReset(False)
+
+        worker = ExportWorker(path, date_from, date_to, parent=self)
+        worker.progress.connect(lambda n, total: (prog.setMaximum(max(total, 1)), prog.setValue(n)))
+        worker.finished_export.connect(lambda result: self._on_export_finished(prog, result, None))
+        worker.failed.connect(lambda msg: self._on_export_finished(prog, None, msg))
+        prog.canceled.connect(worker.cancel)
+
+        self._export_worker = worker
+        self.actExportResults.setEnabled(False)
+        worker.start()
+
+    def _on_export_finished(self, prog, result, error):
+        prog.close()
+        self.actExportResults.setEnabled(True)
+        self._export_worker = None
+        if error:
+            QtWidgets.QMessageBox.critical(self, "Export Results 실패", error)
+        elif result["cancelled"]:
+            QtWidgets.QMessageBox.information(self, "Export Results", "취소했습니다.")
+        else:
+            QtWidgets.QMessageBox.information(
+                self, "Export Results",
+                f"{result['rows']}행 저장 완료 ({result['seconds']:.1f}초)\n{result['path']}"
             )
-            if not out_dir:
-                return
-
-            saved_paths = []
-            with sqlite3.connect(db_path) as conn:
-                cur = conn.cursor()
-                # 사용자 테이블 목록 (sqlite 내부 테이블 제외)
-                cur.execute("""
-                    SELECT name FROM sqlite_master
-                    WHERE type='table' AND name NOT LIKE 'sqlite_%'
-                """)
-                tables = [r[0] for r in cur.fetchall()]
-
-                if not tables:
-                    QtWidgets.QMessageBox.information(self, "Export DB (CSV)", "내보낼 테이블이 없습니다.")
-                    return
-
-                # 테이블별 CSV 저장
-                for tname in tables:
-                    try:
-                        df = pd.read_sql_query(f"SELECT * FROM {tname}", conn)
-                        out_path = os.path.join(out_dir, f"{tname}.csv")
-                        df.to_csv(out_path, index=False, encoding="utf-8-sig")  # 엑셀 호환 BOM
-                        saved_paths.append(out_path)
-                    except Exception as te:
-                        print(f"[CSV EXPORT ERROR] table={tname} err={te}")
-
-            if saved_paths:
-                QtWidgets.QMessageBox.information(
-                    self, "Export DB (CSV)", "저장 완료:\n" + "\n".join(saved_paths)
-                )
-            else:
-                QtWidgets.QMessageBox.warning(self, "Export DB (CSV)", "저장된 파일이 없습니다.")
 
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Export DB (CSV) 실패", str(e)) 
-    
     # -------- 기타 --------
     def _is_image_file(self, path: Path) -> bool:
         return path.suffix.lower() in {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp", ".tif", ".tiff"}
@@ -570,23 +696,52 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.txtResult.clear()
         self._last_classify = None
 
+    def _load_page(self, cursor=None, search=None):
+        """
+        결과 목록 한 페이지 로드 (search=None이면 전체 최신순).
+        관련도순 검색은 keyset 페이지를 쓸 수 없어 상위 RESULTS_PAGE_SIZE건만 표시.
+        """
+        search = search or {}
+        filters = {k: v for k, v in search.items() if k != "rank"}
+        if search.get("rank"):
+            rows = search_results(**filters, limit=RESULTS_PAGE_SIZE, rank=True)
+            page = {"rows": rows, "next": None, "prev": None}
+        else:
+            page = search_results_page(**filters, page_size=RESULTS_PAGE_SIZE, cursor=cursor)
+        if cursor is None:
+            self._page_no = 1
+            self._page_total = approx_count(**filters)
+        self._page, self._page_cursor = page, cursor
+        self._render_rows(page["rows"])
+        self._update_page_controls()
+
+    def _update_page_controls(self):
+        if not hasattr(self, "lblPage"):
+            return
+        page = self._page or {}
+        self.actPrevPage.setEnabled(bool(page.get("prev")))
+        self.actNextPage.setEnabled(bool(page.get("next")))
+        n, exact = self._page_total or (0, True)
+        total = f"{n:,}건" if exact else f"약 {n:,}건 이상"
+        self.lblPage.setText(f"  {self._page_no} 페이지 / {total}  ")
+
+    def on_next_page(self):
+        if self._page and self._page.get("next"):
+            self._page_no += 1
+            self._load_page(self._page["next"], self._last_search)
+
+    def on_prev_page(self):
+        if self._page and self._page.get("prev"):
+            self._page_no = max(1, self._page_no - 1)
+            self._load_page(self._page["prev"], self._last_search)
+
     def _refresh_results(self):
         try:
-            if self._last_search:
-                ctx = self._last_search
-                rows = search_results(
-                    defect_type=ctx.get("defect_type"),
-                    severity=ctx.get("severity"),
-                    action=ctx.get("action"),
-                    location=ctx.get("location"),
-                    keyword=ctx.get("keyword"),
-                    date_from=ctx.get("date_from"),
-                    date_to=ctx.get("date_to"),
-                    limit=500
-                )
-            else:
-                rows = fetch_results(limit=200)
-            self._render_rows(rows)
+            # 보고 있던 페이지를 다시 읽음 (첫 페이지면 새로 저장된 결과도 포함)
+            page_no = self._page_no
+            self._load_page(self._page_cursor, self._last_search)
+            self._page_no = page_no
+            self._update_page_controls()
         except Exception as e:
             print("[REFRESH ERROR]", e)
 
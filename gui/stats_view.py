@@ -17,6 +17,10 @@ import matplotlib.dates as mdates
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
+from db.db import days_ago_epoch, read_snapshot, read_report
+from gui.workers import CsvExportWorker
+from utils.config import EXPORT_CSV_GZIP
+
 
 class StatsDashboard(QDialog):
     # 🔧 실제 테이블/컬럼명 상수
@@ -24,8 +28,12 @@ class StatsDashboard(QDialog):
     COL_DEFECT   = "defect_type"
     COL_SEVERITY = "severity"        # 값: A/B/C
     COL_TS       = "ts"              # YYYY-MM-DD HH:MM:SS 문자열
+    COL_EPOCH    = "ts_epoch"        # ts의 정수 표현 (인덱스 범위 조건/날짜 집계용)
     COL_LOCATION = "location"
     COL_ACTION   = "action"
+    # 대시보드 집계는 일별 집계 테이블에서 읽음 (행 수가 아니라 일수에 비례)
+    ROLLUP       = "results_daily"   # (day, defect_type, severity, location, action) → cnt, NULL은 ''
+    COL_DAY      = "day"             # 그날 0시의 ts_epoch (시각 없음 = -1)
 
     def __init__(self, db_path: str, parent=None):
         super().__init__(parent)
@@ -98,6 +106,9 @@ class StatsDashboard(QDialog):
         bottom.addWidget(self.btn_png)
         bottom.addWidget(self.btn_csv)
         bottom.addStretch()
+        self.lbl_reads = QLabel("")
+        self.lbl_reads.setStyleSheet("color:#888;")
+        bottom.addWidget(self.lbl_reads)
         bottom.addWidget(self.btn_close)
         root.addLayout(bottom)
 
@@ -115,6 +126,7 @@ class StatsDashboard(QDialog):
         self._df_tab3_severity = None
         self._df_tab4_location = None
         self._df_tab4_action = None
+        self._csv_worker = None
 
         # 버튼 연결
         self.btn_png.clicked.connect(self.on_save_png)
@@ -176,23 +188,25 @@ class StatsDashboard(QDialog):
     # ─────────────────────────────────────────────────────────────────
     # 공용 유틸
     # ─────────────────────────────────────────────────────────────────
+    def _query(self, fn):
+        """fn(conn)을 읽기 전용 스냅샷에서 실행 (수집 중에도 쓰기를 막지 않음, busy면 재시도)"""
+        return read_snapshot(fn, self.db_path)
+
     def _ensure_table_exists(self) -> bool:
         try:
-            conn = sqlite3.connect(self.db_path)
-            cur = conn.cursor()
-            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            names = {r[0] for r in cur.fetchall()}
-            return self.TABLE in names
-        finally:
-            try: conn.close()
-            except: pass
+            names = self._query(lambda conn: {r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")})
+        except sqlite3.Error as e:
+            print("[DB ERROR]", e)
+            return False
+        return self.TABLE in names and self.ROLLUP in names
 
     def _period_where_clause_for(self, combo: QComboBox) -> str:
         """QComboBox userData(일수)를 읽어 WHERE 절 생성"""
         days = combo.currentData()
         if days is None:
             return ""  # All
-        return f"AND date(substr({self.COL_TS},1,10)) >= date('now','-{int(days)} day')"
+        return f"AND {self.COL_DAY} >= {days_ago_epoch(int(days))}"
 
     # ─────────────────────────────────────────────────────────────────
     # 전체 새로고침
@@ -206,38 +220,49 @@ class StatsDashboard(QDialog):
         self._draw_tab2_trend()
         self._draw_tab3_pies()  
         self._draw_tab4_location_action()
+        self._update_read_status()
+
+    def _update_read_status(self):
+        """읽기 스냅샷의 busy 대기/재시도 누적 (수집 중에 대시보드를 열어 둘 때 확인용)"""
+        r = read_report()
+        self.lbl_reads.setText(f"DB busy: {r['busy']}  retries: {r['retries']}  failed: {r['failed']}")
+        self.lbl_reads.setToolTip(f"reads: {r['reads']}, waited: {r['wait_ms']:.0f} ms")
+        if r["busy"]:
+            print("[READ]", r)
 
     # ─────────────────────────────────────────────────────────────────
     # 상단 요약 카드
     # ─────────────────────────────────────────────────────────────────
     def _load_summary_cards(self):
-        try:
-            conn = sqlite3.connect(self.db_path)
+        def load(conn):
             cur = conn.cursor()
 
-            cur.execute(f"SELECT COUNT(*) FROM {self.TABLE}")
+            cur.execute(f"SELECT SUM(cnt) FROM {self.ROLLUP}")
             total = cur.fetchone()[0] or 0
 
             cur.execute(
-                f"SELECT COUNT(DISTINCT {self.COL_DEFECT}) FROM {self.TABLE} "
-                f"WHERE IFNULL({self.COL_DEFECT},'') <> ''"
+                f"SELECT COUNT(*) FROM (SELECT {self.COL_DEFECT} FROM {self.ROLLUP} "
+                f"WHERE {self.COL_DEFECT} <> '' GROUP BY {self.COL_DEFECT} HAVING SUM(cnt) > 0)"
             )
             kinds = cur.fetchone()[0] or 0
 
             cur.execute(
-                f"SELECT COUNT(*) FROM {self.TABLE} "
-                f"WHERE date(substr({self.COL_TS},1,10)) >= date('now','-7 day')"
+                f"SELECT SUM(cnt) FROM {self.ROLLUP} "
+                f"WHERE {self.COL_DAY} >= ?", (days_ago_epoch(7),)
             )
             week = cur.fetchone()[0] or 0
 
             cur.execute(
-                f"SELECT {self.COL_DEFECT} FROM {self.TABLE} "
-                f"WHERE IFNULL({self.COL_DEFECT},'') <> '' "
-                f"GROUP BY {self.COL_DEFECT} ORDER BY COUNT(*) DESC LIMIT 1"
+                f"SELECT {self.COL_DEFECT} FROM {self.ROLLUP} "
+                f"WHERE {self.COL_DEFECT} <> '' "
+                f"GROUP BY {self.COL_DEFECT} HAVING SUM(cnt) > 0 ORDER BY SUM(cnt) DESC LIMIT 1"
             )
             top = cur.fetchone()
             top = top[0] if top and top[0] else "-"
+            return total, kinds, week, top
 
+        try:
+            total, kinds, week, top = self._query(load)
             self.card_total.setText(f"Total: {total}")
             self.card_kinds.setText(f"Defect Types: {kinds}")
             self.card_week.setText(f"Last 7 days: {week}")
@@ -249,9 +274,6 @@ class StatsDashboard(QDialog):
             self.card_week.setText("Last 7 days: -")
             self.card_top.setText("Top Defect: -")
             print("[SUMMARY ERROR]", e)
-        finally:
-            try: conn.close()
-            except: pass
 
     # ─────────────────────────────────────────────────────────────────
     # 탭1: 결함×Severity 스택 막대
@@ -267,46 +289,47 @@ class StatsDashboard(QDialog):
         period_sql = self._period_where_clause_for(self.cmb_period)
 
         sql_top = f"""
-            SELECT {self.COL_DEFECT}, COUNT(*) AS total
-            FROM {self.TABLE}
-            WHERE IFNULL({self.COL_DEFECT},'') <> ''
+            SELECT {self.COL_DEFECT}, SUM(cnt) AS total
+            FROM {self.ROLLUP}
+            WHERE {self.COL_DEFECT} <> ''
             {period_sql}
             GROUP BY {self.COL_DEFECT}
+            HAVING total > 0
             ORDER BY total DESC
             LIMIT 10
         """
 
-        try:
-            conn = sqlite3.connect(self.db_path)
+        def load(conn):
             cur = conn.cursor()
             cur.execute(sql_top)
-            top_rows = cur.fetchall()
-            top_defects = [r[0] for r in top_rows]
-
+            top_defects = [r[0] for r in cur.fetchall()]
             if not top_defects:
-                ax.text(0.5, 0.5, "No data to display.", ha="center", va="center")
-                self.fig1.tight_layout()
-                self.canvas1.draw()
-                return
+                return top_defects, []
 
             placeholders = ",".join(["?"] * len(top_defects))
             sql_stack = f"""
-                SELECT {self.COL_DEFECT}, {self.COL_SEVERITY}, COUNT(*) AS cnt
-                FROM {self.TABLE}
+                SELECT {self.COL_DEFECT}, {self.COL_SEVERITY}, SUM(cnt) AS cnt
+                FROM {self.ROLLUP}
                 WHERE {self.COL_DEFECT} IN ({placeholders})
                 {period_sql}
                 GROUP BY {self.COL_DEFECT}, {self.COL_SEVERITY}
             """
             cur.execute(sql_stack, top_defects)
-            rows = cur.fetchall()
+            return top_defects, cur.fetchall()
+
+        try:
+            top_defects, rows = self._query(load)
         except Exception as e:
             ax.text(0.5, 0.5, f"DB error: {e}", ha="center", va="center")
             self.fig1.tight_layout()
             self.canvas1.draw()
             return
-        finally:
-            try: conn.close()
-            except: pass
+
+        if not top_defects:
+            ax.text(0.5, 0.5, "No data to display.", ha="center", va="center")
+            self.fig1.tight_layout()
+            self.canvas1.draw()
+            return
 
         def map_sev(s: str) -> str:
             s = (s or "").strip().upper()
@@ -420,27 +443,22 @@ class StatsDashboard(QDialog):
 
         where_sql = self._period_where_clause_for(self.cmb_period2)
         sql = f"""
-            SELECT substr({self.COL_TS},1,10) AS day, COUNT(*) AS cnt
-            FROM {self.TABLE}
-            WHERE 1=1
+            SELECT date({self.COL_DAY}, 'unixepoch') AS d, SUM(cnt) AS total
+            FROM {self.ROLLUP}
+            WHERE {self.COL_DAY} >= 0
             {where_sql}
-            GROUP BY day
-            ORDER BY day
+            GROUP BY {self.COL_DAY}
+            HAVING total > 0
+            ORDER BY {self.COL_DAY}
         """
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cur = conn.cursor()
-            cur.execute(sql)
-            rows = cur.fetchall()
+            rows = self._query(lambda conn: conn.execute(sql).fetchall())
         except Exception as e:
             ax.text(0.5, 0.5, f"DB error: {e}", ha="center", va="center")
             self.fig2.tight_layout()
             self.canvas2.draw()
             return
-        finally:
-            try: conn.close()
-            except: pass
 
         if not rows:
             ax.text(0.5, 0.5, "No data to display.", ha="center", va="center")
@@ -488,31 +506,34 @@ class StatsDashboard(QDialog):
         ax1 = self.fig3.add_subplot(121)
         ax2 = self.fig3.add_subplot(122)
 
-        try:
-            conn = sqlite3.connect(self.db_path)
+        def load(conn):
             cur = conn.cursor()
 
             # 결함 유형 비율
             cur.execute(f"""
-                SELECT {self.COL_DEFECT}, COUNT(*) 
-                FROM {self.TABLE}
-                WHERE IFNULL({self.COL_DEFECT}, '') <> ''
+                SELECT {self.COL_DEFECT}, SUM(cnt)
+                FROM {self.ROLLUP}
+                WHERE {self.COL_DEFECT} <> ''
                 GROUP BY {self.COL_DEFECT}
-                ORDER BY COUNT(*) DESC
+                HAVING SUM(cnt) > 0
+                ORDER BY SUM(cnt) DESC
                 LIMIT 10
             """)
             rows_def = cur.fetchall()
 
             # Severity 비율
             cur.execute(f"""
-                SELECT {self.COL_SEVERITY}, COUNT(*)
-                FROM {self.TABLE}
-                WHERE IFNULL({self.COL_SEVERITY}, '') <> ''
+                SELECT {self.COL_SEVERITY}, SUM(cnt)
+                FROM {self.ROLLUP}
+                WHERE {self.COL_SEVERITY} <> ''
                 GROUP BY {self.COL_SEVERITY}
+                HAVING SUM(cnt) > 0
             """)
             rows_sev = cur.fetchall()
-            conn.close()
+            return rows_def, rows_sev
 
+        try:
+            rows_def, rows_sev = self._query(load)
         except Exception as e:
             ax1.text(0.5, 0.5, f"DB Error: {e}", ha="center", va="center")
             ax2.text(0.5, 0.5, " ", ha="center", va="center")
@@ -561,33 +582,35 @@ class StatsDashboard(QDialog):
         ax1 = self.fig4.add_subplot(121)
         ax2 = self.fig4.add_subplot(122)
 
-        try:
-            conn = sqlite3.connect(self.db_path)
+        def load(conn):
             cur = conn.cursor()
 
             # ① Location별 결함 건수
             cur.execute(f"""
-                SELECT {self.COL_LOCATION}, COUNT(*) 
-                FROM {self.TABLE}
-                WHERE IFNULL({self.COL_LOCATION}, '') <> ''
+                SELECT {self.COL_LOCATION}, SUM(cnt)
+                FROM {self.ROLLUP}
+                WHERE {self.COL_LOCATION} <> ''
                 GROUP BY {self.COL_LOCATION}
-                ORDER BY COUNT(*) DESC
+                HAVING SUM(cnt) > 0
+                ORDER BY SUM(cnt) DESC
                 LIMIT 10
             """)
             rows_loc = cur.fetchall()
 
             # ② Action별 건수
             cur.execute(f"""
-                SELECT {self.COL_ACTION}, COUNT(*)
-                FROM {self.TABLE}
-                WHERE IFNULL({self.COL_ACTION}, '') <> ''
+                SELECT {self.COL_ACTION}, SUM(cnt)
+                FROM {self.ROLLUP}
+                WHERE {self.COL_ACTION} <> ''
                 GROUP BY {self.COL_ACTION}
-                ORDER BY COUNT(*) DESC
+                HAVING SUM(cnt) > 0
+                ORDER BY SUM(cnt) DESC
             """)
             rows_act = cur.fetchall()
+            return rows_loc, rows_act
 
-            conn.close()
-
+        try:
+            rows_loc, rows_act = self._query(load)
         except Exception as e:
             ax1.text(0.5, 0.5, f"DB Error: {e}", ha="center", va="center")
             ax2.text(0.5, 0.5, " ", ha="center", va="center")
@@ -662,88 +685,90 @@ class StatsDashboard(QDialog):
     # Export CSV 함수
     # ─────────────────────────────────────────────────────────────────
     def on_export_csv(self):
+        if self._csv_worker is not None:
+            # 내보내는 중에는 버튼이 취소 역할
+            self._csv_worker.cancel()
+            return
         try:
             idx = self.tabs.currentIndex()
 
-            # 탭1: 한 파일
-            if idx == 0:
-                df = self._df_tab1
+            # 탭1/탭2: 한 파일 (.csv.gz를 고르면 gzip)
+            if idx in (0, 1):
+                df = self._df_tab1 if idx == 0 else self._df_tab2
                 if df is None or df.empty:
                     QMessageBox.warning(self, "Export CSV", "내보낼 데이터가 없습니다.")
                     return
-                path, _ = QFileDialog.getSaveFileName(
-                    self, "Export CSV", "defect_distribution.csv", "CSV Files (*.csv)"
+                default = "defect_distribution.csv" if idx == 0 else "daily_trend.csv"
+                path, flt = QFileDialog.getSaveFileName(
+                    self, "Export CSV", default, "CSV Files (*.csv);;Gzip CSV (*.csv.gz)"
                 )
                 if not path: return
-                df.to_csv(path, index=False, encoding="utf-8-sig")
-                QMessageBox.information(self, "Export CSV", f"저장 완료:\n{path}")
+                if "Gzip" in flt and not path.endswith(".gz"):
+                    path += ".gz"
+                self._start_csv_export([(path, df)])
                 return
 
-            # 탭2: 한 파일
-            if idx == 1:
-                df = self._df_tab2
-                if df is None or df.empty:
-                    QMessageBox.warning(self, "Export CSV", "내보낼 데이터가 없습니다.")
-                    return
-                path, _ = QFileDialog.getSaveFileName(
-                    self, "Export CSV", "daily_trend.csv", "CSV Files (*.csv)"
-                )
-                if not path: return
-                df.to_csv(path, index=False, encoding="utf-8-sig")
-                QMessageBox.information(self, "Export CSV", f"저장 완료:\n{path}")
-                return
-
-            # 탭3: 두 파일 (폴더 선택)
-            if idx == 2:
-                if (self._df_tab3_defect is None or self._df_tab3_severity is None or
-                    (self._df_tab3_defect.empty and self._df_tab3_severity.empty)):
-                    QMessageBox.warning(self, "Export CSV", "내보낼 데이터가 없습니다.")
-                    return
-                folder = QFileDialog.getExistingDirectory(self, "폴더 선택 (탭3 CSV 2개 저장)")
-                if not folder: return
-
-                saved = []
-                if self._df_tab3_defect is not None and not self._df_tab3_defect.empty:
-                    p1 = os.path.join(folder, "defect_type_ratio.csv")
-                    self._df_tab3_defect.to_csv(p1, index=False, encoding="utf-8-sig")
-                    saved.append(p1)
-                if self._df_tab3_severity is not None and not self._df_tab3_severity.empty:
-                    p2 = os.path.join(folder, "severity_ratio.csv")
-                    self._df_tab3_severity.to_csv(p2, index=False, encoding="utf-8-sig")
-                    saved.append(p2)
-
-                if saved:
-                    QMessageBox.information(self, "Export CSV", "저장 완료:\n" + "\n".join(saved))
+            # 탭3/탭4: 두 파일 (폴더 선택, EXPORT_CSV_GZIP=1이면 .csv.gz)
+            if idx in (2, 3):
+                if idx == 2:
+                    frames = [("defect_type_ratio.csv", self._df_tab3_defect),
+                              ("severity_ratio.csv", self._df_tab3_severity)]
                 else:
-                    QMessageBox.warning(self, "Export CSV", "저장할 유효한 데이터가 없습니다.")
-                return
-
-            # 탭4: 두 파일 (폴더 선택)
-            if idx == 3:
-                if (self._df_tab4_location is None and self._df_tab4_action is None) or \
-                ((self._df_tab4_location is not None and self._df_tab4_location.empty) and
-                    (self._df_tab4_action is not None and self._df_tab4_action.empty)):
+                    frames = [("location_count.csv", self._df_tab4_location),
+                              ("action_ratio.csv", self._df_tab4_action)]
+                frames = [(name, df) for name, df in frames if df is not None and not df.empty]
+                if not frames:
                     QMessageBox.warning(self, "Export CSV", "내보낼 데이터가 없습니다.")
                     return
-
-                folder = QFileDialog.getExistingDirectory(self, "폴더 선택 (탭4 CSV 2개 저장)")
+                folder = QFileDialog.getExistingDirectory(self, f"폴더 선택 (탭{idx + 1} CSV 2개 저장)")
                 if not folder: return
-
-                saved = []
-                if self._df_tab4_location is not None and not self._df_tab4_location.empty:
-                    p1 = os.path.join(folder, "location_count.csv")
-                    self._df_tab4_location.to_csv(p1, index=False, encoding="utf-8-sig")
-                    saved.append(p1)
-                if self._df_tab4_action is not None and not self._df_tab4_action.empty:
-                    p2 = os.path.join(folder, "action_ratio.csv")
-                    self._df_tab4_action.to_csv(p2, index=False, encoding="utf-8-sig")
-                    saved.append(p2)
-
-                if saved:
-                    QMessageBox.information(self, "Export CSV", "저장 완료:\n" + "\n".join(saved))
-                else:
-                    QMessageBox.warning(self, "Export CSV", "저장할 유효한 데이터가 없습니다.")
+                ext = ".gz" if EXPORT_CSV_GZIP else ""
+                self._start_csv_export([(os.path.join(folder, name + ext), df) for name, df in frames])
                 return
 
         except Exception as e:
-            QMessageBox.critical(self, "Export CSV 실패", str(e))
\ No newline at end of file
+            QMessageBox.critical(self, "Export CSV 실패", str(e))
+
+    def _start_csv_export(self, jobs: list):
+        """jobs = [(경로, DataFrame)] 를 백그라운드에서 저장"""
+        worker = CsvExportWorker(frames=jobs, parent=self)
+        worker.finished_export.connect(self._on_csv_export_finished)
+        worker.failed.connect(lambda msg: self._on_csv_export_finished(None, msg))
+        worker.progress.connect(
+            lambda n, total, rate: self.btn_csv.setText(f"취소 ({n:,}/{total:,}행, {rate:,.0f}행/초)")
+        )
+        self._csv_worker = worker
+        self.btn_csv.setText("취소")
+        worker.start()
+
+    def _on_csv_export_finished(self, result, error=None):
+        self.btn_csv.setText("Export CSV")
+        self._csv_worker = None
+        if error:
+            QMessageBox.critical(self, "Export CSV 실패", error)
+        elif result["cancelled"]:
+            QMessageBox.information(self, "Export CSV", "내보내기를 취소했습니다.")
+        elif result["paths"]:
+            QMessageBox.information(self, "Export CSV", "저장 완료:\n" + "\n".join(result["paths"]))
+        else:
+            QMessageBox.warning(self, "Export CSV", "저장할 유효한 데이터가 없습니다.")
+
+    def _stop_csv_export(self):
+        """진행 중인 CSV 내보내기를 취소하고 스레드가 끝날 때까지 대기 (닫는 중이라 결과 알림은 띄우지 않음)"""
+        worker = self._csv_worker
+        if worker is None:
+            return
+        worker.blockSignals(True)
+        worker.cancel()
+        worker.wait()
+        self._csv_worker = None
+        self.btn_csv.setText("Export CSV")
+
+    def closeEvent(self, event):
+        self._stop_csv_export()
+        super().closeEvent(event)
+
+    def reject(self):
+        # Esc로 닫을 때는 closeEvent를 거치지 않음
+        self._stop_csv_export()
+        super().reject()
@@ -0,0 +1,341 @@
+# gui/workers.py
+from PyQt5 import QtCore
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+import re
+import threading
+import time
+
+from api.openai_api import classify_image, classify_images, classify_image_stream
+from api.cache import get_cache
+from api.prefilter import evaluate as prefilter_evaluate, prefilter_report
+from api.retry import ClassificationError
+from db.db import (
+    image_phash, find_near_duplicate, record_phash_reuse, phash_report, fingerprint_report
+)
+from db.writer import submit_result, writer_report
+from db.export import export_results, export_tables_csv, export_frames_csv
+from utils.config import (
+    DEFECT_LABELS, ACTIONS, BATCH_CONCURRENCY, CLASSIFY_PACK_SIZE, CLASSIFY_STREAM, EXPORT_CSV_GZIP,
+    PHASH_REUSE, PHASH_THRESHOLD, PREFILTER, PREFILTER_CHEAP_MODEL
+)
+
+
+# 근접 중복으로 재사용한 결과의 detail 앞머리
+_REUSED_PREFIX = re.compile(r"^\[재사용 #\d+\] ")
+
+
+def to_db_record(result: dict) -> dict:
+    """classify_image 결과를 DB 저장용 값으로 보정"""
+    label = result.get("label") or DEFECT_LABELS[0]
+    if label not in DEFECT_LABELS:
+        label = DEFECT_LABELS[0]
+
+    try:
+        conf = float(result.get("confidence") or 0.0)
+    except Exception:
+        conf = 0.0
+
+    desc = result.get("description") or ""
+
+    severity = result.get("severity", "C")
+    if severity not in ["A", "B", "C"]:
+        severity = "C"
+
+    location = (result.get("location") or "unknown").strip()
+
+    action = result.get("action", "Hold")
+    if action not in ACTIONS:
+        action = "Hold"
+
+    # 정상(불량 없음) 규칙 — 사전 필터 판정(빈 프레임 등)은 Pass로 바꾸지 않음
+    if label in {"none", "ok", "normal", "no_defect"} and not result.get("prefilter"):
+        action = "Pass"
+        severity = "C"
+        location = "none"
+
+    return {
+        "defect_type": label,
+        "severity": severity,
+        "location": location,
+        "score": conf,
+        "detail": desc,
+        "action": action,
+    }
+
+
+class BatchClassifyWorker(QtCore.QThread):
+    """
+    폴더 일괄 판정 백그라운드 작업.
+    - API 호출은 스레드 풀에서 최대 concurrency개까지 동시에 진행
+    - pack_size > 1이면 pack_size장씩 묶어 한 요청으로 분류(classify_images)
+    - 지각 해시가 기존 결과와 phash_threshold 이내면 API 없이 그 결과를 재사용 (detail에 원본 id 표시)
+    - prefilter=True면 로컬 사전 필터로 빈 프레임 등은 건너뛰고, 품질 불량은 저가 모델로 분류
+    - DB 저장은 저장 전용 스레드(db/writer.py)에 넘기고 바로 다음 요청 진행, 커밋되면 item_done
+    - 진행 상황은 Qt 시그널로 GUI 스레드에 전달
+    """
+    progress = QtCore.pyqtSignal(int, int)             # 처리 수, 전체 수
+    item_done = QtCore.pyqtSignal(str, dict)           # 경로, classify_image 결과
+    item_failed = QtCore.pyqtSignal(str, str)          # 경로, 오류 메시지
+    finished_summary = QtCore.pyqtSignal(int, int, bool, int)  # 저장 수, 오류 수, 취소 여부, 재사용 수
+
+    def __init__(self, paths, concurrency: int = BATCH_CONCURRENCY,
+                 pack_size: int = CLASSIFY_PACK_SIZE,
+                 phash_threshold: int | None = PHASH_THRESHOLD if PHASH_REUSE else None,
+                 prefilter: bool = PREFILTER, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.concurrency = max(1, int(concurrency))
+        self.pack_size = max(1, int(pack_size))
+        self.phash_threshold = phash_threshold
+        self.prefilter = prefilter
+        self._phashes = {}
+        self._reused = set()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_canceled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _reuse_near_duplicate(self, fpath: str):
+        """근접 중복(재촬영) 이미지면 기존 결과를 classify_image 형식으로 반환"""
+        ph = image_phash(fpath)
+        self._phashes[fpath] = ph
+        if self.phash_threshold is None or ph is None:
+            return None
+        hit = find_near_duplicate(ph, self.phash_threshold)
+        if hit is None:
+            return None
+        dist, row = hit
+        src_id, _, _, defect_type, severity, location, score, detail, action, _ = row
+        record_phash_reuse()
+        self._reused.add(fpath)
+        print(f"[PHASH] {Path(fpath).name} ≈ #{src_id} (distance {dist}), API 호출 생략")
+        # 감사용으로 원본 행 id를 detail에 남김 (원본도 재사용 행이면 그 표시는 떼고 바로 앞 원본만)
+        return {
+            "label": defect_type,
+            "confidence": score,
+            "description": f"[재사용 #{src_id}] " + _REUSED_PREFIX.sub("", detail or ""),
+            "severity": severity,
+            "location": location,
+            "action": action,
+        }
+
+    def _classify_chunk(self, chunk: list) -> tuple[dict, dict]:
+        results, failures, todo, cheap = {}, {}, [], []
+        for fpath in chunk:
+            reused = self._reuse_near_duplicate(fpath)
+            if reused is not None:
+                results[fpath] = reused
+                continue
+            if self.prefilter:
+                try:
+                    verdict = prefilter_evaluate(fpath)
+                except Exception as e:
+                    failures[fpath] = ClassificationError(f"이미지 읽기 실패: {e}")
+                    continue
+                if verdict["route"] == "skip":
+                    print(f"[PREFILTER] {Path(fpath).name}: {verdict['reason']}, API 호출 생략")
+                    results[fpath] = verdict["result"]
+                    continue
+                if verdict["route"] == "cheap":
+                    cheap.append(fpath)
+                    continue
+            todo.append(fpath)
+
+        for fpath in cheap:
+            try:
+                results[fpath] = classify_image(fpath, model=PREFILTER_CHEAP_MODEL)
+            except ClassificationError as e:
+                failures[fpath] = e
+
+        if len(todo) == 1:
+            try:
+                results[todo[0]] = classify_image(todo[0])
+            except ClassificationError as e:
+                failures[todo[0]] = e
+        elif todo:
+            packed, failed = classify_images(todo, pack_size=self.pack_size)
+            results.update(packed)
+            failures.update(failed)
+        return results, failures
+
+    def run(self):
+        total = len(self.paths)
+        done, saved, errors = 0, 0, 0
+        chunks = iter([self.paths[i:i + self.pack_size]
+                       for i in range(0, total, self.pack_size)])
+
+        pending = {}   # 경로 → (저장 Future, 분류 결과)
+
+        def _report(fpath, result, err):
+            nonlocal done, saved, errors
+            if err is None:
+                saved += 1
+                self.item_done.emit(fpath, result)
+            else:
+                print("[BATCH ERROR]", fpath, err)
+                errors += 1
+                self.item_failed.emit(fpath, str(err))
+            done += 1
+            self.progress.emit(done, total)
+
+        def _collect(block: bool = False):
+            # 커밋이 끝난 저장 결과를 보고 (block=True면 남은 저장을 모두 기다림)
+            for fpath, (fut, result) in list(pending.items()):
+                if not (block or fut.done()):
+                    continue
+                del pending[fpath]
+                try:
+                    fut.result()
+                    _report(fpath, result, None)
+                except Exception as e:
+                    _report(fpath, result, e)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = {}
+
+            def _fill():
+                # 동시 요청 수를 concurrency 이하로 유지
+                while len(in_flight) < self.concurrency and not self._cancel.is_set():
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        return
+                    in_flight[pool.submit(self._classify_chunk, chunk)] = chunk
+
+            _fill()
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    chunk = in_flight.pop(fut)
+                    try:
+                        results, failures = fut.result()
+                    except Exception as e:
+                        results, failures = {}, {p: e for p in chunk}
+                    # 분류 실패 이미지는 저장하지 않고 오류로 집계
+                    for fpath in chunk:
+                        if fpath not in results:
+                            _report(fpath, None, failures.get(fpath) or RuntimeError("분류 결과 없음"))
+                            continue
+                        try:
+                            record = dict(to_db_record(results[fpath]),
+                                          image_path=str(Path(fpath).resolve()),
+                                          phash=self._phashes.get(fpath))
+                            pending[fpath] = (submit_result(record), results[fpath])
+                        except Exception as e:
+                            _report(fpath, results[fpath], e)
+                _collect()
+
+                if self._cancel.is_set():
+                    # 아직 시작 안 한 요청은 취소, 진행 중인 요청은 결과만 저장
+                    for fut in list(in_flight):
+                        if fut.cancel():
+                            in_flight.pop(fut)
+                else:
+                    _fill()
+        _collect(block=True)
+
+        print("[CACHE]", get_cache().stats())
+        print("[HASH]", fingerprint_report())
+        print("[WRITER]", writer_report())
+        print("[PHASH]", f"이번 배치 API 호출 {len(self._reused)}개 절약,", phash_report())
+        if self.prefilter:
+            print("[PREFILTER]", prefilter_report())
+        self.finished_summary.emit(saved, errors, done < total, len(self._reused))
+
+
+class ClassifyWorker(QtCore.QThread):
+    """
+    단건 분류(Classify 버튼) 백그라운드 작업.
+    stream=True면 응답 필드가 도착하는 대로 field_ready로 전달
+    """
+    field_ready = QtCore.pyqtSignal(str, object)   # 필드명, 값
+    succeeded = QtCore.pyqtSignal(str, dict)       # 경로, 최종 결과
+    failed = QtCore.pyqtSignal(str, str)           # 경로, 오류 메시지
+
+    def __init__(self, image_path: str, stream: bool = CLASSIFY_STREAM, parent=None):
+        super().__init__(parent)
+        self.image_path = image_path
+        self.stream = stream
+
+    def run(self):
+        try:
+            if self.stream:
+                result = classify_image_stream(self.image_path, on_field=self.field_ready.emit)
+            else:
+                result = classify_image(self.image_path)
+        except ClassificationError as e:
+            self.failed.emit(self.image_path, str(e))
+            return
+        self.succeeded.emit(self.image_path, result)
+
+
+class ExportWorker(QtCore.QThread):
+    """
+    결과 내보내기(db/export.py) 백그라운드 작업.
+    진행 상황(내보낸 행 수, 전체 행 수)은 progress로, 끝나면 finished_export(결과 dict) 또는 failed
+    """
+    progress = QtCore.pyqtSignal(int, int)        # 내보낸 행 수, 전체 행 수
+    finished_export = QtCore.pyqtSignal(dict)     # export_results 반환값
+    failed = QtCore.pyqtSignal(str)               # 오류 메시지
+
+    def __init__(self, path: str, date_from=None, date_to=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.date_from = date_from
+        self.date_to = date_to
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        try:
+            result = export_results(self.path, self.date_from, self.date_to,
+                                    progress=self.progress.emit, cancel=self._cancel)
+        except Exception as e:
+            print("[EXPORT ERROR]", e)
+            self.failed.emit(str(e))
+            return
+        self.finished_export.emit(result)
+
+
+class CsvExportWorker(QtCore.QThread):
+    """
+    CSV 내보내기 백그라운드 작업 (db/export.py — chunk 단위로 이어 쓰기, .gz면 압축).
+    out_dir를 주면 DB 테이블별 CSV, frames([(경로, DataFrame)])를 주면 그 표들을 저장
+    """
+    progress = QtCore.pyqtSignal(int, int, float)  # 쓴 행 수, 전체 행 수, 초당 행 수
+    finished_export = QtCore.pyqtSignal(dict)      # export_tables_csv / export_frames_csv 반환값
+    failed = QtCore.pyqtSignal(str)                # 오류 메시지
+
+    def __init__(self, out_dir: str | None = None, frames=None, compressed: bool = EXPORT_CSV_GZIP, parent=None):
+        super().__init__(parent)
+        self.out_dir = out_dir
+        self.frames = frames
+        self.compressed = compressed
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        t0 = time.perf_counter()
+
+        def _progress(n, total):
+            self.progress.emit(n, total, n / max(time.perf_counter() - t0, 1e-6))
+
+        try:
+            if self.frames is not None:
+                result = export_frames_csv(self.frames, progress=_progress, cancel=self._cancel)
+            else:
+                result = export_tables_csv(self.out_dir, compressed=self.compressed,
+                                           progress=_progress, cancel=self._cancel)
+        except Exception as e:
+            print("[CSV EXPORT ERROR]", e)
+            self.failed.emit(str(e))
+            return
+        self.finished_export.emit(result)
@@ -0,0 +1,170 @@
+"""
+범주형 컬럼 사전 인코딩 벤치마크: TEXT 컬럼(v6) vs results_data 정수 id + 호환 뷰(v7)
+- 임시 DB를 v6 스키마로 만들어 파일 크기/행 밀도/쿼리 시간을 잰 뒤,
+  v7로 마이그레이션해 같은 결과를 내는 쿼리를 측정
+  · 뷰: 호환 뷰 results를 그대로 읽는 경우 (외부 스크립트)
+  · 앱: 앱이 실제로 쓰는 쿼리 — id로 거르고/GROUP BY 한 뒤 사전 테이블 값을 붙임
+    (검색은 db.db의 _search_where/_with_values, 집계는 db.migrations.rollup_counts_sql과 같은 방식)
+
+예:
+    python scripts/bench_categories.py --rows 1000000
+"""
+
+import sys, os
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# --- 패키지 인식용 경로 추가 ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.migrations import migrate, run_backfills, CATEGORY_TABLES
+from db.db import ts_to_epoch, _search_where, _with_values, _ID_ROW_COLS
+from utils.config import DEFECT_LABELS, ACTIONS
+
+LOCATIONS = ["front bumper", "rear bumper", "hood", "trunk", "left door", "right door", "roof", "windshield"]
+
+
+def make_db(path: str, n_rows: int, days: int = 365):
+    conn = sqlite3.connect(path)
+    migrate(conn, target=6)
+    start = datetime.now() - timedelta(days=days)
+    batch = []
+    for i in range(n_rows):
+        ts = (start + timedelta(seconds=random.randint(0, days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+        batch.append((
+            f"car_{i:07d}.jpg", f"/bench/car_{i:07d}.jpg", f"hash_{i:07d}",
+            random.choice(DEFECT_LABELS), random.choice("ABC"), random.choice(LOCATIONS),
+            round(random.uniform(0.5, 1.0), 3), "benchmark row", random.choice(ACTIONS), ts, ts_to_epoch(ts),
+        ))
+        if len(batch) == 50000:
+            _flush(conn, batch)
+    _flush(conn, batch)
+    return conn
+
+
+def _flush(conn, batch):
+    with conn:
+        conn.executemany(
+            "INSERT INTO results (file_name, image_path, image_hash, defect_type, severity, location, "
+            "score, detail, action, ts, ts_epoch) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+        )
+    batch.clear()
+
+
+def compact(conn):
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("VACUUM")
+
+
+def file_size(conn) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_size * conn.execute("PRAGMA page_count").fetchone()[0]
+
+
+def table_pages(conn, table: str):
+    """테이블 b-tree 페이지 수 (dbstat이 없는 빌드면 None)"""
+    try:
+        return conn.execute("SELECT COUNT(*) FROM dbstat WHERE name = ?", (table,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def timed(conn, sql, args=(), repeat: int = 3):
+    best, rows = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(sql, args).fetchall()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, rows
+
+
+def by_ids(group_cols: list, extra_where: str = "") -> str:
+    """results_data에서 id로 GROUP BY 한 뒤 사전 테이블에서 값만 붙이는 쿼리"""
+    ids = ", ".join(f"{c}_id" for c in group_cols)
+    joins = " ".join(f"LEFT JOIN {CATEGORY_TABLES[c]} c{i} ON c{i}.id = g.{c}_id" for i, c in enumerate(group_cols))
+    values = ", ".join(f"c{i}.value" for i in range(len(group_cols)))
+    return (f"SELECT {values}, g.n FROM (SELECT {ids}, COUNT(*) AS n FROM results_data {extra_where} "
+            f"GROUP BY {ids}) g {joins}")
+
+
+def app_search(conn, limit: int, **filters) -> tuple:
+    """search_results가 본 DB에 보내는 쿼리 (FTS 없이 범주형 조건만)"""
+    where, args, _ = _search_where(conn, **filters)
+    order = " ORDER BY r.ts_epoch DESC, r.id DESC"
+    return _with_values(f"SELECT {_ID_ROW_COLS}{where}{order} LIMIT ?", order.replace("r.", "g.")), args + [limit]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="범주형 컬럼 TEXT vs 사전 인코딩 벤치마크")
+    ap.add_argument("--rows", type=int, default=300000)
+    ap.add_argument("--days", type=int, default=365, help="가짜 데이터 기간(일)")
+    args = ap.parse_args()
+
+    cols = "id, image_path, file_name, defect_type, severity, location, score, detail, action, ts"
+    cases = [
+        # (이름, v6 쿼리, 인자, v7 앱 쿼리를 만드는 함수 → (쿼리, 인자))
+        ("결함×등급 건수 (전체)",
+         "SELECT defect_type, severity, COUNT(*) FROM results GROUP BY defect_type, severity", (),
+         lambda c: (by_ids(["defect_type", "severity"]), ())),
+        ("위치별 건수 (전체)",
+         "SELECT location, COUNT(*) FROM results GROUP BY location", (),
+         lambda c: (by_ids(["location"]), ())),
+        ("처리별 건수 (전체)",
+         "SELECT action, COUNT(*) FROM results GROUP BY action", (),
+         lambda c: (by_ids(["action"]), ())),
+        ("최근 200건 (fetch_results)",
+         f"SELECT {cols} FROM results ORDER BY ts_epoch DESC, id DESC LIMIT 200", (),
+         lambda c: app_search(c, 200)),
+        ("결함 유형 검색 500건 (search_results)",
+         f"SELECT {cols} FROM results WHERE defect_type = ? ORDER BY ts_epoch DESC, id DESC LIMIT 500",
+         (DEFECT_LABELS[1],), lambda c: app_search(c, 500, defect_type=DEFECT_LABELS[1])),
+        ("결함+등급 검색 500건 (search_results)",
+         f"SELECT {cols} FROM results WHERE defect_type = ? AND severity = ? "
+         f"ORDER BY ts_epoch DESC, id DESC LIMIT 500",
+         (DEFECT_LABELS[1], "B"), lambda c: app_search(c, 500, defect_type=DEFECT_LABELS[1], severity="B")),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        conn = make_db(os.path.join(tmp, "bench.db"), args.rows, args.days)
+        compact(conn)
+        print(f"[INFO] rows={args.rows} build={time.perf_counter() - t0:.1f}s")
+        size_before, pages_before = file_size(conn), table_pages(conn, "results")
+        before = [timed(conn, sql, a) for _, sql, a, _ in cases]
+
+        t0 = time.perf_counter()
+        migrate(conn)
+        run_backfills(conn)   # v7 행 복사는 앱에서는 백그라운드로 진행
+        print(f"[INFO] migrate to v7 = {time.perf_counter() - t0:.1f}s")
+        compact(conn)
+        size_after, pages_after = file_size(conn), table_pages(conn, "results_data")
+
+        print(f"\n[파일 크기] before {size_before / 1e6:.1f} MB  after {size_after / 1e6:.1f} MB  "
+              f"({(1 - size_after / size_before) * 100:.1f}% 감소)")
+        if pages_before and pages_after:
+            print(f"[행 밀도] results {args.rows / pages_before:.1f} 행/페이지 → "
+                  f"results_data {args.rows / pages_after:.1f} 행/페이지")
+
+        for (name, sql, a, app), (t_old, r_old) in zip(cases, before):
+            t_view, r_view = timed(conn, sql, a)
+            same = sorted(map(tuple, r_old)) == sorted(map(tuple, r_view))
+            print(f"\n[{name}]")
+            print(f"  before       {t_old * 1000:9.1f} ms  rows={len(r_old)}")
+            print(f"  after (뷰)   {t_view * 1000:9.1f} ms  rows={len(r_view)}  same={same}")
+            app_sql, app_args = app(conn)
+            t_app, r_app = timed(conn, app_sql, app_args)
+            width = len(r_old[0]) if r_old else 0   # 앱 검색 쿼리는 끝에 ts_epoch가 더 붙음
+            same = sorted(map(tuple, r_old)) == sorted(tuple(r[:width]) for r in r_app)
+            print(f"  after (앱)   {t_app * 1000:9.1f} ms  rows={len(r_app)}  same={same}  "
+                  f"x{t_old / t_app if t_app else float('inf'):.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+날짜 조건/정렬 쿼리 벤치마크: ts 문자열 함수(datetime(ts), date(ts)) vs ts_epoch 인덱스 범위
+- 임시 DB를 v2 스키마(ts_epoch 이전)로 만들어 이전 쿼리를 측정한 뒤,
+  v3로 마이그레이션하고 같은 결과를 내는 현재 쿼리를 측정해 실행 시간과 쿼리 플랜을 비교
+
+예:
+    python scripts/bench_time_queries.py --rows 1000000
+"""
+
+import sys, os
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# --- 패키지 인식용 경로 추가 ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.migrations import migrate, run_backfills
+from db.db import ts_to_epoch, days_ago_epoch
+from utils.config import DEFECT_LABELS, ACTIONS
+
+
+def make_db(path: str, n_rows: int, days: int = 365):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrate(conn, target=2)
+    start = datetime.now() - timedelta(days=days)
+    locations = ["front bumper", "rear bumper", "hood", "trunk", "door", "roof", "windshield"]
+    batch = []
+    for i in range(n_rows):
+        ts = start + timedelta(seconds=random.randint(0, days * 86400))
+        batch.append((
+            f"car_{i:07d}.jpg", f"/bench/car_{i:07d}.jpg", f"hash_{i:07d}",
+            random.choice(DEFECT_LABELS), random.choice("ABC"), random.choice(locations),
+            round(random.uniform(0.5, 1.0), 3), "benchmark row", random.choice(ACTIONS),
+            ts.strftime("%Y-%m-%d %H:%M:%S"),
+        ))
+        if len(batch) == 50000:
+            _flush(conn, batch)
+    _flush(conn, batch)
+    conn.execute("ANALYZE")
+    conn.commit()
+    return conn
+
+
+def _flush(conn, batch):
+    with conn:
+        conn.executemany(
+            "INSERT INTO results (file_name, image_path, image_hash, defect_type, severity, location, "
+            "score, detail, action, ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch
+        )
+    batch.clear()
+
+
+def timed(conn, sql, args=(), repeat: int = 3):
+    best, rows = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(sql, args).fetchall()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best, rows
+
+
+def plan(conn, sql, args=()):
+    return "; ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, args))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ts vs ts_epoch 쿼리 벤치마크")
+    ap.add_argument("--rows", type=int, default=300000)
+    ap.add_argument("--days", type=int, default=365, help="가짜 데이터 기간(일)")
+    args = ap.parse_args()
+
+    cols = "id, image_path, file_name, defect_type, severity, location, score, detail, action, ts"
+    month_ago = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+    today = datetime.now().strftime("%Y-%m-%d")
+    cases = [
+        ("최근 200건 (fetch_results)",
+         f"SELECT {cols} FROM results ORDER BY datetime(ts) DESC, id DESC LIMIT 200", (),
+         f"SELECT {cols} FROM results ORDER BY ts_epoch DESC, id DESC LIMIT 200", ()),
+        ("최근 한 달 검색 (search_results)",
+         f"SELECT {cols} FROM results WHERE date(ts) >= date(?) AND date(ts) <= date(?) "
+         "ORDER BY datetime(ts) DESC, id DESC LIMIT 500", (month_ago, today),
+         f"SELECT {cols} FROM results WHERE ts_epoch >= ? AND ts_epoch < ? "
+         "ORDER BY ts_epoch DESC, id DESC LIMIT 500", (ts_to_epoch(month_ago), ts_to_epoch(today) + 86400)),
+        ("대시보드 30일 결함별 건수",
+         "SELECT defect_type, COUNT(*) FROM results WHERE IFNULL(defect_type,'') <> '' "
+         "AND date(substr(ts,1,10)) >= date('now','-30 day') GROUP BY defect_type", (),
+         "SELECT defect_type, COUNT(*) FROM results WHERE IFNULL(defect_type,'') <> '' "
+         "AND ts_epoch >= ? GROUP BY defect_type", (days_ago_epoch(30),)),
+        ("대시보드 30일 일별 건수",
+         "SELECT substr(ts,1,10) AS day, COUNT(*) FROM results "
+         "WHERE date(substr(ts,1,10)) >= date('now','-30 day') GROUP BY day ORDER BY day", (),
+         "SELECT date(ts_epoch,'unixepoch') AS day, COUNT(*) FROM results "
+         "WHERE ts_epoch IS NOT NULL AND ts_epoch >= ? GROUP BY day ORDER BY day", (days_ago_epoch(30),)),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        conn = make_db(os.path.join(tmp, "bench.db"), args.rows, args.days)
+        print(f"[INFO] rows={args.rows} build={time.perf_counter() - t0:.1f}s")
+        before = [(timed(conn, sql, a), plan(conn, sql, a)) for _, sql, a, _, _ in cases]
+
+        t0 = time.perf_counter()
+        migrate(conn, target=3)  # v3: ts_epoch 컬럼/인덱스
+        run_backfills(conn)      # 기존 행 ts_epoch 채우기 (앱에서는 백그라운드)
+        conn.execute("ANALYZE")
+        conn.commit()
+        print(f"[INFO] migrate to v3 = {time.perf_counter() - t0:.1f}s")
+
+        for (name, old_sql, old_args, new_sql, new_args), ((t_old, r_old), old_plan) in zip(cases, before):
+            t_new, r_new = timed(conn, new_sql, new_args)
+            print(f"\n[{name}]")
+            print(f"  before {t_old * 1000:9.1f} ms  rows={len(r_old)}  plan: {old_plan}")
+            print(f"  after  {t_new * 1000:9.1f} ms  rows={len(r_new)}  plan: {plan(conn, new_sql, new_args)}")
+            print(f"  speedup x{t_old / t_new if t_new else float('inf'):.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+오프라인 분류 부하 테스트
+- 로컬 스텁 서버(api/stub_server.py) 또는 프로세스 내 가짜 백엔드로 classify_image를 병렬 호출
+- API 키/네트워크 없이 동시성, 재시도, 묶음 요청의 처리량을 측정
+
+예:
+    python scripts/load_test.py --images 500 --concurrency 8 --latency lognormal:-0.3,0.5 --error-rate 0.05
+    python scripts/load_test.py --backend fake --pack-size 4
+"""
+
+import sys, os
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- 패키지 인식용 경로 추가 ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CLASSIFIER_BACKEND", "fake")  # API 키 없이 config 로드
+
+from PIL import Image
+
+from api.backends import ResponseSimulator, FakeBackend, LocalServerBackend, set_backend, get_backend
+from api.openai_api import classify_image, classify_images
+from api.retry import ClassificationError
+from api import stub_server
+
+
+def make_images(folder: str, n: int) -> list:
+    paths = []
+    for i in range(n):
+        p = os.path.join(folder, f"load_{i:05d}.png")
+        Image.new("RGB", (64, 64), ((i * 37) % 256, (i * 91) % 256, (i * 13) % 256)).save(p)
+        paths.append(p)
+    return paths
+
+
+def run(paths, concurrency: int, pack_size: int):
+    ok, failed = 0, 0
+    lat = []
+
+    def _one(chunk):
+        t0 = time.perf_counter()
+        if pack_size > 1:
+            results, failures = classify_images(chunk, pack_size=pack_size, use_cache=False)
+        else:
+            try:
+                results, failures = {chunk[0]: classify_image(chunk[0], use_cache=False)}, {}
+            except ClassificationError as e:
+                results, failures = {}, {chunk[0]: e}
+        return time.perf_counter() - t0, len(results), len(failures)
+
+    chunks = [paths[i:i + pack_size] for i in range(0, len(paths), pack_size)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for dt, n_ok, n_fail in pool.map(_one, chunks):
+            lat.append(dt)
+            ok += n_ok
+            failed += n_fail
+    elapsed = time.perf_counter() - t0
+
+    lat.sort()
+    p50 = lat[len(lat) // 2] if lat else 0.0
+    p95 = lat[int(len(lat) * 0.95) - 1] if lat else 0.0
+    print(f"[RESULT] images={len(paths)} ok={ok} failed={failed} "
+          f"elapsed={elapsed:.2f}s throughput={len(paths) / elapsed:.1f} img/s "
+          f"request p50={p50:.2f}s p95={p95:.2f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="오프라인 분류 부하 테스트")
+    ap.add_argument("--backend", choices=["local", "fake"], default="local",
+                    help="local: 스텁 HTTP 서버를 띄워 연결 / fake: 프로세스 내 가짜 응답")
+    ap.add_argument("--images", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--pack-size", type=int, default=1)
+    ap.add_argument("--latency", default="lognormal:-0.3,0.5")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    args = ap.parse_args()
+
+    sim = ResponseSimulator(latency=args.latency, error_rate=args.error_rate,
+                            retry_after=args.retry_after)
+    server = None
+    if args.backend == "local":
+        server = stub_server.start_in_thread(simulator=sim)
+        host, port = server.server_address[:2]
+        set_backend(LocalServerBackend(base_url=f"http://{host}:{port}/v1", pool_size=args.concurrency))
+        print(f"[INFO] stub server http://{host}:{port}/v1")
+    else:
+        set_backend(FakeBackend(sim))
+
+    get_backend().warm_up()  # 클라이언트 생성/첫 연결 시간은 측정에서 제외
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_images(tmp, args.images)
+        print(f"[INFO] backend={args.backend} concurrency={args.concurrency} "
+              f"pack_size={args.pack_size} latency={args.latency} error_rate={args.error_rate}")
+        run(paths, args.concurrency, max(1, args.pack_size))
+
+    print(f"[INFO] backend requests={sim.requests} simulated errors={sim.errors}")
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# tests/conftest.py
+"""
+DB 계층 테스트 공용 설정
+
+- 설정 모듈(utils/config.py)은 import 시점에 환경 변수를 읽으므로 여기서 먼저 지정
+  (API 키 없이 돌도록 fake 백엔드, DB/아카이브는 세션 임시 폴더)
+- fresh_db: 테스트마다 빈 DB에서 시작 (연결/writer/메모리 캐시 정리 후 파일 삭제)
+- db_path: 스키마 없는 빈 DB 경로 (이전 버전 스키마를 만들어 두고 올리는 테스트용)
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="rokey-tests-")
+os.environ.update(
+    CLASSIFIER_BACKEND="fake",
+    DB_PATH=os.path.join(_TMP, "test.db"),
+    ARCHIVE_DIR=os.path.join(_TMP, "archive"),
+    DB_WRITER_WINDOW_MS="5",
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from db import db
+from db.writer import shutdown_writer
+
+
+def _reset():
+    shutdown_writer()
+    db.close_connection()
+    for name in os.listdir(_TMP):
+        path = os.path.join(_TMP, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    db._schema_ready = False
+    db._phash_tree = None
+    for cache in db._cat_ids.values():
+        cache.clear()
+
+
+@pytest.fixture
+def db_path():
+    """스키마를 적용하지 않은 빈 DB 경로 (마이그레이션 테스트용, 테스트가 직접 연결/적용)"""
+    _reset()
+    yield db.get_db_path()
+    _reset()
+
+
+@pytest.fixture
+def fresh_db():
+    """빈 DB(스키마 적용)의 현재 스레드 연결"""
+    _reset()
+    db.ensure_schema()
+    yield db.get_connection()
+    _reset()
+
+
+def record(i: int, ts: str, defect_type: str = "scratch", **kw) -> dict:
+    """insert_results_many용 레코드 (파일 없이 image_hash를 직접 지정)"""
+    rec = dict(image_path=f"/img/{i}.jpg", image_hash=f"h{i:06d}", defect_type=defect_type, severity="B",
+               location="door", score=0.5, detail=f"detail {i}", action="Hold", ts=ts, phash=0)
+    rec.update(kw)
+    return rec
+
+
+def monthly_records(months: int, per_month: int, year: int = 2025) -> list:
+    """year년 1월부터 months개월, 달마다 per_month행"""
+    out = []
+    for m in range(months):
+        y, mo = year + m // 12, m % 12 + 1
+        for k in range(per_month):
+            out.append(record(len(out), f"{y:04d}-{mo:02d}-{k % 28 + 1:02d} 10:00:00"))
+    return out
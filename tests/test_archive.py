@@ -0,0 +1,91 @@
+# tests/test_archive.py
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from conftest import monthly_records, record
+from db import archive, db
+
+
+def _daily(conn) -> list:
+    return sorted(conn.execute("SELECT * FROM results_daily WHERE cnt <> 0").fetchall())
+
+
+def _roll(conn, months: int = 12, per_month: int = 5) -> list:
+    db.insert_results_many(monthly_records(months, per_month))
+    return archive.roll(conn, hot_periods=1, now=datetime(2025, months, 15))
+
+
+def test_rebuild_rollups_more_partitions_than_attach_limit(fresh_db):
+    assert len(_roll(fresh_db)) > archive.MAX_ATTACHED
+    before = _daily(fresh_db)
+    assert sum(r[-1] for r in before) == 60
+    with fresh_db:
+        fresh_db.execute("UPDATE results_daily SET cnt = cnt + 7")
+    db.rebuild_rollups()
+    assert _daily(fresh_db) == before
+    assert archive.attached(fresh_db) == []
+
+
+def test_rebuild_rollup_cli_keeps_archived_counts(fresh_db):
+    _roll(fresh_db)
+    before = _daily(fresh_db)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-m", "db.migrations", "--rebuild-rollup"], cwd=root, check=True,
+                   capture_output=True)
+    assert _daily(fresh_db) == before
+
+
+def test_roll_moves_old_periods_and_searches_still_see_them(fresh_db):
+    moved = _roll(fresh_db)
+    assert [k for k, _ in moved] == [f"2025-{m:02d}" for m in range(1, 12)] and {n for _, n in moved} == {5}
+    assert fresh_db.execute("SELECT COUNT(*) FROM results_data").fetchone()[0] == 5
+    assert len(db.search_results(limit=1000)) == 60 and db.approx_count() == (60, True)
+    assert sum(r[-1] for r in _daily(fresh_db)) == 60
+    assert archive.roll(fresh_db, hot_periods=1, now=datetime(2025, 12, 15)) == []   # 다시 실행해도 그대로
+
+
+def test_attach_evicts_oldest_beyond_limit(fresh_db):
+    _roll(fresh_db)
+    parts = archive.list_partitions()
+    for p in parts:
+        archive.attach(fresh_db, p)
+        assert len(archive.attached(fresh_db)) <= archive.MAX_ATTACHED
+    assert archive.attached(fresh_db) == [p.schema for p in parts[-archive.MAX_ATTACHED:]]
+    assert archive.attach(fresh_db, parts[-1]) == parts[-1].schema   # 이미 붙어 있으면 그대로
+    assert archive.attached(fresh_db) == [p.schema for p in parts[-archive.MAX_ATTACHED:]]
+    with pytest.raises(ValueError):
+        archive.union_view(fresh_db)   # 11개는 한 번에 붙일 수 없음
+    assert len(archive.union_view(fresh_db, hi=db.ts_to_epoch("2025-04-01"))) == 3
+
+
+def test_upsert_and_delete_reach_archived_rows(fresh_db):
+    _roll(fresh_db)
+    before = _daily(fresh_db)
+    feb = archive.list_partitions()[1]
+    assert db.insert_results_many([record(6, "2025-12-01 10:00:00")]) == ["duplicate"]
+
+    # 아카이브 행 upsert → 같은 id로 본 DB에 다시 저장, 아카이브에서는 빠짐
+    assert db.upsert_results_many([record(6, "2025-12-01 10:00:00", defect_type="dent")]) == ["updated"]
+    row = fresh_db.execute("SELECT id, defect_type FROM results WHERE image_hash = 'h000006'").fetchone()
+    assert row == (7, "dent")
+    assert fresh_db.execute(f"SELECT COUNT(*) FROM {archive.attach(fresh_db, feb)}.results").fetchone()[0] == 4
+
+    assert db.delete_results([1, 7, 60]) == 3
+    assert len(db.search_results(limit=1000)) == 57
+    daily = _daily(fresh_db)
+    assert sum(r[-1] for r in daily) == 57 and daily != before
+    db.rebuild_rollups()
+    assert _daily(fresh_db) == daily
+
+
+def test_retention_drops_old_partitions_from_rollup(fresh_db):
+    _roll(fresh_db)
+    removed = archive.apply_retention(fresh_db, retention_periods=4, now=datetime(2025, 12, 15))
+    assert removed == [f"2025-{m:02d}" for m in range(1, 9)]
+    assert [p.key for p in archive.list_partitions()] == ["2025-09", "2025-10", "2025-11"]
+    assert len(db.search_results(limit=1000)) == 20 and sum(r[-1] for r in _daily(fresh_db)) == 20
+    assert archive.apply_retention(fresh_db, retention_periods=0) == []
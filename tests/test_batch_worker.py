@@ -0,0 +1,49 @@
+# tests/test_batch_worker.py
+from PIL import Image, ImageDraw
+
+from db import db
+
+
+def _images(tmp_path, n: int) -> list:
+    paths = []
+    for i in range(n):
+        p = str(tmp_path / f"{i}.png")
+        img = Image.new("L", (64, 48), 30)
+        ImageDraw.Draw(img).rectangle((4 * i, 8, 4 * i + 20, 30), fill=220)
+        img.save(p)
+        paths.append(p)
+    return paths
+
+
+def _run(worker) -> dict:
+    """run()을 현재 스레드에서 실행하고 시그널로 받은 값을 모음"""
+    got = {"done": [], "failed": [], "progress": [], "summary": None}
+    worker.item_done.connect(lambda p, r: got["done"].append(p))
+    worker.item_failed.connect(lambda p, e: got["failed"].append(p))
+    worker.progress.connect(lambda n, total: got["progress"].append((n, total)))
+    worker.finished_summary.connect(lambda *a: got.__setitem__("summary", a))
+    worker.run()
+    return got
+
+
+def test_batch_classifies_concurrently_and_reports_failures(fresh_db, tmp_path):
+    from gui.workers import BatchClassifyWorker
+
+    paths = _images(tmp_path, 5)
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"not an image")
+    got = _run(BatchClassifyWorker(paths + [str(bad)], concurrency=3, pack_size=1, prefilter=False))
+
+    assert sorted(got["done"]) == sorted(paths) and got["failed"] == [str(bad)]
+    assert got["progress"][-1] == (6, 6) and [n for n, _ in got["progress"]] == list(range(1, 7))
+    assert got["summary"] == (5, 1, False, 0)
+    assert sorted(r[1] for r in db.search_results()) == sorted(paths)
+
+
+def test_cancel_before_start_saves_nothing(fresh_db, tmp_path):
+    from gui.workers import BatchClassifyWorker
+
+    worker = BatchClassifyWorker(_images(tmp_path, 3), concurrency=2, pack_size=1, prefilter=False)
+    worker.cancel()
+    assert _run(worker)["summary"] == (0, 0, True, 0)
+    assert db.search_results() == []
@@ -0,0 +1,38 @@
+# tests/test_bulk_write.py
+from conftest import record
+from db import db
+
+
+def _rows() -> dict:
+    return {r[1]: r for r in db.search_results()}
+
+
+def test_insert_outcomes_across_chunks(fresh_db, tmp_path):
+    db.insert_results_many([record(0, "2026-01-01 10:00:00")])
+    missing = dict(image_path=str(tmp_path / "missing.png"), defect_type="dent")   # 해시를 못 구함
+    recs = [record(1, "2026-01-01 10:00:00"), record(0, "2026-01-02 10:00:00"), missing,
+            record(1, "2026-01-03 10:00:00", image_path="/img/other.jpg"),   # 같은 내용, 다른 경로
+            record(2, "2026-01-01 10:00:00")]
+    assert db.insert_results_many(recs, chunk_size=2) == ["inserted", "duplicate", "error", "duplicate", "inserted"]
+    rows = _rows()
+    assert sorted(rows) == ["/img/0.jpg", "/img/1.jpg", "/img/2.jpg"]
+    assert rows["/img/0.jpg"][9] == "2026-01-01 10:00:00"   # insert는 기존 행을 바꾸지 않음
+
+
+def test_upsert_updates_existing_and_last_in_chunk_wins(fresh_db):
+    db.insert_results_many([record(0, "2026-01-01 10:00:00")])
+    recs = [record(0, "2026-01-05 10:00:00", defect_type="dent"),
+            record(1, "2026-01-01 10:00:00", defect_type="dent"),
+            record(1, "2026-01-02 10:00:00", defect_type="crack")]
+    assert db.upsert_results_many(recs) == ["updated", "inserted", "updated"]
+    rows = _rows()
+    assert (rows["/img/0.jpg"][0], rows["/img/0.jpg"][3], rows["/img/0.jpg"][9]) == (1, "dent", "2026-01-05 10:00:00")
+    assert (rows["/img/1.jpg"][3], rows["/img/1.jpg"][9]) == ("crack", "2026-01-02 10:00:00")
+    assert len(rows) == 2
+
+
+def test_unknown_label_falls_back_to_first_label(fresh_db):
+    from utils.config import DEFECT_LABELS
+
+    assert db.insert_results_many([record(0, "2026-01-01 10:00:00", defect_type="???")]) == ["inserted"]
+    assert db.search_results()[0][3] == DEFECT_LABELS[0]
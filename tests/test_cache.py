@@ -0,0 +1,82 @@
+# tests/test_cache.py
+import threading
+import time
+
+import pytest
+
+from api.cache import ClassificationCache
+from db import db
+
+
+def _files(tmp_path, contents) -> list:
+    paths = []
+    for i, data in enumerate(contents):
+        p = tmp_path / f"{i}.bin"
+        p.write_bytes(data)
+        paths.append(str(p))
+    return paths
+
+
+def test_cache_is_keyed_by_content_model_and_prompt(fresh_db, tmp_path):
+    a, same_as_a, b = _files(tmp_path, [b"a" * 100, b"a" * 100, b"b" * 100])
+    cache = ClassificationCache(db.get_db_path())
+    calls = []
+
+    def compute(path):
+        calls.append(path)
+        return {"label": "dent", "path": path}
+
+    assert cache.get_or_compute(a, compute)["path"] == a
+    assert cache.get_or_compute(same_as_a, compute)["path"] == a   # 경로가 달라도 같은 바이트면 적중
+    cache.get_or_compute(b, compute)
+    cache.get_or_compute(a, compute, model="other-model")
+    cache.get_or_compute(a, compute, prompt="other prompt")
+    assert calls == [a, b, a, a]
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 4)
+
+    def fail(path):
+        raise RuntimeError("api")
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute(b, fail, model="m2")
+    assert cache.lookup(b, model="m2")[1] is None   # 실패한 호출은 저장하지 않음
+
+
+def test_concurrent_misses_are_coalesced(fresh_db, tmp_path):
+    (path,) = _files(tmp_path, [b"x" * 100])
+    cache = ClassificationCache(db.get_db_path())
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute(p):
+        calls.append(p)
+        started.set()
+        release.wait(5)
+        return {"label": "crack"}
+
+    out = []
+    threads = [threading.Thread(target=lambda: out.append(cache.get_or_compute(path, compute))) for _ in range(4)]
+    threads[0].start()
+    assert started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    while cache.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [path] and out == [{"label": "crack"}] * 4
+
+
+def test_prune_keeps_max_entries_most_recently_used(fresh_db, tmp_path):
+    paths = _files(tmp_path, [bytes([i]) * 100 for i in range(3)])
+    cache = ClassificationCache(db.get_db_path(), max_entries=2)
+    keys = [cache.key_for(p) for p in paths]
+    for i, key in enumerate(keys[:2]):
+        cache.put(key, {"i": i})
+    with fresh_db:   # 사용 시각은 초 단위라 직접 지정: 0번을 1번보다 최근에 사용
+        for i, key in enumerate(keys[:2]):
+            fresh_db.execute("UPDATE classify_cache SET last_used_ts = ? WHERE image_hash = ?",
+                             (f"2026-01-0{2 - i} 00:00:00", key[0]))
+    cache.put(keys[2], {"i": 2})   # 한도(2)의 110%를 넘어 정리
+    left = {h for (h,) in fresh_db.execute("SELECT image_hash FROM classify_cache")}
+    assert left == {keys[0][0], keys[2][0]} and cache.stats()["evictions"] == 1
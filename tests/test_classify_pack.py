@@ -0,0 +1,21 @@
+# tests/test_classify_pack.py
+from PIL import Image
+
+from api.backends import get_backend
+from api.openai_api import classify_images
+
+
+def test_unreadable_image_is_dropped_from_pack(tmp_path):
+    paths = []
+    for i in range(3):
+        p = str(tmp_path / f"{i}.png")
+        Image.new("RGB", (32, 32), (i * 40, 0, 0)).save(p)
+        paths.append(p)
+    bad = tmp_path / "bad.png"
+    bad.write_bytes(b"not an image")
+
+    sim = get_backend().simulator
+    before = sim.requests
+    results, failures = classify_images(paths[:2] + [str(bad)] + paths[2:], pack_size=4, use_cache=False)
+    assert sorted(results) == sorted(paths) and list(failures) == [str(bad)]
+    assert sim.requests - before == 1   # 나머지 3장은 한 요청으로, 읽지 못한 이미지는 API 호출 없음
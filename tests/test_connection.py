@@ -0,0 +1,44 @@
+# tests/test_connection.py
+import sqlite3
+import threading
+
+import pytest
+
+from conftest import record
+from db import db
+from utils.config import DB_BUSY_TIMEOUT_MS
+
+
+def test_connection_is_reused_per_thread_with_wal(fresh_db):
+    conn = db.get_connection()
+    assert conn is fresh_db and db.get_connection(db.get_db_path()) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == DB_BUSY_TIMEOUT_MS
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2   # MEMORY
+
+    other = []
+    t = threading.Thread(target=lambda: (other.append(db.get_connection()), db.close_connection()))
+    t.start()
+    t.join()
+    assert other[0] is not conn   # sqlite3 연결은 스레드 간 공유하지 않음
+
+    db.close_connection()
+    assert db.get_connection() is not conn
+
+
+def test_read_snapshot_sees_one_snapshot_and_cannot_write(fresh_db):
+    db.insert_results_many([record(0, "2026-01-01 10:00:00")])
+    before = db.read_report()["reads"]
+
+    def read(conn):
+        first = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        # 읽는 도중 다른 스레드(저장 스레드)가 커밋해도 같은 트랜잭션 안에서는 보이지 않음
+        assert db.insert_results_many([record(1, "2026-01-01 10:00:00")]) == ["inserted"]
+        return first, conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    assert db.read_snapshot(read) == (1, 1)
+    assert db.read_snapshot(lambda c: c.execute("SELECT COUNT(*) FROM results").fetchone()[0]) == 2
+    assert db.read_report()["reads"] - before == 2
+    with pytest.raises(sqlite3.OperationalError):
+        db.read_snapshot(lambda c: c.execute("DELETE FROM results_data"))
+    assert fresh_db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 2
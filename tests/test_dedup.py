@@ -0,0 +1,63 @@
+# tests/test_dedup.py
+import hashlib
+import os
+from datetime import datetime
+
+from db import archive, db, writer
+
+
+def _files(tmp_path, n: int) -> list:
+    paths = []
+    for i in range(n):
+        p = tmp_path / f"{i}.bin"
+        p.write_bytes(bytes([i]) * 1000)
+        paths.append(str(p))
+    return paths
+
+
+def _hits_misses(before: dict) -> tuple:
+    now = db.fingerprint_report()
+    return now["hits"] - before["hits"], now["misses"] - before["misses"]
+
+
+def test_fingerprint_cache_rehashes_only_changed_files(fresh_db, tmp_path):
+    paths = _files(tmp_path, 3)
+    before = db.fingerprint_report()
+    first = db.file_sha256_many(paths)
+    assert first[paths[0]] == hashlib.sha256(bytes([0]) * 1000).hexdigest()
+    assert _hits_misses(before) == (0, 3)
+    assert writer.get_writer().flush(timeout=5)   # 지문 저장은 저장 스레드에서
+
+    before = db.fingerprint_report()
+    assert db.file_sha256_many(paths) == first
+    assert _hits_misses(before) == (3, 0)
+
+    # 크기가 같아도 mtime이 바뀌면 다시 해시, 없어진 파일은 예외 객체
+    with open(paths[1], "wb") as f:
+        f.write(b"x" * 1000)
+    st = os.stat(paths[1])
+    os.utime(paths[1], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    os.remove(paths[2])
+    before = db.fingerprint_report()
+    out = db.file_sha256_many(paths)
+    assert out[paths[1]] == hashlib.sha256(b"x" * 1000).hexdigest()
+    assert isinstance(out[paths[2]], OSError)
+    assert _hits_misses(before) == (1, 1)
+
+
+def test_new_images_checks_main_db_and_archives(fresh_db, tmp_path, monkeypatch):
+    paths = _files(tmp_path, 5)
+    copy = tmp_path / "copy_of_0.bin"
+    copy.write_bytes(bytes([0]) * 1000)   # 0.bin과 같은 내용, 다른 경로
+    db.insert_results_many([dict(image_path=paths[0], defect_type="dent", ts="2025-01-05 10:00:00", phash=0),
+                            dict(image_path=paths[1], defect_type="dent", ts="2025-06-05 10:00:00", phash=0)])
+    assert len(archive.roll(fresh_db, hot_periods=1, now=datetime(2025, 6, 15))) == 1   # 0.bin은 아카이브로
+
+    monkeypatch.chdir(tmp_path)
+    asked = ["2.bin", paths[0], paths[2], str(copy), paths[1], str(tmp_path / "gone.bin"), paths[3]]
+    assert db.new_image_paths(asked) == ["2.bin", str(copy), str(tmp_path / "gone.bin"), paths[3]]
+    # check_hash: 같은 내용이 이미 저장된 파일은 빼고, 못 읽는 파일은 남김
+    assert db.new_image_paths(asked, check_hash=True) == ["2.bin", str(tmp_path / "gone.bin"), paths[3]]
+
+    stored = db.file_sha256_many(paths[:2])
+    assert db.new_image_hashes(["new", stored[paths[0]], "new", stored[paths[1]]]) == ["new"]
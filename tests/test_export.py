@@ -0,0 +1,73 @@
+# tests/test_export.py
+import csv
+import gzip
+import os
+import sqlite3
+from datetime import datetime
+
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import monthly_records
+from db import archive, db, export
+
+
+def _archived(conn, months: int = 12, per_month: int = 5) -> int:
+    """2025년 months개월치를 저장하고 마지막 달만 남겨 아카이브 → 아카이브 파일 수"""
+    assert db.insert_results_many(monthly_records(months, per_month)).count("inserted") == months * per_month
+    moved = archive.roll(conn, hot_periods=1, now=datetime(2025, months, 15))
+    return len(moved)
+
+
+def test_export_results_more_partitions_than_attach_limit(fresh_db, tmp_path):
+    assert _archived(fresh_db) > archive.MAX_ATTACHED
+    path = str(tmp_path / "r.parquet")
+    r = export.export_results(path)
+    table = pq.read_table(path)
+    assert r["rows"] == table.num_rows == 60
+    assert sorted(table.column("id").to_pylist()) == list(range(1, 61))
+
+
+def test_export_results_date_range_and_cancel(fresh_db, tmp_path):
+    _archived(fresh_db)
+    r = export.export_results(str(tmp_path / "r.arrow"), date_from="2025-03-01", date_to="2025-05-31")
+    assert r["rows"] == 15
+
+    class Stop:
+        def is_set(self):
+            return True
+    path = str(tmp_path / "c.parquet")
+    r = export.export_results(path, chunk_size=7, cancel=Stop())
+    assert r["cancelled"] and 0 < r["rows"] <= 7
+    assert not os.path.exists(path) and not os.path.exists(path + ".part")
+    assert archive.attached(fresh_db) == []
+
+
+def _read_csv(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8-sig", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_results_include_every_partition(fresh_db, tmp_path):
+    assert _archived(fresh_db) > archive.MAX_ATTACHED
+    r = export.export_tables_csv(str(tmp_path), compressed=True, chunk_size=4)
+    assert [os.path.basename(p) for p in r["paths"]] == ["results.csv.gz"]
+    rows = _read_csv(r["paths"][0])
+    assert rows[0] == [c.strip() for c in archive.COLUMNS.split(",")]
+    assert sorted(int(x[0]) for x in rows[1:]) == list(range(1, 61))
+    assert r["rows"] == 60 and not r["cancelled"]
+
+
+def test_csv_tables_skip_internal_and_fts_shadow_tables(fresh_db):
+    from api.cache import ClassificationCache
+    ClassificationCache(db.get_db_path()).ensure_schema()
+    with fresh_db:
+        fresh_db.execute("CREATE TABLE notes (a TEXT)")
+    assert export.csv_tables(fresh_db) == ["results", "notes"]
+
+
+def test_csv_error_is_raised_not_reported_as_success(fresh_db, tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        export.export_tables_csv(str(tmp_path), tables=["results", "no_such_table"])
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".part")]
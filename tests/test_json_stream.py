@@ -0,0 +1,23 @@
+# tests/test_json_stream.py
+import json
+
+from api.json_stream import IncrementalJsonObject
+
+
+def test_fields_are_emitted_as_soon_as_each_pair_closes():
+    doc = {"label": "dent", "description": 'a, "quoted" {brace} \\ here', "bbox": [1, [2, 3]],
+           "meta": {"a": 1, "b": "}"}, "score": 0.75}
+    text = "```json\n" + json.dumps(doc, ensure_ascii=False) + "\n```trailing {\"x\": 1}"
+    parser = IncrementalJsonObject()
+    seen = []
+    for i in range(0, len(text), 3):   # 아무 데서나 끊긴 chunk
+        seen.extend(k for k, _ in parser.feed(text[i:i + 3]))
+    assert seen == list(doc) and parser.result == doc and parser.done
+    assert json.loads(parser.text) == doc   # 닫힌 뒤 텍스트는 무시
+
+
+def test_broken_pair_is_skipped():
+    parser = IncrementalJsonObject()
+    assert parser.feed('{"label": "dent", "score": 0.5x, ') == [("label", "dent")]
+    assert parser.feed('"action": "Hold"}') == [("action", "Hold")]
+    assert parser.result == {"label": "dent", "action": "Hold"} and parser.feed("more") == []
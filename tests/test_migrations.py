@@ -0,0 +1,163 @@
+# tests/test_migrations.py
+import sqlite3
+
+import pytest
+
+from conftest import record
+from db import db, migrations
+
+
+def _daily(conn) -> list:
+    return sorted(conn.execute("SELECT * FROM results_daily WHERE cnt <> 0").fetchall())
+
+
+def _old_db(path: str, version: int = 6, n: int = 20):
+    """version 스키마(범주형이 TEXT인 results 테이블)에 n행"""
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn, target=version)
+    with conn:
+        conn.executemany(
+            "INSERT INTO results (file_name, image_path, image_hash, defect_type, severity, location, score, "
+            "detail, action, ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(f"{i}.jpg", f"/img/{i}.jpg", f"h{i:06d}", "dent" if i % 2 else "scratch", "B", "door", 0.5,
+              f"detail {i}", "Hold", f"2025-01-{i % 28 + 1:02d} 10:00:00") for i in range(n)]
+        )
+    conn.close()
+
+
+def test_v7_copy_runs_after_start_and_app_reads_legacy_rows(db_path):
+    _old_db(db_path)
+    db.ensure_schema()
+    conn = db.get_connection()
+    # 시작 시에는 테이블 이름만 바뀌고 행 복사는 backfill로 남음
+    assert migrations.has_table(conn, "results_legacy")
+    assert 7 in migrations.status(conn)["pending_backfills"]
+
+    assert len(db.search_results()) == 20
+    assert len(db.search_results(defect_type="dent")) == 10
+    assert db.approx_count() == (20, True)
+    assert db.new_image_paths(["/img/3.jpg", "/img/99.jpg"]) == ["/img/99.jpg"]
+    assert db.insert_results_many([record(3, "2025-02-01 10:00:00")]) == ["duplicate"]
+    assert db.upsert_results_many([record(4, "2025-02-01 10:00:00", defect_type="crack")]) == ["updated"]
+    assert db.delete_results([6]) == 1
+    assert db.find_near_duplicate(0, 0)[1][0] == 5   # v6 행에는 phash가 없고 upsert한 행만 있음
+    page = db.search_results_page(page_size=7)
+    assert len(page["rows"]) == 7 and page["next"]
+
+    daily = _daily(conn)
+    assert sum(r[-1] for r in daily) == 19
+    assert migrations.run_backfills(conn)
+    assert not migrations.has_table(conn, "results_legacy")
+    rows = db.search_results()
+    assert len(rows) == 19 and {r[3] for r in rows if r[0] == 5} == {"crack"}
+    assert _daily(conn) == daily
+    db.rebuild_rollups()
+    assert _daily(conn) == daily
+    assert [r[0] for r in db.search_results(keyword="detail 7")] == [8]
+
+
+def test_ts_epoch_backfill_does_not_block_date_queries(db_path):
+    _old_db(db_path, version=2)
+    db.ensure_schema()
+    conn = db.get_connection()
+    assert {3, 7} <= set(migrations.status(conn)["pending_backfills"])
+    assert conn.execute("SELECT COUNT(*) FROM results_legacy WHERE ts_epoch IS NULL").fetchone()[0] == 20
+
+    # ts_epoch가 아직 없는 행도 ts로 계산해 날짜 조건/정렬/집계에 포함
+    daily = _daily(conn)
+    assert -1 not in {r[0] for r in daily} and sum(r[-1] for r in daily) == 20
+    rows = db.search_results(date_from="2025-01-10", date_to="2025-01-12")
+    assert sorted(r[0] for r in rows) == [10, 11, 12]
+    assert db.search_results(limit=1)[0][0] == 20   # 1월 20일 = 가장 최근
+    page = db.search_results_page(page_size=15)
+    assert len(page["rows"]) == 15 and len(db.search_results_page(cursor=page["next"])["rows"]) == 5
+    assert conn.execute("SELECT COUNT(*) FROM results WHERE ts_epoch >= ?",
+                        (db.ts_to_epoch("2025-01-15"),)).fetchone()[0] == 6
+
+    assert migrations.run_backfills(conn)
+    assert _daily(conn) == daily
+    assert conn.execute("SELECT COUNT(*) FROM results WHERE ts_epoch IS NULL").fetchone()[0] == 0
+    assert sorted(r[0] for r in db.search_results(date_from="2025-01-10", date_to="2025-01-12")) == [10, 11, 12]
+
+
+# 기준(baseline) 버전 앱이 만든 스키마: user_version 0, 인덱스 4개
+_BASELINE = """
+    CREATE TABLE results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_name   TEXT,
+        image_path  TEXT NOT NULL,
+        image_hash  TEXT,
+        defect_type TEXT,
+        severity    TEXT,
+        location    TEXT,
+        score       REAL,
+        detail      TEXT,
+        action      TEXT,
+        ts          TEXT DEFAULT (datetime('now','localtime'))
+    );
+    CREATE UNIQUE INDEX idx_results_image_path ON results(image_path);
+    CREATE UNIQUE INDEX idx_results_image_hash ON results(image_hash);
+    CREATE INDEX idx_results_type_sev_ts ON results(defect_type, severity, ts);
+    CREATE INDEX idx_results_location ON results(location);
+"""
+
+
+class _StopAfter:
+    """is_set()이 n번째 호출부터 True (backfill을 chunk n개 뒤에 중단)"""
+
+    def __init__(self, n: int):
+        self.n = n
+
+    def is_set(self):
+        self.n -= 1
+        return self.n < 0
+
+
+def test_baseline_db_upgrades_to_latest_with_resumable_backfills(db_path, tmp_path):
+    from PIL import Image
+
+    rows = []
+    for i in range(12):
+        path = str(tmp_path / f"{i}.png")
+        Image.new("L", (32, 32), i * 20).save(path)
+        rows.append((f"{i}.png", path, f"h{i:06d}", "crack" if i % 3 else "dent", "A", "hood", 0.9,
+                     f"균열 {i}", "Rework", f"2025-03-{i + 1:02d} 09:00:00"))
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_BASELINE)
+    with conn:
+        conn.executemany("INSERT INTO results (file_name, image_path, image_hash, defect_type, severity, location, "
+                         "score, detail, action, ts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.close()
+
+    db.ensure_schema()
+    conn = db.get_connection()
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
+    # 시작 시에는 v5 집계(blocking)와 v7 단계의 FTS 재색인(v4)만 끝나 있고, 조회는 바로 가능
+    assert set(migrations.status(conn)["pending_backfills"]) == {2, 3, 7}
+    assert len(db.search_results(defect_type="crack")) == 8
+    assert sum(r[-1] for r in _daily(conn)) == 12
+
+    # chunk 하나만 하고 중단 → 진행 위치가 기록되고, 다시 실행하면 이어서 끝까지
+    assert migrations.run_backfills(conn, chunk_size=5, stop_event=_StopAfter(1)) is False
+    progress = conn.execute("SELECT backfill_id, backfill_done FROM schema_migrations WHERE version = 2").fetchone()
+    assert progress == (5, 0)
+    assert conn.execute("SELECT COUNT(*) FROM results WHERE phash IS NOT NULL").fetchone()[0] == 5
+    assert migrations.run_backfills(conn, chunk_size=5)
+    assert migrations.status(conn)["pending_backfills"] == []
+
+    assert conn.execute("SELECT COUNT(*) FROM results WHERE phash IS NULL OR ts_epoch IS NULL").fetchone()[0] == 0
+    assert [r[0] for r in db.search_results(keyword="균열 11")] == [12]
+    daily = _daily(conn)
+    db.rebuild_rollups()
+    assert _daily(conn) == daily and sum(r[-1] for r in daily) == 12
+    idx = {name for (name,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'results_data'")}
+    assert {"idx_results_image_path", "idx_results_image_hash", "idx_results_ts_epoch"} <= idx
+
+
+def test_newer_schema_is_refused(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA user_version = {migrations.LATEST_VERSION + 1}")
+    with pytest.raises(migrations.SchemaVersionError):
+        migrations.migrate(conn)
+    conn.close()
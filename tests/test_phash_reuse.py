@@ -0,0 +1,31 @@
+# tests/test_phash_reuse.py
+from PIL import Image, ImageDraw
+
+from db import db
+
+
+def _image(path: str, shade: int):
+    img = Image.new("L", (64, 48), 30)
+    ImageDraw.Draw(img).rectangle((10, 10, 40, 30), fill=shade)
+    img.save(path)
+
+
+def test_reuse_is_opt_in_and_marks_source_row(fresh_db, tmp_path):
+    from gui.workers import BatchClassifyWorker
+
+    assert BatchClassifyWorker([]).phash_threshold is None   # PHASH_REUSE 기본값 0
+
+    paths = [str(tmp_path / f"{i}.png") for i in range(3)]
+    for i, p in enumerate(paths):
+        _image(p, 200 + i)   # 내용(sha256)은 다르고 지각 해시는 같은 재촬영
+    db.insert_results_many([dict(image_path=paths[0], defect_type="dent", severity="B", location="hood",
+                                 score=0.8, detail="찍힘", action="Rework")])
+    worker = BatchClassifyWorker(paths, phash_threshold=4)
+    reused = worker._reuse_near_duplicate(paths[1])
+    assert (reused["label"], reused["description"]) == ("dent", "[재사용 #1] 찍힘")
+
+    # 재사용 행을 다시 재사용하면 표시를 겹치지 않고 바로 앞 원본 id만
+    db.insert_results_many([dict(image_path=paths[1], defect_type="dent", severity="B", location="hood",
+                                 score=0.8, detail=reused["description"], action="Rework")])
+    db.delete_results([1])
+    assert worker._reuse_near_duplicate(paths[2])["description"] == "[재사용 #2] 찍힘"
@@ -0,0 +1,23 @@
+# tests/test_prefilter.py
+from PIL import Image
+
+from api import prefilter
+from utils.config import NO_DEFECT_LABEL
+
+
+def test_skipped_frame_is_stored_as_prefilter_verdict(fresh_db, tmp_path):
+    from db import db
+    from gui.workers import to_db_record
+
+    path = str(tmp_path / "blank.png")
+    Image.new("L", (64, 48), 128).save(path)
+    verdict = prefilter.evaluate(path, use_cache=False)
+    assert (verdict["stage"], verdict["route"]) == ("blank", "skip")
+
+    record = to_db_record(verdict["result"])
+    assert record["defect_type"] == NO_DEFECT_LABEL
+    assert (record["action"], record["location"]) == ("Hold", "unknown")   # 정상(Pass)으로 바꾸지 않음
+    db.insert_results_many([dict(record, image_path=path)])
+    detail = db.search_results()[0][7]
+    assert detail.startswith("[사전 필터:blank] ")
+    assert [r[7] for r in db.search_results(keyword="사전 필터:blank")] == [detail]
@@ -0,0 +1,57 @@
+# tests/test_retry.py
+import pytest
+
+from api import retry
+from api.retry import ClassificationError, RateLimiter, call_with_retry
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code: int, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _flaky(errors: list):
+    """errors를 차례로 던진 뒤 "ok" 반환하는 함수와 호출 횟수 목록"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return fn, calls
+
+
+def test_retries_transient_errors_and_honours_retry_after(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry.time, "sleep", slept.append)
+    monkeypatch.setattr(retry, "backoff_delay", lambda attempt: 0.01)
+    limiter = RateLimiter(rpm=0)
+    fn, calls = _flaky([_HTTPError(429, {"retry-after-ms": "1500"}), _HTTPError(503, {"retry-after": "2"}),
+                        TimeoutError("read")])
+    assert call_with_retry(fn, max_retries=3, limiter=limiter) == "ok"
+    # 재시도 전 대기(백오프와 Retry-After 중 큰 값) 뒤, 속도 제한기도 Retry-After만큼 다음 요청을 미룸
+    assert len(calls) == 4 and slept[0::2] == [1.5, 2.0, 0.01]
+    assert [round(s) for s in slept[1::2]] == [1, 2, 2] and limiter.waited == pytest.approx(sum(slept[1::2]))
+
+
+def test_non_retryable_and_exhausted_errors_raise_classification_error(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda s: None)
+    fn, calls = _flaky([_HTTPError(400)])
+    with pytest.raises(ClassificationError) as e:
+        call_with_retry(fn, max_retries=3, limiter=RateLimiter(rpm=0))
+    assert (len(calls), e.value.attempts, e.value.retryable) == (1, 1, False)
+
+    fn, calls = _flaky([_HTTPError(500)] * 5)
+    with pytest.raises(ClassificationError) as e:
+        call_with_retry(fn, max_retries=2, limiter=RateLimiter(rpm=0))
+    assert (len(calls), e.value.attempts, e.value.retryable) == (3, 3, True)
+
+
+def test_retry_after_http_date_and_bad_values():
+    assert retry.retry_after_seconds(_HTTPError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry.retry_after_seconds(_HTTPError(429, {"retry-after": "soon"})) is None
+    assert retry.retry_after_seconds(_HTTPError(429, {"retry-after-ms": "x", "retry-after": "3"})) == 3.0
+    assert retry.retry_after_seconds(_HTTPError(429)) is None
@@ -0,0 +1,35 @@
+# tests/test_rollup.py
+from conftest import record
+from db import db
+
+
+def _daily(conn) -> list:
+    return sorted(conn.execute("SELECT * FROM results_daily WHERE cnt <> 0").fetchall())
+
+
+def _grouped(conn) -> list:
+    """results에서 직접 센 일별 집계 (results_daily와 같은 형식)"""
+    return sorted(conn.execute(
+        "SELECT ts_epoch - ts_epoch % 86400, defect_type, severity, IFNULL(location, ''), IFNULL(action, ''), "
+        "COUNT(*) FROM results GROUP BY 1, 2, 3, 4, 5"
+    ).fetchall())
+
+
+def test_rollup_follows_inserts_updates_and_deletes(fresh_db):
+    db.insert_results_many([record(i, f"2026-01-{i % 3 + 1:02d} 10:00:00", defect_type="dent" if i % 2 else "scratch")
+                            for i in range(12)])
+    assert _daily(fresh_db) == _grouped(fresh_db) and sum(r[-1] for r in _daily(fresh_db)) == 12
+
+    # 날짜/유형/위치를 바꾸는 upsert, 삭제, 삭제 후 같은 이미지 재저장
+    db.upsert_results_many([record(0, "2026-01-05 09:00:00", defect_type="dent", location="hood"),
+                            record(1, "2026-01-01 23:59:59")])
+    assert db.delete_results([3, 4]) == 2
+    db.insert_results_many([record(2, "2026-01-02 10:00:00", severity="A")])
+    with fresh_db:
+        fresh_db.execute("UPDATE results_data SET ts = '2026-01-07 08:00:00', ts_epoch = ? WHERE id = 6",
+                         (db.ts_to_epoch("2026-01-07 08:00:00"),))
+
+    daily = _daily(fresh_db)
+    assert daily == _grouped(fresh_db) and sum(r[-1] for r in daily) == 11
+    db.rebuild_rollups()
+    assert _daily(fresh_db) == daily
@@ -0,0 +1,111 @@
+# tests/test_search.py
+from datetime import datetime
+
+import pytest
+
+from conftest import monthly_records, record
+from db import archive, db
+
+
+def _ids(rows) -> list:
+    return sorted(r[0] for r in rows)
+
+
+def test_date_range_includes_whole_end_day(fresh_db):
+    stamps = ["2026-01-09 23:59:59", "2026-01-10 00:00:00", "2026-01-12 23:59:59", "2026-01-13 00:00:00"]
+    db.insert_results_many([record(i, ts) for i, ts in enumerate(stamps)])
+    assert _ids(db.search_results(date_from="2026-01-10", date_to="2026-01-12")) == [2, 3]
+    assert _ids(db.search_results(date_from="2026-01-13")) == [4]
+    assert _ids(db.search_results(date_to="2026-01-09")) == [1]
+    assert _ids(db.search_results(date_from="2026-01-12 15:00:00", date_to="2026-01-12")) == [3]   # 날짜만 사용
+
+    # Python(ts_to_epoch)과 SQL(strftime)의 ts_epoch 계산이 같음
+    assert fresh_db.execute("SELECT COUNT(*) FROM results WHERE ts_epoch <> CAST(strftime('%s', ts) AS INTEGER)"
+                            ).fetchone()[0] == 0
+
+
+def test_date_filter_uses_ts_epoch_index(fresh_db):
+    where, args, _ = db._search_where(fresh_db, date_from="2026-01-10", date_to="2026-01-12")
+    plan = " ".join(r[-1] for r in fresh_db.execute(f"EXPLAIN QUERY PLAN SELECT r.id{where}", args))
+    assert "idx_results_ts_epoch" in plan
+
+
+def _keyword_ids(keyword: str, **kw) -> list:
+    return _ids(db.search_results(keyword=keyword, **kw))
+
+
+def test_keyword_search_fts_matches_like_and_follows_updates(fresh_db):
+    details = ["도어 하단 스크래치", "후드 찍힘 2곳", "스크래치 경미", 'say "hi" AND x']
+    db.insert_results_many([record(i, "2026-01-01 10:00:00", detail=d, location="door" if i % 2 else "hood")
+                            for i, d in enumerate(details)])
+    assert db._fts_ready(fresh_db)
+    assert _keyword_ids("스크래치") == [1, 3]          # FTS (3글자 이상)
+    assert _keyword_ids("찍힘") == [2]                 # LIKE (3글자 미만)
+    assert _keyword_ids("ood") == [1, 3]               # 위치도 검색 대상
+    assert _keyword_ids('"hi" AND') == [4]             # FTS 연산자는 그대로 문자열로
+    assert _ids(db.search_results(location="hoo")) == [1, 3]
+
+    db.upsert_results_many([record(0, "2026-01-02 10:00:00", detail="도장 불량", location="hood")])
+    assert _keyword_ids("스크래치") == [3] and _keyword_ids("도장 불량") == [1]
+    db.delete_results([3])
+    assert _keyword_ids("스크래치") == []
+
+
+def test_rank_orders_by_relevance(fresh_db):
+    db.insert_results_many([record(0, "2026-01-02 10:00:00", detail="scratch on the left door panel near hinge"),
+                            record(1, "2026-01-01 10:00:00", detail="scratch scratch scratch")])
+    assert [r[0] for r in db.search_results(keyword="scratch")] == [1, 2]   # 최신순
+    assert [r[0] for r in db.search_results(keyword="scratch", rank=True)] == [2, 1]
+
+
+def _walk(direction: str, cursor=None, **kw) -> list:
+    """cursor부터 direction 방향으로 끝까지 페이지를 넘기며 [페이지 행 id 목록, ...]"""
+    pages = []
+    while True:
+        page = db.search_results_page(page_size=7, cursor=cursor, **kw)
+        pages.append([r[0] for r in page["rows"]])
+        cursor = page[direction]
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cross_archive_partitions(fresh_db):
+    db.insert_results_many(monthly_records(12, 5) + [record(100 + i, "2025-12-20 10:00:00") for i in range(4)])
+    assert len(archive.roll(fresh_db, hot_periods=1, now=datetime(2025, 12, 15))) == 11
+    expected = [r[0] for r in db.search_results(limit=1000)]   # 동률(ts)은 id 역순
+    assert len(expected) == 64 and expected[:4] == [64, 63, 62, 61]
+
+    pages = _walk("next")
+    assert sum(pages, []) == expected and all(len(p) == 7 for p in pages[:-1])
+    last = db.search_results_page(page_size=7, cursor=None)
+    for _ in range(len(pages) - 1):
+        last = db.search_results_page(page_size=7, cursor=last["next"])
+    assert [r[0] for r in last["rows"]] == pages[-1] and last["next"] is None
+    assert _walk("prev", last["prev"])[::-1] == pages[:-1]
+
+    march = [r[0] for r in db.search_results(date_from="2025-03-01", date_to="2025-03-31")]
+    assert sum(_walk("next", date_from="2025-03-01", date_to="2025-03-31"), []) == march and len(march) == 5
+
+
+def test_invalid_cursor_raises_value_error(fresh_db):
+    for bad in ("garbage", db._encode_cursor(1, 1, "sideways")):
+        with pytest.raises(ValueError):
+            db.search_results_page(cursor=bad)
+
+
+def test_category_values_are_stored_once_and_filtered_by_id(fresh_db):
+    from db.migrations import CATEGORY_TABLES
+
+    db.insert_results_many([record(i, "2026-01-01 10:00:00", defect_type="dent" if i % 2 else "scratch",
+                                   location=["door", "hood", "roof"][i % 3], action=None if i == 5 else "Hold")
+                            for i in range(9)])
+    values = {col: sorted(v for (v,) in fresh_db.execute(f"SELECT value FROM {t}"))
+              for col, t in CATEGORY_TABLES.items()}
+    assert values == {"defect_type": ["dent", "scratch"], "severity": ["B"],
+                      "location": ["door", "hood", "roof"], "action": ["Hold"]}
+    assert fresh_db.execute("SELECT COUNT(*) FROM results_data WHERE action_id IS NULL").fetchone()[0] == 1
+
+    assert _ids(db.search_results(defect_type="dent", location="hoo")) == [2, 8]
+    assert _ids(db.search_results(defect_type="crack")) == []   # 사전에 없는 값
+    assert db.search_results(action="Hold", severity="B", limit=1)[0][8] == "Hold"
+    assert [r[8] for r in db.search_results() if r[0] == 6] == [None]
@@ -0,0 +1,61 @@
+# tests/test_writer.py
+import time
+
+from conftest import record
+from db import db, writer
+from db.writer import ResultWriter
+
+
+def test_urgent_submit_skips_group_commit_window(fresh_db):
+    w = ResultWriter(window_ms=2000)
+    try:
+        t0 = time.perf_counter()
+        assert w.submit(record(1, "2026-01-01 10:00:00"), urgent=True).result(timeout=5) == ("inserted", 1)
+        assert time.perf_counter() - t0 < 1.0
+    finally:
+        w.shutdown()
+
+
+def test_background_submits_are_group_committed(fresh_db):
+    w = ResultWriter(window_ms=300)
+    try:
+        futs = [w.submit(record(i, "2026-01-01 10:00:00")) for i in range(20)]
+        assert [f.result(timeout=5)[0] for f in futs] == ["inserted"] * 20
+        assert w.stats()["commits"] == 1 and w.stats()["max_batch"] == 20
+    finally:
+        w.shutdown()
+
+
+def test_outcomes_and_ids(fresh_db):
+    w = ResultWriter(window_ms=0)
+    try:
+        first = w.submit(record(1, "2026-01-01 10:00:00")).result()
+        dup = w.submit(record(1, "2026-01-02 10:00:00")).result()
+        upd = w.submit(record(1, "2026-01-03 10:00:00", defect_type="dent"), upsert=True).result()
+        assert (first, dup, upd) == (("inserted", 1), ("duplicate", 1), ("updated", 1))
+        assert db.search_results()[0][3] == "dent"
+    finally:
+        w.shutdown()
+
+
+def test_side_table_writes_go_through_writer(fresh_db, tmp_path):
+    from api.cache import ClassificationCache
+
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"{i}.bin"
+        p.write_bytes(bytes([i]) * 100)
+        paths.append(str(p))
+    before = fresh_db.total_changes
+    cache = ClassificationCache(db.get_db_path())
+    cache.put(cache.key_for(paths[0]), {"label": "dent"})
+    assert cache.lookup(paths[0])[1] == {"label": "dent"}
+    db.file_sha256_many(paths)
+    db.insert_results_many([dict(image_path=p, defect_type="crack", severity="A", location="door", score=0.1)
+                            for p in paths])
+    assert writer.get_writer().flush(timeout=5)
+    # 이 스레드의 연결로는 아무것도 쓰지 않음 (모두 저장 스레드 연결에서)
+    assert fresh_db.total_changes == before
+    assert fresh_db.execute("SELECT COUNT(*) FROM file_fingerprints").fetchone()[0] == 3
+    assert fresh_db.execute("SELECT hit_count FROM classify_cache").fetchone()[0] == 1
+    assert fresh_db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 3
@@ -4,18 +4,56 @@ import os
 
 load_dotenv()
 
+# 분류 백엔드: openai(기본) / local(로컬 호환 서버) / fake(프로세스 내 가짜 응답)
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "openai").strip().lower()
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("API 키가 설정되지 않았습니다. .env 파일을 확인해주세요.")
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY  # SDK가 환경변수로 읽도록 보장
+if CLASSIFIER_BACKEND == "openai":
+    if not OPENAI_API_KEY:
+        raise ValueError("API 키가 설정되지 않았습니다. .env 파일을 확인해주세요.")
+    os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY  # SDK가 환경변수로 읽도록 보장
 
 DB_PATH = os.getenv("DB_PATH", "image_log.db")
 
+# SQLite 연결 설정 (스레드별 재사용 연결, WAL)
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))        # 잠금 대기(ms)
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))           # 연결당 페이지 캐시(KiB)
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))    # 메모리 매핑 크기(byte), 0 = 끔
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()          # WAL에서는 NORMAL로도 손상 없음
+# 읽기 전용 스냅샷(대시보드): busy일 때 재시도 횟수, 재시도 간격(ms, 회차마다 증가)
+DB_READ_RETRIES = max(0, int(os.getenv("DB_READ_RETRIES", "20")))
+DB_READ_RETRY_MS = max(1, int(os.getenv("DB_READ_RETRY_MS", "50")))
+# 결과 목록 한 페이지 행 수 (fetch_results_page/search_results_page)
+RESULTS_PAGE_SIZE = max(1, int(os.getenv("RESULTS_PAGE_SIZE", "200")))
+# 일괄 저장(insert_results_many 등): 트랜잭션당 행 수, 파일 해시 계산 스레드 수
+DB_WRITE_CHUNK = max(1, int(os.getenv("DB_WRITE_CHUNK", "500")))
+DB_HASH_WORKERS = max(1, int(os.getenv("DB_HASH_WORKERS", str(min(8, os.cpu_count() or 4)))))
+# 저장 전용 스레드(db/writer.py): 큐 최대 레코드 수(가득 차면 submit 대기), 그룹 커밋 대기 시간(ms)
+DB_WRITER_QUEUE = max(1, int(os.getenv("DB_WRITER_QUEUE", "10000")))
+DB_WRITER_WINDOW_MS = max(0, int(os.getenv("DB_WRITER_WINDOW_MS", "50")))
+# 결과 내보내기(db/export.py): 한 번에 읽고 쓰는 행 수, 압축(zstd/snappy/gzip/lz4/none)
+EXPORT_CHUNK = max(1, int(os.getenv("EXPORT_CHUNK", "50000")))
+EXPORT_COMPRESSION = os.getenv("EXPORT_COMPRESSION", "zstd").strip().lower()
+EXPORT_CSV_GZIP = os.getenv("EXPORT_CSV_GZIP", "0") not in ("0", "false", "False")   # 테이블별 CSV를 .csv.gz로
+# 파일 지문 캐시: (경로, 크기, mtime_ns, inode)가 같으면 sha256을 다시 계산하지 않음
+FILE_HASH_CACHE = os.getenv("FILE_HASH_CACHE", "1") not in ("0", "false", "False")
+# 스키마 마이그레이션 backfill: 트랜잭션당 행 수 (작을수록 다른 작업을 덜 막음)
+DB_MIGRATION_CHUNK = max(1, int(os.getenv("DB_MIGRATION_CHUNK", "2000")))
+
 # DB 폴더 자동 생성
 _db_dir = os.path.dirname(os.path.abspath(DB_PATH))
 if _db_dir and not os.path.exists(_db_dir):
     os.makedirs(_db_dir, exist_ok=True)
 
+# 기간별 아카이브 DB (db/archive.py): 끝난 기간의 결과를 ARCHIVE_DIR/results_<기간>.db로 이동
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(_db_dir, "archive"))
+ARCHIVE_PERIOD = os.getenv("ARCHIVE_PERIOD", "month").strip().lower()            # month / year
+ARCHIVE_HOT_PERIODS = max(1, int(os.getenv("ARCHIVE_HOT_PERIODS", "3")))          # 본 DB에 남길 최근 기간 수(현재 포함)
+ARCHIVE_RETENTION_PERIODS = max(0, int(os.getenv("ARCHIVE_RETENTION_PERIODS", "0")))  # 이보다 오래된 아카이브 삭제, 0 = 영구 보관
+ARCHIVE_ON_START = os.getenv("ARCHIVE_ON_START", "0") not in ("0", "false", "False")  # 앱 시작 시 백그라운드로 이동
+if ARCHIVE_PERIOD not in ("month", "year"):
+    raise ValueError(f"ARCHIVE_PERIOD는 month 또는 year: {ARCHIVE_PERIOD!r}")
+
 # 중앙 관리값(원하면 .env에서 덮어쓰기)
 DEFAULT_VISION_MODEL = os.getenv("VISION_MODEL", "gpt-4o-mini")
 DEFAULT_VISION_PROMPT = os.getenv(
@@ -56,10 +94,92 @@ CLASSIFY_PROMPT = os.getenv(
 """
 )
 
+# 여러 장을 한 요청으로 묶을 때 CLASSIFY_PROMPT 앞에 붙는 안내 ({n} = 이미지 수)
+CLASSIFY_BATCH_PROMPT = os.getenv(
+    "CLASSIFY_BATCH_PROMPT",
+    "아래에 [image 1] ~ [image {n}] 로 표시된 이미지 {n}장이 있다. "
+    "각 이미지를 따로 분석하여, 이미지마다 아래 형식의 JSON 오브젝트에 "
+    "\"index\"(이미지 번호, 1부터) 필드를 추가한 뒤, "
+    "{n}개 오브젝트를 담은 JSON 배열 하나로만 출력하라(추가 텍스트 금지).\n"
+) + CLASSIFY_PROMPT.replace("{", "{{").replace("}", "}}")
+
 SEVERITY_UI = ["High", "Medium", "Low"]
 SEVERITY_MAP = {
     "High": "A",
     "Medium": "B",
     "Low": "C"
 }
-SEVERITY_MAP_REVERSE = {v: k for k, v in SEVERITY_MAP.items()}
\ No newline at end of file
+SEVERITY_MAP_REVERSE = {v: k for k, v in SEVERITY_MAP.items()}
+
+# Action 목록 (Pass = 정상)
+ACTIONS = ["Pass", "Rework", "Scrap", "Hold", "Reject"]
+
+# 폴더 일괄 판정: 동시에 진행할 API 요청 수
+BATCH_CONCURRENCY = max(1, int(os.getenv("BATCH_CONCURRENCY", "4")))
+
+# 분류 결과 캐시 (이미지 sha256 + 모델 + 프롬프트 기준)
+CLASSIFY_CACHE = os.getenv("CLASSIFY_CACHE", "1") not in ("0", "false", "False")
+CLASSIFY_CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFY_CACHE_MAX_ENTRIES", "50000"))
+
+# 업로드 전 이미지 전처리 (긴 변 축소 + 재인코딩)
+IMAGE_PREP = os.getenv("IMAGE_PREP", "1") not in ("0", "false", "False")
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1536"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_PREP_WORKERS = max(1, int(os.getenv("IMAGE_PREP_WORKERS", str(os.cpu_count() or 4))))
+IMAGE_PREP_LOG = os.getenv("IMAGE_PREP_LOG", "0") not in ("0", "false", "False")   # 이미지마다 [PREP] 출력 (디버그용)
+
+# 폴더 일괄 판정 시 한 요청에 묶을 이미지 수 (1 = 묶지 않음)
+CLASSIFY_PACK_SIZE = max(1, int(os.getenv("CLASSIFY_PACK_SIZE", "1")))
+
+# API 재시도/속도 제한
+API_MAX_RETRIES = max(0, int(os.getenv("API_MAX_RETRIES", "5")))
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "1.0"))   # 초
+API_BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "60"))      # 초
+API_RPM_LIMIT = max(0, int(os.getenv("API_RPM_LIMIT", "0")))     # 0 = 제한 없음
+
+# local/fake 백엔드 설정 (오프라인 부하 테스트용)
+CLASSIFIER_BASE_URL = os.getenv("CLASSIFIER_BASE_URL", "http://127.0.0.1:8765/v1")
+FAKE_LATENCY = os.getenv("FAKE_LATENCY", "lognormal:-0.3,0.5")   # 초, api/backends.parse_latency 형식
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_ERROR_STATUS = [int(s) for s in os.getenv("FAKE_ERROR_STATUS", "429,500,503").split(",") if s.strip()]
+FAKE_RETRY_AFTER = float(os.getenv("FAKE_RETRY_AFTER", "1"))
+FAKE_RESPONSES = os.getenv("FAKE_RESPONSES", "")                  # 응답 후보 JSON 파일 경로
+FAKE_CHUNK_DELAY = float(os.getenv("FAKE_CHUNK_DELAY", "0.02"))     # 스트리밍 조각 간격(초)
+
+# 단건 분류(Classify 버튼) 시 스트리밍 응답 사용
+CLASSIFY_STREAM = os.getenv("CLASSIFY_STREAM", "1") not in ("0", "false", "False")
+
+# HTTP 클라이언트 (연결 풀/타임아웃/keep-alive, 앱 시작 시 미리 연결)
+HTTP_POOL_SIZE = max(1, int(os.getenv("HTTP_POOL_SIZE", str(BATCH_CONCURRENCY + 2))))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))   # 초
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))         # 초
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "120"))  # 초
+HTTP_WARMUP = os.getenv("HTTP_WARMUP", "1") not in ("0", "false", "False")
+
+# 지각 해시(dHash) 근접 중복: 해밍 거리 PHASH_THRESHOLD(0~64) 이내면 기존 결과 재사용 (기본 끔)
+PHASH_REUSE = os.getenv("PHASH_REUSE", "0") not in ("0", "false", "False")
+PHASH_THRESHOLD = max(0, int(os.getenv("PHASH_THRESHOLD", "4")))
+
+# API 호출 전 로컬 사전 필터 (빈 프레임/노출 불량/흐림)
+PREFILTER = os.getenv("PREFILTER", "0") not in ("0", "false", "False")
+PREFILTER_MAX_EDGE = int(os.getenv("PREFILTER_MAX_EDGE", "512"))          # 분석용 축소 크기(px)
+PREFILTER_EMPTY_STD = float(os.getenv("PREFILTER_EMPTY_STD", "4"))        # 밝기 표준편차 미만 = 빈 프레임
+PREFILTER_DARK_MEAN = float(os.getenv("PREFILTER_DARK_MEAN", "25"))       # 평균 밝기(0~255) 미만 = 노출 부족
+PREFILTER_BRIGHT_MEAN = float(os.getenv("PREFILTER_BRIGHT_MEAN", "230"))  # 평균 밝기 초과 = 노출 과다
+PREFILTER_CLIP_FRAC = float(os.getenv("PREFILTER_CLIP_FRAC", "0.6"))      # 검정/흰색 픽셀 비율 초과 = 노출 불량
+PREFILTER_BLUR_VAR = float(os.getenv("PREFILTER_BLUR_VAR", "60"))         # 라플라시안 분산 미만 = 흐림
+# 저가 모델: 기본 모델과 다른 모델을 지정했을 때만 cheap 단계 사용 (없으면 cheap → api로 처리)
+PREFILTER_CHEAP_MODEL = os.getenv("PREFILTER_CHEAP_MODEL", "").strip()
+PREFILTER_CHEAP = bool(PREFILTER_CHEAP_MODEL) and PREFILTER_CHEAP_MODEL != DEFAULT_VISION_MODEL
+# 단계별 처리: skip(API 없이 Hold로 저장) / cheap(PREFILTER_CHEAP_MODEL로 분류) / api(그대로)
+PREFILTER_ROUTES = {}
+for _stage, _default in (("blank", "skip"), ("exposure", "cheap"), ("blur", "cheap")):
+    _route = os.getenv(f"PREFILTER_{_stage.upper()}_ROUTE", _default).strip()
+    if _route not in ("skip", "cheap", "api"):
+        raise ValueError(f"PREFILTER_{_stage.upper()}_ROUTE는 skip, cheap, api 중 하나: {_route!r}")
+    PREFILTER_ROUTES[_stage] = "api" if _route == "cheap" and not PREFILTER_CHEAP else _route
+# skip 단계로 저장하는 라벨: DEFECT_LABELS 중 정상(불량 없음) 라벨. 비우면 none/ok/normal/no_defect 중 목록에 있는 것
+NO_DEFECT_LABEL = os.getenv("NO_DEFECT_LABEL", "").strip() or next(
+    (lbl for lbl in DEFECT_LABELS if lbl in ("none", "ok", "normal", "no_defect")), "")
+if PREFILTER and "skip" in PREFILTER_ROUTES.values() and NO_DEFECT_LABEL not in DEFECT_LABELS:
+    raise ValueError(f"NO_DEFECT_LABEL은 DEFECT_LABELS 중 하나여야 합니다: {NO_DEFECT_LABEL!r}")
@@ -3,9 +3,12 @@ from PyQt5.QtWidgets import QFileDialog
 import base64
 import os
 
+from utils.config import IMAGE_PREP, IMAGE_PREP_LOG
+from utils.image_prep import prepare_image, describe
+
 def get_image_file():
     path, _ = QFileDialog.getOpenFileName(
-        None, '이미지 선택', '', 'Images (*.png *.jpg *.jpeg *.webp)'
+        None, '이미지 선택', '', 'Images (*.png *.jpg *.jpeg *.webp *.bmp *.gif *.tif *.tiff)'
     )
     return path
 
@@ -18,9 +21,25 @@ def guess_mime(image_path: str) -> str:
     if ext in (".jpg", ".jpeg"): return "image/jpeg"
     if ext in (".png",):          return "image/png"
     if ext in (".webp",):         return "image/webp"
+    if ext in (".gif",):          return "image/gif"
+    if ext in (".bmp",):          return "image/bmp"
+    if ext in (".tif", ".tiff"):  return "image/tiff"
     return "application/octet-stream"
 
-def to_data_url(image_path: str) -> str:
-    from .file_handler import encode_image_to_base64, guess_mime
+def prepare_data_url(image_path: str) -> tuple[str, dict | None]:
+    """
+    전처리(축소/재인코딩/형식 변환) 후 data URL 생성.
+    반환: (data_url, 전처리 정보 dict — bytes_saved 포함, 전처리 안 했으면 None)
+    """
+    if IMAGE_PREP:
+        info = prepare_image(image_path)
+        b64 = base64.b64encode(info["data"]).decode("utf-8")
+        return f"data:{info['mime']};base64,{b64}", info
     b64 = encode_image_to_base64(image_path)
-    return f"data:{guess_mime(image_path)};base64,{b64}"
+    return f"data:{guess_mime(image_path)};base64,{b64}", None
+
+def to_data_url(image_path: str) -> str:
+    data_url, info = prepare_data_url(image_path)
+    if IMAGE_PREP_LOG and info is not None:
+        print(describe(info, image_path))
+    return data_url
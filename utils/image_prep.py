@@ -0,0 +1,116 @@
+# utils/image_prep.py
+"""
+Vision API 업로드 전 이미지 전처리
+- EXIF 회전 보정 후 긴 변을 IMAGE_MAX_EDGE 이하로 축소
+- JPEG(투명 배경은 WEBP)로 재인코딩, 품질은 IMAGE_JPEG_QUALITY
+- API가 받지 않는 형식(BMP/TIFF/GIF 등)은 변환
+- 변경할 것이 없으면 원본 바이트를 그대로 사용
+"""
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from utils.config import IMAGE_MAX_EDGE, IMAGE_JPEG_QUALITY, IMAGE_PREP_WORKERS
+
+# API에 그대로 보낼 수 있는 형식
+_PASSTHROUGH = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+_stats_lock = threading.Lock()
+_stats = {"images": 0, "original_bytes": 0, "encoded_bytes": 0}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _has_alpha(img: Image.Image) -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def prepare_image(image_path: str, max_edge: int = IMAGE_MAX_EDGE,
+                  quality: int = IMAGE_JPEG_QUALITY) -> dict:
+    """
+    반환:
+    {
+        "data": bytes, "mime": "image/jpeg",
+        "width": 1536, "height": 1152,
+        "original_bytes": 4_800_000, "encoded_bytes": 310_000, "bytes_saved": 4_490_000
+    }
+    """
+    with open(image_path, "rb") as f:
+        raw = f.read()
+
+    with Image.open(io.BytesIO(raw)) as src:
+        fmt = src.format
+        rotated = src.getexif().get(0x0112, 1) not in (0, 1)  # EXIF Orientation
+        img = ImageOps.exif_transpose(src) if rotated else src
+        too_big = max_edge > 0 and max(img.size) > max_edge
+
+        if fmt in _PASSTHROUGH and not rotated and not too_big:
+            data, mime = raw, _PASSTHROUGH[fmt]
+            size = img.size
+        else:
+            if too_big:
+                img = img.copy() if img is src else img
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            buf = io.BytesIO()
+            if _has_alpha(img):
+                img.convert("RGBA").save(buf, "WEBP", quality=quality)
+                mime = "image/webp"
+            else:
+                img.convert("RGB").save(buf, "JPEG", quality=quality, optimize=True)
+                mime = "image/jpeg"
+            data = buf.getvalue()
+            size = img.size
+
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["original_bytes"] += len(raw)
+        _stats["encoded_bytes"] += len(data)
+
+    return {
+        "data": data,
+        "mime": mime,
+        "width": size[0],
+        "height": size[1],
+        "original_bytes": len(raw),
+        "encoded_bytes": len(data),
+        "bytes_saved": len(raw) - len(data),
+    }
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=IMAGE_PREP_WORKERS, thread_name_prefix="image-prep")
+        return _pool
+
+
+def prepare_many(image_paths, max_edge: int = IMAGE_MAX_EDGE,
+                 quality: int = IMAGE_JPEG_QUALITY, return_exceptions: bool = False) -> list:
+    """
+    여러 이미지를 전처리 풀에서 병렬 처리 (입력 순서대로 반환)
+    return_exceptions=True면 실패한 이미지는 예외를 그 자리에 담아 반환 (아니면 첫 실패를 그대로 raise)
+    """
+    pool = _get_pool()
+    futures = [pool.submit(prepare_image, p, max_edge, quality) for p in image_paths]
+    if not return_exceptions:
+        return [f.result() for f in futures]
+    return [f.exception() or f.result() for f in futures]
+
+
+def prep_stats() -> dict:
+    with _stats_lock:
+        s = dict(_stats)
+    s["bytes_saved"] = s["original_bytes"] - s["encoded_bytes"]
+    return s
+
+
+def describe(info: dict, image_path: str = "") -> str:
+    name = os.path.basename(image_path) if image_path else ""
+    return (f"[PREP] {name} {info['original_bytes'] / 1024:.0f}KB → "
+            f"{info['encoded_bytes'] / 1024:.0f}KB ({info['width']}x{info['height']}, "
+            f"saved {info['bytes_saved'] / 1024:.0f}KB)")
@@ -0,0 +1,78 @@
+# utils/phash.py
+"""
+지각 해시(dHash) + BK-tree
+- 노출이 조금 다른 재촬영 이미지도 해밍 거리가 작게 나옴
+- SQLite INTEGER(부호 있는 64bit)에 저장할 수 있도록 to_signed/to_unsigned 제공
+"""
+import threading
+
+from PIL import Image, ImageOps
+
+
+def dhash(image_path: str, hash_size: int = 8) -> int:
+    """가로 인접 픽셀 밝기 비교로 만든 hash_size² 비트 해시 (기본 64bit)"""
+    with Image.open(image_path) as img:
+        img = ImageOps.exif_transpose(img)
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        px = list(small.getdata())
+    bits = 0
+    w = hash_size + 1
+    for row in range(hash_size):
+        for col in range(hash_size):
+            bits = (bits << 1) | (px[row * w + col] > px[row * w + col + 1])
+    return bits
+
+
+def to_signed(h: int) -> int:
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def to_unsigned(h: int) -> int:
+    return h + (1 << 64) if h < 0 else h
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+
+class BKTree:
+    """해밍 거리용 BK-tree: search(h, d)는 거리 d 이내 항목만 탐색"""
+
+    def __init__(self):
+        self._root = None   # [hash, item, {거리: 자식노드}]
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def add(self, h: int, item):
+        h = to_unsigned(h)
+        with self._lock:
+            self.size += 1
+            if self._root is None:
+                self._root = [h, item, {}]
+                return
+            node = self._root
+            while True:
+                d = hamming(h, node[0])
+                child = node[2].get(d)
+                if child is None:
+                    node[2][d] = [h, item, {}]
+                    return
+                node = child
+
+    def search(self, h: int, max_distance: int) -> list:
+        """[(거리, item), ...] 거리 오름차순"""
+        h = to_unsigned(h)
+        out = []
+        with self._lock:
+            if self._root is None:
+                return out
+            stack = [self._root]
+            while stack:
+                node = stack.pop()
+                d = hamming(h, node[0])
+                if d <= max_distance:
+                    out.append((d, node[1]))
+                lo, hi = d - max_distance, d + max_distance
+                stack.extend(c for k, c in node[2].items() if lo <= k <= hi)
+        out.sort(key=lambda x: x[0])
+        return out